@@ -0,0 +1,233 @@
+"""
+Controle de admissão e descarte de carga.
+
+Cada classe de endpoint ("inference", "fetch") tem um limite de requisições
+em execução e uma fila limitada: acima do limite a requisição espera na fila
+por até `queue_timeout` segundos; com a fila cheia (ou após a espera) recebe
+503 na hora, com o cabeçalho Retry-After. Assim a latência das requisições
+admitidas fica limitada e o processo continua respondendo (health checks e
+métricas não passam pelo controle) em vez de acumular trabalho no threadpool.
+
+A classe "fetch" também tem um limite de taxa por cliente (token bucket),
+que protege a fonte de dados externa: acima dele a resposta é 429.
+
+Tudo roda no event loop (middleware ASGI), antes de o corpo ser lido e de a
+requisição ocupar uma thread, então não há locks.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+from starlette.routing import Match
+
+
+class Overloaded(Exception):
+    """Requisição recusada; `retry_after` em segundos."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Até `max_concurrent` requisições em execução e `max_queue` aguardando.
+    Uma vaga liberada passa direto para a primeira da fila (FIFO).
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int = 0, queue_timeout: float = 1.0):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent deve ser positivo")
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Média móvel do tempo de atendimento, base do Retry-After
+        self._service_seconds = 0.0
+        self.admitted_total = 0
+        self.rejected_total: Dict[str, int] = {"queue_full": 0, "queue_timeout": 0}
+
+    def retry_after(self) -> int:
+        """Segundos estimados até a fila atual ser atendida (mínimo 1)."""
+        backlog = (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, math.ceil(backlog * self._service_seconds))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected_total[reason] += 1
+        return Overloaded(reason, self.retry_after())
+
+    async def acquire(self) -> None:
+        """Ocupa uma vaga, esperando na fila se preciso. Levanta `Overloaded` ao recusar."""
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self.admitted_total += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except BaseException:
+            # Cancelada na fila (ex.: cliente desconectou): devolve a vaga se já a recebeu
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+                waiter.cancel()
+            raise
+        if not waiter.done():
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            raise self._reject("queue_timeout")
+        self.admitted_total += 1
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        if service_seconds is not None:
+            if self._service_seconds:
+                self._service_seconds += 0.1 * (service_seconds - self._service_seconds)
+            else:
+                self._service_seconds = service_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # A vaga passa para a próxima da fila: `_active` não muda
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queue_depth": len(self._waiters),
+            "admitted_total": self.admitted_total,
+            "rejected_total": dict(self.rejected_total),
+            "avg_service_seconds": round(self._service_seconds, 6),
+        }
+
+
+class ClientRateLimiter:
+    """
+    Token bucket por cliente: `rate` requisições por segundo com rajadas de
+    até `burst`. Guarda no máximo `max_clients` clientes (LRU).
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self.limited_total = 0
+
+    def check(self, client: str) -> float:
+        """Consome um token do cliente. Retorna 0 se permitido, ou os segundos até o próximo token."""
+        now = self._clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        self.limited_total += 1
+        return (1.0 - bucket[0]) / self.rate
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "clients": len(self._buckets),
+                "limited_total": self.limited_total}
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI que aplica os limites às rotas de `route_classes`
+    (caminho da rota -> classe). As demais rotas passam direto. O cliente é
+    identificado pelo cabeçalho `client_header` (ex.: X-Forwarded-For atrás de
+    um proxy) ou pelo endereço da conexão.
+    """
+
+    def __init__(self, app, routes, route_classes: Dict[str, str],
+                 limiters: Dict[str, ConcurrencyLimiter],
+                 rate_limiters: Optional[Dict[str, ClientRateLimiter]] = None,
+                 client_header: Optional[str] = None):
+        self.app = app
+        self.routes = routes
+        self.route_classes = route_classes
+        self.limiters = limiters
+        self.rate_limiters = rate_limiters or {}
+        self.client_header = client_header.lower().encode("latin-1") if client_header else None
+
+    def _classify(self, scope) -> Optional[str]:
+        for route in self.routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                if route.path not in self.route_classes:
+                    return None
+                # Deixa a rota no scope para as métricas a registrarem também nas recusas
+                scope.update(child_scope)
+                return self.route_classes[route.path]
+        return None
+
+    def _client(self, scope) -> str:
+        if self.client_header is not None:
+            for name, value in scope.get("headers", ()):
+                if name == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    async def _refuse(send, status: int, detail: str, retry_after: int) -> None:
+        body = ('{"detail":"' + detail + '"}').encode("utf-8")
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(retry_after).encode("latin-1")),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        endpoint_class = self._classify(scope)
+        if endpoint_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limiter = self.rate_limiters.get(endpoint_class)
+        if rate_limiter is not None:
+            wait = rate_limiter.check(self._client(scope))
+            if wait:
+                await self._refuse(send, 429, "Limite de requisições por cliente excedido.",
+                                   max(1, math.ceil(wait)))
+                return
+
+        limiter = self.limiters.get(endpoint_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            await self._refuse(send, 503, "Servidor sobrecarregado; tente novamente em instantes.",
+                               e.retry_after)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
@@ -0,0 +1,190 @@
+"""
+Micro-batching dinâmico para a inferência do modelo.
+
+Requisições concorrentes são acumuladas por alguns milissegundos e executadas
+em um único forward pass de formato (N, WINDOW_SIZE, 1). Cada chamador recebe
+de volta apenas a sua linha do resultado.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Limites superiores dos buckets do histograma de tamanho de lote
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """
+    Agrupa janelas enviadas por várias threads em lotes para `predict_fn`.
+
+    `predict_fn` recebe um array (N, janela, 1) e devolve um array com N
+    linhas. O lote é disparado quando atinge `max_batch_size` ou quando a
+    requisição mais antiga da fila esperou `max_wait_ms`. Com `window_size`,
+    janelas de outro tamanho são recusadas já no `submit`.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 name: str = "default", window_size: Optional[int] = None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size deve ser maior ou igual a 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms não pode ser negativo")
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.window_size = window_size
+
+        self._queue: List[Tuple[np.ndarray, Future, float]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Métricas
+        self._requests_total = 0
+        self._served_total = 0
+        self._batches_total = 0
+        self._errors_total = 0
+        self._max_queue_depth = 0
+        self._last_batch_size = 0
+        self._wait_seconds_total = 0.0
+        self._inference_seconds_total = 0.0
+        self._batch_size_histogram: Dict[int, int] = {b: 0 for b in BATCH_SIZE_BUCKETS}
+        self._batch_size_overflow = 0
+
+    # --- Ciclo de vida ---
+    def start(self) -> "MicroBatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{self.name}",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Para o worker após processar o que ainda estiver na fila."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- API pública ---
+    def submit(self, window: np.ndarray) -> Future:
+        """
+        Enfileira uma janela (janela,) ou (janela, 1) e devolve um Future
+        com a linha correspondente da saída do modelo.
+        """
+        future: Future = Future()
+        item = np.asarray(window, dtype=np.float32).reshape(-1, 1)
+        if self.window_size is not None and item.shape[0] != self.window_size:
+            raise ValueError(f"Janela com {item.shape[0]} valores; o lote espera {self.window_size}")
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"MicroBatcher '{self.name}' está encerrado")
+            self._queue.append((item, future, time.perf_counter()))
+            self._requests_total += 1
+            depth = len(self._queue)
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+            self._cond.notify()
+        return future
+
+    def predict(self, window: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """Versão bloqueante de `submit`."""
+        return self.submit(window).result(timeout)
+
+    def stats(self) -> dict:
+        """Métricas de fila e de tamanho de lote para ajuste fino."""
+        with self._cond:
+            batches = self._batches_total
+            served = self._served_total
+            histogram = {f"le_{b}": n for b, n in self._batch_size_histogram.items()}
+            histogram["le_inf"] = self._batch_size_overflow
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "requests_total": self._requests_total,
+                "batches_total": batches,
+                "errors_total": self._errors_total,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": (served / batches) if batches else 0.0,
+                "avg_queue_wait_ms": (self._wait_seconds_total / served * 1000.0) if served else 0.0,
+                "avg_inference_ms": (self._inference_seconds_total / batches * 1000.0) if batches else 0.0,
+                "batch_size_histogram": histogram,
+            }
+
+    # --- Worker ---
+    def _next_batch(self) -> List[Tuple[np.ndarray, Future, float]]:
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return []
+
+            # Esperar até encher o lote ou vencer o prazo da requisição mais antiga
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            # Descartar requisições canceladas pelo chamador
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            dispatched_at = time.perf_counter()
+            try:
+                # Dentro do try: janelas de tamanhos diferentes falham só este lote, não o worker
+                inputs = np.stack([entry[0] for entry in batch])
+                outputs = np.asarray(self.predict_fn(inputs))
+                if outputs.shape[0] != len(batch):
+                    raise RuntimeError(
+                        f"predict_fn retornou {outputs.shape[0]} linhas para um lote de {len(batch)}")
+            except Exception as e:
+                with self._cond:
+                    self._errors_total += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            finished_at = time.perf_counter()
+
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result(outputs[i])
+
+            self._record_batch(batch, dispatched_at, finished_at)
+
+    def _record_batch(self, batch, dispatched_at: float, finished_at: float) -> None:
+        size = len(batch)
+        with self._cond:
+            self._batches_total += 1
+            self._served_total += size
+            self._last_batch_size = size
+            self._inference_seconds_total += finished_at - dispatched_at
+            self._wait_seconds_total += sum(dispatched_at - enqueued for _, _, enqueued in batch)
+            for bucket in BATCH_SIZE_BUCKETS:
+                if size <= bucket:
+                    self._batch_size_histogram[bucket] += 1
+                    break
+            else:
+                self._batch_size_overflow += 1
@@ -0,0 +1,89 @@
+"""
+Formato binário compacto para preços e previsões (`application/x-float32`).
+
+Layout, todo em little-endian:
+
+    b"F32"                 3 bytes, identificação
+    ndim                   1 byte (1 ou 2)
+    dimensões              ndim × uint32
+    valores                prod(dimensões) × float32
+
+O cabeçalho ocupa 4 + 4·ndim bytes, então os valores ficam alinhados a 4
+bytes e `decode_array` os expõe com `np.frombuffer`, sem cópia. Um array
+1-D é uma série de preços; um 2-D são janelas (N, tamanho da janela).
+"""
+import struct
+from typing import Optional
+
+import numpy as np
+
+MEDIA_TYPE = "application/x-float32"
+MAGIC = b"F32"
+_DTYPE = np.dtype("<f4")
+_MAX_NDIM = 2
+
+
+class BinaryFormatError(ValueError):
+    """Corpo binário mal formado."""
+
+
+def decode_array(data: bytes) -> np.ndarray:
+    """Array float32 (somente leitura) apoiado diretamente em `data`."""
+    if len(data) < 4 or data[:3] != MAGIC:
+        raise BinaryFormatError("Corpo binário inválido: cabeçalho 'F32' ausente")
+    ndim = data[3]
+    if not 1 <= ndim <= _MAX_NDIM:
+        raise BinaryFormatError(f"Corpo binário inválido: ndim deve ser 1 ou 2 (recebido {ndim})")
+    header_size = 4 + 4 * ndim
+    if len(data) < header_size:
+        raise BinaryFormatError("Corpo binário inválido: cabeçalho incompleto")
+    shape = struct.unpack_from(f"<{ndim}I", data, 4)
+    count = int(np.prod(shape))
+    if len(data) != header_size + count * _DTYPE.itemsize:
+        raise BinaryFormatError(f"Corpo binário inválido: esperado {count} valores float32 para o formato {shape}")
+    array = np.frombuffer(data, dtype=_DTYPE, count=count, offset=header_size).reshape(shape)
+    if not np.isfinite(array).all():
+        raise BinaryFormatError("Corpo binário inválido: valores não finitos")
+    return array
+
+
+def encode_array(values) -> bytes:
+    """Serializa um array 1-D ou 2-D no formato binário."""
+    array = np.ascontiguousarray(values, dtype=_DTYPE)
+    if not 1 <= array.ndim <= _MAX_NDIM:
+        raise ValueError("Apenas arrays 1-D ou 2-D podem ser serializados")
+    return MAGIC + bytes([array.ndim]) + struct.pack(f"<{array.ndim}I", *array.shape) + array.tobytes()
+
+
+def _media_type(value: str) -> str:
+    return value.split(";", 1)[0].strip().lower()
+
+
+def is_binary(content_type: Optional[str]) -> bool:
+    """O corpo da requisição está no formato binário?"""
+    return content_type is not None and _media_type(content_type) == MEDIA_TYPE
+
+
+def accepts_binary(accept: Optional[str]) -> bool:
+    """
+    O cliente prefere a resposta binária? Só quando `MEDIA_TYPE` aparece no
+    Accept com qualidade maior ou igual à do JSON (ou de */*); sem isso, a
+    resposta é JSON.
+    """
+    if not accept:
+        return False
+    quality = {}
+    for part in accept.split(","):
+        media_type, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        quality[media_type.strip().lower()] = q
+    binary = quality.get(MEDIA_TYPE, 0.0)
+    json_q = max(quality.get("application/json", 0.0), quality.get("application/*", 0.0), quality.get("*/*", 0.0))
+    return binary > 0 and binary >= json_q
@@ -0,0 +1,44 @@
+"""
+Previsão de vários dias à frente por rollout recursivo.
+
+A janela de WINDOW_SIZE preços é processada uma única vez; a partir daí cada
+dia adicional reaproveita o estado (h, c) das LSTMs e custa apenas um passo de
+tempo, alimentando o modelo com a própria previsão do dia anterior.
+
+Observação: o estado continua acumulando a série (a janela efetivamente
+cresce um dia por passo) em vez de descartar o preço mais antigo, como faria
+uma nova chamada ao /predict com a janela deslocada.
+"""
+from datetime import date
+from typing import List
+
+import numpy as np
+
+from api.numpy_lstm import NumpyLSTMModel
+
+
+def recursive_forecast(engine: NumpyLSTMModel, scaled_windows: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Previsões escalonadas (N, horizon) para N janelas escalonadas (N, passos).
+    A primeira coluna é idêntica ao `predict` da janela original.
+    """
+    if horizon < 1:
+        raise ValueError("O horizonte deve ser de pelo menos 1 dia")
+
+    windows = np.asarray(scaled_windows, dtype=np.float32)
+    if windows.ndim == 2:
+        windows = windows[:, :, np.newaxis]
+
+    predictions = np.empty((windows.shape[0], horizon), dtype=np.float32)
+    state = engine.encode(windows)
+    predictions[:, 0] = engine.output(state)[:, 0]
+    for day in range(1, horizon):
+        predictions[:, day] = engine.step(predictions[:, day - 1:day], state)[:, 0]
+    return predictions
+
+
+def forecast_dates(last_known_date: date, horizon: int) -> List[str]:
+    """Os próximos `horizon` dias úteis após a última data conhecida."""
+    offsets = np.arange(1, horizon + 1)
+    days = np.busday_offset(np.datetime64(last_known_date, "D"), offsets, roll="forward")
+    return [str(day) for day in days]
@@ -0,0 +1,437 @@
+"""
+Inferência em processos separados, com pesos e dados em memória compartilhada.
+
+O processo HTTP não executa o forward pass: cada lote vai para um dos
+processos de inferência do `InferenceWorkerPool`. Os pesos do modelo NumPy
+são gravados uma única vez em um arquivo mapeado em memória (em /dev/shm,
+quando existe) e todos os processos, inclusive o HTTP no rollout e no
+streaming, os leem de lá com `np.memmap`, sem cópia e somente leitura. A
+memória dos pesos não cresce com o número de processos.
+
+Cada processo de inferência tem o seu próprio buffer mapeado de entrada e
+saída; pelo pipe passam apenas o tamanho do lote e a resposta. Os processos
+são criados com "spawn" (o processo HTTP tem threads) e não importam
+TensorFlow nem FastAPI.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.numpy_lstm import NumpyLSTMModel
+
+logger = logging.getLogger(__name__)
+
+_DTYPE = np.dtype(np.float32)
+# Offsets múltiplos de 64 bytes (linha de cache) para cada array no arquivo
+_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _shared_file(prefix: str, size: int) -> str:
+    """Cria um arquivo de `size` bytes em memória (/dev/shm) ou, na falta dele, no diretório temporário."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".bin", dir=directory)
+    try:
+        os.ftruncate(fd, max(size, 1))
+    finally:
+        os.close(fd)
+    return path
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SharedWeights:
+    """
+    Pesos float32 de um `NumpyLSTMModel` em um arquivo mapeado em memória.
+    `layout` (JSON simples) descreve o arquivo e basta para outro processo
+    reconstruir o modelo com `attach`. Os arrays mapeados mantêm o
+    mapeamento vivo; o dono só remove o arquivo em `close`.
+    """
+
+    def __init__(self, path: str, layout: dict, owner: bool):
+        self.path = path
+        self.layout = layout
+        self.owner = owner
+        self.nbytes = os.path.getsize(path)
+
+    @classmethod
+    def create(cls, model: NumpyLSTMModel, prefix: str = "stock-lstm-weights-") -> "SharedWeights":
+        arrays = model.weight_arrays()
+        config = str(arrays.pop("config"))
+        entries = []
+        offset = 0
+        for key, array in arrays.items():
+            offset = _aligned(offset)
+            entries.append((key, offset, list(array.shape)))
+            offset += array.size * _DTYPE.itemsize
+
+        path = _shared_file(prefix, offset)
+        data = np.memmap(path, dtype=np.uint8, mode="r+")
+        for key, start, shape in entries:
+            size = int(np.prod(shape)) * _DTYPE.itemsize
+            data[start:start + size].view(_DTYPE)[:] = arrays[key].reshape(-1)
+        data.flush()
+        del data
+        return cls(path, {"config": config, "arrays": entries}, owner=True)
+
+    @classmethod
+    def attach(cls, path: str, layout: dict) -> "SharedWeights":
+        return cls(path, layout, owner=False)
+
+    def model(self) -> NumpyLSTMModel:
+        """Modelo cujos pesos são views somente leitura do arquivo mapeado."""
+        data = np.memmap(self.path, dtype=np.uint8, mode="r")
+        arrays: Dict[str, np.ndarray] = {"config": np.array(self.layout["config"])}
+        for key, start, shape in self.layout["arrays"]:
+            size = int(np.prod(shape)) * _DTYPE.itemsize
+            arrays[key] = data[start:start + size].view(_DTYPE).reshape(shape)
+        return NumpyLSTMModel.from_arrays(arrays)
+
+    def close(self) -> None:
+        """Remove o arquivo (dono); quem já o mapeou continua lendo até soltar os arrays."""
+        if self.owner:
+            _remove(self.path)
+            self.owner = False
+
+
+def _io_buffers(path: str, max_rows: int, max_steps: int, features: int,
+                outputs: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Views (entrada, saída) do buffer mapeado de um processo de inferência."""
+    in_size = max_rows * max_steps * features
+    data = np.memmap(path, dtype=np.uint8, mode="r+")
+    out_start = _aligned(in_size * _DTYPE.itemsize)
+    inputs = data[:in_size * _DTYPE.itemsize].view(_DTYPE)
+    results = data[out_start:out_start + max_rows * outputs * _DTYPE.itemsize].view(_DTYPE)
+    return inputs, results
+
+
+def _io_size(max_rows: int, max_steps: int, features: int, outputs: int) -> int:
+    return _aligned(max_rows * max_steps * features * _DTYPE.itemsize) + max_rows * outputs * _DTYPE.itemsize
+
+
+def limit_threads(threads: int) -> None:
+    """Limita as threads do BLAS/OpenMP do processo (threadpoolctl vem com o scikit-learn)."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        logger.warning("threadpoolctl não instalado; threads do BLAS não foram limitadas")
+        return
+    threadpool_limits(limits=threads)
+
+
+def _worker_main(conn, weights_path: str, layout: dict, io_path: str, max_rows: int, max_steps: int,
+                 features: int, outputs: int, threads: int) -> None:
+    """
+    Laço de um processo de inferência. Recebe (linhas, passos) pelo pipe,
+    lê a entrada do buffer mapeado, grava a saída no mesmo buffer e responde
+    None (ou a mensagem de erro). None no pipe encerra o processo.
+    """
+    if threads > 0:
+        limit_threads(threads)
+    model = SharedWeights.attach(weights_path, layout).model()
+    inputs, results = _io_buffers(io_path, max_rows, max_steps, features, outputs)
+
+    # Aquecimento: aloca os buffers do forward pass no tamanho máximo
+    model.predict(np.zeros((max_rows, max_steps, features), dtype=np.float32))
+    conn.send("ready")
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        rows, steps = job
+        try:
+            x = inputs[:rows * steps * features].reshape(rows, steps, features)
+            results[:rows * outputs] = model.predict(x).reshape(-1)
+            conn.send(None)
+        except Exception as e:
+            conn.send(f"{type(e).__name__}: {e}")
+
+
+class _Worker:
+    __slots__ = ("index", "process", "conn", "io_path", "inputs", "outputs")
+
+    def __init__(self, index: int, process, conn, io_path: str, inputs: np.ndarray, outputs: np.ndarray):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.io_path = io_path
+        self.inputs = inputs
+        self.outputs = outputs
+
+
+class InferenceWorkerPool:
+    """
+    Executa o forward pass de `model` em `workers` processos. Expõe
+    `predict(x, verbose=0)` como o modelo Keras/NumPy, então entra no lugar
+    dele no micro-batcher e no endpoint em lote. Lotes maiores que `max_rows`
+    são divididos e os pedaços rodam em paralelo nos processos livres.
+
+    `model` passa a ter os pesos em memória compartilhada: use `pool.model`
+    (views somente leitura) no processo HTTP em vez do original.
+    """
+
+    def __init__(self, model: NumpyLSTMModel, workers: int, threads_per_worker: int = 1,
+                 max_rows: int = 256, max_steps: int = 60, name: str = "default",
+                 start_timeout: float = 60.0, respawn_backoff: float = 1.0, respawn_backoff_max: float = 60.0):
+        if workers < 1:
+            raise ValueError("workers deve ser maior ou igual a 1")
+        if max_rows < 1 or max_steps < 1:
+            raise ValueError("max_rows e max_steps devem ser maiores ou iguais a 1")
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.max_rows = max_rows
+        self.max_steps = max_steps
+        self.name = name
+        self.start_timeout = start_timeout
+        self.respawn_backoff = respawn_backoff
+        self.respawn_backoff_max = respawn_backoff_max
+        self.features = model.lstm_layers[0].kernel.shape[0]
+        self.outputs = (model.dense_layers[-1].kernel.shape[1] if model.dense_layers
+                        else model.lstm_layers[-1].units)
+
+        self._weights = SharedWeights.create(model)
+        self.model = self._weights.model()
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[Optional[_Worker]] = [None] * workers
+        self._idle: "queue.SimpleQueue[_Worker]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Índices cujo processo morreu e ainda não foi recriado -> nova tentativa agendada
+        self._respawning: Dict[int, threading.Timer] = {}
+
+        # Métricas
+        self.jobs_total = 0
+        self.rows_total = 0
+        self.errors_total = 0
+        self.restarts_total = 0
+        self.respawn_failures_total = 0
+
+    @property
+    def available(self) -> int:
+        """Processos em funcionamento (os que aguardam nova tentativa de criação ficam de fora)."""
+        with self._lock:
+            return self.workers - len(self._respawning)
+
+    # --- Ciclo de vida ---
+    def start(self) -> "InferenceWorkerPool":
+        try:
+            for index in range(self.workers):
+                self._workers[index] = self._spawn(index)
+                self._idle.put(self._workers[index])
+        except Exception:
+            self.close()
+            raise
+        logger.info(f"[{self.name}] {self.workers} processos de inferência prontos "
+                    f"({self.threads_per_worker} thread(s) cada, pesos compartilhados: "
+                    f"{self._weights.nbytes / 1024:.0f} KiB)")
+        return self
+
+    def _spawn(self, index: int) -> _Worker:
+        io_path = _shared_file(f"stock-lstm-io-{index}-",
+                               _io_size(self.max_rows, self.max_steps, self.features, self.outputs))
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, name=f"inference-{self.name}-{index}", daemon=True,
+            args=(child_conn, self._weights.path, self._weights.layout, io_path, self.max_rows,
+                  self.max_steps, self.features, self.outputs, self.threads_per_worker))
+        process.start()
+        child_conn.close()
+        inputs, outputs = _io_buffers(io_path, self.max_rows, self.max_steps, self.features, self.outputs)
+        worker = _Worker(index, process, parent_conn, io_path, inputs, outputs)
+        try:
+            ready = parent_conn.poll(self.start_timeout) and parent_conn.recv() == "ready"
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self._stop_worker(worker)
+            raise RuntimeError(f"Processo de inferência {index} não ficou pronto (código {process.exitcode})")
+        return worker
+
+    @staticmethod
+    def _stop_worker(worker: _Worker, timeout: float = 5.0) -> None:
+        try:
+            worker.conn.send(None)
+        except OSError:
+            pass
+        worker.process.join(timeout)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(timeout)
+        worker.conn.close()
+        _remove(worker.io_path)
+
+    def close(self) -> None:
+        """Encerra os processos (depois dos lotes em andamento) e remove os arquivos compartilhados."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            timers = list(self._respawning.values())
+            self._respawning.clear()
+        for timer in timers:
+            timer.cancel()
+        running = [w for w in self._workers if w is not None]
+        for _ in running:
+            try:
+                self._stop_worker(self._idle.get(timeout=self.start_timeout))
+            except queue.Empty:
+                break
+        # Processos que não voltaram ao pool no prazo
+        for worker in running:
+            if worker.process.is_alive():
+                self._stop_worker(worker)
+            _remove(worker.io_path)
+        self._workers = [None] * self.workers
+        self._weights.close()
+
+    # --- Inferência ---
+    def _acquire(self, pending: deque) -> _Worker:
+        """Processo livre; enquanto não houver, conclui os pedaços já enviados por esta chamada."""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                if pending:
+                    self._finish(*pending.popleft())
+                    continue
+            # Sem nenhum processo em funcionamento, falha em vez de esperar a próxima tentativa
+            while True:
+                if self._closed or self.available == 0:
+                    raise RuntimeError("Nenhum processo de inferência disponível")
+                try:
+                    return self._idle.get(timeout=1.0)
+                except queue.Empty:
+                    pass
+
+    def _finish(self, worker: _Worker, rows: slice, out: np.ndarray) -> None:
+        """Espera o resultado de um pedaço, copia-o para `out` e devolve o processo ao pool."""
+        try:
+            error = worker.conn.recv()
+        except (EOFError, OSError):
+            self._replace(worker)
+            raise RuntimeError(f"Processo de inferência {worker.index} terminou inesperadamente")
+        if error is None:
+            n = rows.stop - rows.start
+            out[rows] = worker.outputs[:n * self.outputs].reshape(n, self.outputs)
+        self._idle.put(worker)
+        if error is not None:
+            with self._lock:
+                self.errors_total += 1
+            raise RuntimeError(f"Falha no processo de inferência {worker.index}: {error}")
+
+    def _replace(self, worker: _Worker) -> None:
+        """Substitui um processo que morreu (ex.: falta de memória) e devolve o novo ao pool."""
+        logger.error(f"[{self.name}] processo de inferência {worker.index} terminou "
+                     f"(código {worker.process.exitcode}); reiniciando")
+        with self._lock:
+            self.errors_total += 1
+            self.restarts_total += 1
+        self._stop_worker(worker)
+        self._workers[worker.index] = None
+        self._respawn(worker.index, self.respawn_backoff)
+
+    def _respawn(self, index: int, delay: float) -> None:
+        """
+        Recria o processo `index`. Se a criação falhar, o índice continua
+        reservado e uma nova tentativa é agendada em `delay` segundos, com o
+        intervalo dobrando até `respawn_backoff_max`.
+        """
+        try:
+            replacement = self._spawn(index)
+        except Exception as e:
+            with self._lock:
+                self.respawn_failures_total += 1
+                if self._closed:
+                    return
+                timer = threading.Timer(delay, self._respawn, args=(index, min(delay * 2, self.respawn_backoff_max)))
+                timer.daemon = True
+                self._respawning[index] = timer
+            logger.error(f"[{self.name}] falha ao recriar o processo de inferência {index}: {e}; "
+                         f"nova tentativa em {delay:.1f}s")
+            timer.start()
+            return
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._respawning.pop(index, None)
+                self._workers[index] = replacement
+        if closed:
+            self._stop_worker(replacement)
+            return
+        self._idle.put(replacement)
+
+    def predict(self, x, verbose: int = 0, batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Forward pass de um lote (N, passos, features) nos processos de
+        inferência. Retorna (N, saídas) float32, como `NumpyLSTMModel.predict`.
+        `verbose` e `batch_size` existem apenas por compatibilidade.
+        """
+        if self._closed:
+            raise RuntimeError("Pool de inferência encerrado")
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[:, :, np.newaxis]
+        if x.ndim != 3 or x.shape[2] != self.features or x.shape[1] > self.max_steps:
+            raise ValueError(f"Formato de entrada inválido: {x.shape}")
+        n, steps = x.shape[0], x.shape[1]
+
+        out = np.empty((n, self.outputs), dtype=np.float32)
+        pending: deque = deque()
+        try:
+            for start in range(0, n, self.max_rows):
+                rows = slice(start, min(start + self.max_rows, n))
+                chunk = x[rows]
+                worker = self._acquire(pending)
+                worker.inputs[:chunk.size] = chunk.reshape(-1)
+                try:
+                    worker.conn.send((chunk.shape[0], steps))
+                except OSError:
+                    self._replace(worker)
+                    raise RuntimeError(f"Processo de inferência {worker.index} terminou inesperadamente")
+                pending.append((worker, rows, out))
+            while pending:
+                self._finish(*pending.popleft())
+        finally:
+            # Em caso de erro, os pedaços já enviados ainda devolvem seus processos ao pool
+            while pending:
+                try:
+                    self._finish(*pending.popleft())
+                except Exception:
+                    pass
+        with self._lock:
+            self.jobs_total += 1
+            self.rows_total += n
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "available": self.available,
+            "threads_per_worker": self.threads_per_worker,
+            "max_rows_per_job": self.max_rows,
+            "shared_weights_bytes": self._weights.nbytes,
+            "jobs_total": self.jobs_total,
+            "rows_total": self.rows_total,
+            "errors_total": self.errors_total,
+            "restarts_total": self.restarts_total,
+            "respawn_failures_total": self.respawn_failures_total,
+        }
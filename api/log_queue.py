@@ -0,0 +1,70 @@
+"""
+Logging sem bloquear quem registra.
+
+Os handlers que escrevem no stdout/arquivo são executados por uma thread
+própria (`QueueListener`); no logger fica apenas um `QueueHandler`, que
+enfileira o registro. Assim a escrita dos logs não segura o event loop nem
+as threads de inferência.
+"""
+import atexit
+import copy
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo. O `QueueHandler` padrão junta
+    `msg % args` antes (pensando em filas entre processos), o que quebra
+    formatadores que leem `record.args`, como o do log de acesso do uvicorn.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+class _Listener(QueueListener):
+    def stop(self) -> None:
+        # Idempotente: pode ser parado antes do atexit
+        if self._thread is not None:
+            super().stop()
+
+
+def _start_listener(logger: logging.Logger, *handlers: logging.Handler) -> QueueListener:
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = _Listener(log_queue, *handlers, respect_handler_level=True)
+    logger.addHandler(_InProcessQueueHandler(log_queue))
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def configure_logging(level: int = logging.INFO, fmt: Optional[str] = None) -> Optional[QueueListener]:
+    """
+    Equivalente a `logging.basicConfig(level=..., format=...)`, com o handler
+    do stderr atrás de uma fila. Como o `basicConfig`, não faz nada se o
+    logger raiz já tiver handlers (ex.: configurados pelo pytest).
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt))
+    root.setLevel(level)
+    return _start_listener(root, handler)
+
+
+def enqueue_handlers(name: str) -> Optional[QueueListener]:
+    """
+    Move os handlers já configurados de um logger (ex.: "uvicorn.access")
+    para trás de uma fila. Retorna None se ele não tiver handlers próprios.
+    """
+    logger = logging.getLogger(name)
+    handlers = list(logger.handlers)
+    if not handlers or any(isinstance(h, QueueHandler) for h in handlers):
+        return None
+    for handler in handlers:
+        logger.removeHandler(handler)
+    return _start_listener(logger, *handlers)
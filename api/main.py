@@ -1,22 +1,55 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, conlist
-from typing import List, Optional
+import time
+# Início da importação do módulo: base da fase "imports" e do uptime do processo
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import (Depends, FastAPI, Header, HTTPException, Query, Request, Response, WebSocket,
+                     WebSocketDisconnect)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError, conlist
+from typing import Dict, List, Optional, Tuple, Type, Union
 import numpy as np
 import pickle
-from keras.models import load_model
+import hmac
 import os
-import time
-import yfinance as yf
-import pandas as pd
-from datetime import datetime, timedelta
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+import functools
 import logging
-import json
+
+from api import binary_format
+from api.admission import AdmissionMiddleware, ClientRateLimiter, ConcurrencyLimiter
+from api.batching import BATCH_SIZE_BUCKETS, MicroBatcher
+from api.forecast import forecast_dates, recursive_forecast
+from api.inference_workers import InferenceWorkerPool
+from api.log_queue import configure_logging, enqueue_handlers
+from api.metrics import MetricFamily, MetricsMiddleware, MetricsRegistry, RequestMetrics, histogram_samples
+from api.numpy_lstm import PRECISIONS, NumpyLSTMModel
+from api.model_pool import ModelPool
+from api.model_registry import (ModelBundle, ModelRegistry, ReloadInProgress,
+                                artifact_signature, artifact_version)
+from api.prediction_cache import PredictionCache
+from api.prewarm import PopularityTracker, PrewarmScheduler
+from api.price_cache import PriceHistoryCache
+from api.price_providers import PriceHistory, create_price_provider
+from api.profiling import ProfileStore, ProfilingMiddleware, RequestProfiler
+from api.single_flight import SingleFlight
+from api.streaming import StreamStateStore, parse_stream_message
+from api.preprocessing import inverse_scale_prices, scale_prices, sliding_windows
+from api.startup import PhaseTimer
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 # --- Configuração de Logging ---
-logging.basicConfig(
+# Os handlers rodam em uma thread própria: registrar um log só enfileira o registro
+configure_logging(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+for _name in ("uvicorn.access", "uvicorn.error"):
+    enqueue_handlers(_name)
 logger = logging.getLogger(__name__)
 
 # --- 1. Configuração e Inicialização ---
@@ -29,78 +62,687 @@ app = FastAPI(
 # Definir o tamanho da janela (deve ser o mesmo usado no treino)
 WINDOW_SIZE = 60
 
+# Backend de inferência: "keras" (TensorFlow) ou "numpy" (motor próprio, sem importar TensorFlow)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras").lower()
+
+# Precisão dos pesos servidos: "float32" (o .h5 do treino) ou "float16"/"int8" (exportados pelo
+# train_model.py em stock_lstm_model.<precisão>.npz e sempre servidos pelo motor NumPy)
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "float32").lower()
+
+# Processos de inferência: com INFERENCE_WORKERS > 0 o forward pass roda nesses processos, que
+# compartilham um único mapeamento dos pesos (motor NumPy); INFERENCE_WORKER_THREADS limita as
+# threads do BLAS em cada um. Com 0, a inferência roda no próprio processo da API
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+INFERENCE_WORKER_THREADS = int(os.getenv("INFERENCE_WORKER_THREADS", "1"))
+
+# Micro-batching: requisições concorrentes são agrupadas em um único model.predict
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "1") == "1"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# Histórico de preços do /predict-auto: fonte ("yahoo", "synthetic" ou "store") e cache em memória.
+# "store" lê o armazenamento local alimentado pelo ingest_prices.py, em PRICE_STORE_DIR
+PRICE_PROVIDER = os.getenv("PRICE_PROVIDER", "yahoo")
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "prices"))
+PRICE_LOOKBACK_DAYS = int(os.getenv("PRICE_LOOKBACK_DAYS", "90"))
+PRICE_CACHE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", "300"))
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "512"))
+PRICE_CACHE_MAX_BYTES = int(os.getenv("PRICE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Busca de dados: prazo por requisição e threads dedicadas (não ocupam o threadpool das requisições)
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "10"))
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+
+# Controle de admissão: requisições em execução e fila por classe de endpoint ("inference":
+# /predict e /predict/batch; "fetch": /predict-auto e /forecast, que buscam dados externos).
+# Acima disso, a resposta é 503 com Retry-After; 0 desliga o limite da classe
+INFERENCE_MAX_CONCURRENT = int(os.getenv("INFERENCE_MAX_CONCURRENT", "32"))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "128"))
+FETCH_MAX_CONCURRENT = int(os.getenv("FETCH_MAX_CONCURRENT", "32"))
+FETCH_MAX_QUEUE = int(os.getenv("FETCH_MAX_QUEUE", "128"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+# Limite por cliente nas rotas "fetch" (429 com Retry-After; 0 desliga). O cliente é o
+# endereço da conexão ou o cabeçalho CLIENT_ID_HEADER (ex.: X-Forwarded-For atrás de um proxy)
+FETCH_RATE_LIMIT_PER_SECOND = float(os.getenv("FETCH_RATE_LIMIT_PER_SECOND", "10"))
+FETCH_RATE_LIMIT_BURST = float(os.getenv("FETCH_RATE_LIMIT_BURST", "50"))
+CLIENT_ID_HEADER = os.getenv("CLIENT_ID_HEADER")
+
+# Pré-aquecimento do /predict-auto: após cada fechamento (dias úteis, PREWARM_CLOSE_TIME em UTC,
+# mais até PREWARM_JITTER_SECONDS aleatórios) atualiza os PREWARM_TOP_N tickers mais requisitados,
+# no máximo PREWARM_CONCURRENCY por vez. A popularidade decai com meia-vida de PREWARM_HALF_LIFE_HOURS
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_TOP_N = int(os.getenv("PREWARM_TOP_N", "50"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "4"))
+PREWARM_CLOSE_TIME = datetime.strptime(os.getenv("PREWARM_CLOSE_TIME", "21:30"), "%H:%M").time()
+PREWARM_JITTER_SECONDS = float(os.getenv("PREWARM_JITTER_SECONDS", "600"))
+PREWARM_HALF_LIFE_HOURS = float(os.getenv("PREWARM_HALF_LIFE_HOURS", "24"))
+
+# Previsão de vários dias: horizonte máximo e quantidade máxima de tickers por requisição
+FORECAST_MAX_HORIZON = int(os.getenv("FORECAST_MAX_HORIZON", "30"))
+FORECAST_MAX_TICKERS = int(os.getenv("FORECAST_MAX_TICKERS", "50"))
+
+# Streaming (/ws/predict): tickers mantidos em memória, TTL de ociosidade e intervalo de resincronização
+STREAM_MAX_TICKERS = int(os.getenv("STREAM_MAX_TICKERS", "10000"))
+STREAM_IDLE_TTL_SECONDS = float(os.getenv("STREAM_IDLE_TTL_SECONDS", "3600"))
+STREAM_RESYNC_INTERVAL = int(os.getenv("STREAM_RESYNC_INTERVAL", "60"))
+
+# Cache de previsões por janela escalonada (0 desliga)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+
+# Endpoint /predict/batch: limite de janelas por requisição e tamanho de cada chunk de inferência
+BATCH_ENDPOINT_MAX_WINDOWS = int(os.getenv("BATCH_ENDPOINT_MAX_WINDOWS", "10000"))
+INFERENCE_CHUNK_SIZE = int(os.getenv("INFERENCE_CHUNK_SIZE", "256"))
+
+# Recarga a quente: intervalo de verificação do diretório de modelos (0 desliga) e
+# token exigido no cabeçalho X-Admin-Token dos endpoints /admin (sem token, ficam desligados)
+MODEL_WATCH_INTERVAL_SECONDS = float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "30"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Perfilamento sob demanda (cProfile) de requisições individuais: com PROFILING_ENABLED=1, são
+# perfiladas as requisições com o cabeçalho X-Profile igual ao ADMIN_TOKEN e uma fração
+# PROFILE_SAMPLE_RATE das demais. Os últimos PROFILE_HISTORY_SIZE perfis ficam em /admin/profiles
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HISTORY_SIZE = int(os.getenv("PROFILE_HISTORY_SIZE", "50"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+
+# Inicialização: com LOAD_MODEL_IN_BACKGROUND=1 o servidor sobe antes do modelo ficar pronto
+# (o /health/ready responde 503 até lá); por padrão a inicialização espera o modelo
+LOAD_MODEL_IN_BACKGROUND = os.getenv("LOAD_MODEL_IN_BACKGROUND", "0") == "1"
+
+# Modelos por ticker/grupo (api/models/<TICKER>/ ou api/models/<grupo>/): carregados sob
+# demanda e mantidos em um LRU limitado por quantidade e memória
+MODEL_POOL_MAX_MODELS = int(os.getenv("MODEL_POOL_MAX_MODELS", "256"))
+MODEL_POOL_MAX_BYTES = int(os.getenv("MODEL_POOL_MAX_BYTES", str(512 * 1024 * 1024)))
+# Tickers em streaming por modelo do pool (cada um atende um ticker ou um grupo pequeno)
+POOL_STREAM_CAPACITY = 64
+
 # --- 2. Carregamento dos Modelos ---
 # Usar caminho absoluto baseado na localização deste arquivo (main.py)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(BASE_DIR, 'models', 'stock_lstm_model.h5')
-SCALER_PATH = os.path.join(BASE_DIR, 'models', 'scaler.pkl')
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+MODEL_FILENAME = 'stock_lstm_model.h5' if MODEL_PRECISION == "float32" else f'stock_lstm_model.{MODEL_PRECISION}.npz'
+MODEL_PATH = os.path.join(MODELS_DIR, MODEL_FILENAME)
+SCALER_PATH = os.path.join(MODELS_DIR, 'scaler.pkl')
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE) if PREDICTION_CACHE_SIZE > 0 else None
+# Estado do streaming da versão anterior do modelo: tickers migram sob demanda
+retired_stream: Optional[Tuple[StreamStateStore, object]] = None
+
+price_cache = PriceHistoryCache(create_price_provider(PRICE_PROVIDER, store_dir=PRICE_STORE_DIR),
+                                ttl_seconds=PRICE_CACHE_TTL_SECONDS,
+                                max_entries=PRICE_CACHE_MAX_ENTRIES,
+                                max_bytes=PRICE_CACHE_MAX_BYTES,
+                                lookback_days=PRICE_LOOKBACK_DAYS)
+price_fetches = SingleFlight()
+fetch_executor = None
+
+
+# Métricas expostas em /metrics (formato Prometheus)
+metrics = MetricsRegistry()
+request_metrics = RequestMetrics(metrics)
+
+request_profiler = RequestProfiler(ProfileStore(PROFILE_HISTORY_SIZE), enabled=PROFILING_ENABLED,
+                                   token=ADMIN_TOKEN, sample_rate=PROFILE_SAMPLE_RATE,
+                                   top_functions=PROFILE_TOP_FUNCTIONS)
+
+startup_timer = PhaseTimer("inicialização")
+startup_error: Optional[str] = None
+startup_task = None
+
+
+def import_inference_backend():
+    """
+    Importa o backend configurado em INFERENCE_BACKEND e devolve a função que
+    carrega o modelo. O Keras só é importado quando o backend "keras" é usado;
+    pesos em precisão reduzida (MODEL_PRECISION) e os processos de inferência
+    (INFERENCE_WORKERS) usam sempre o motor NumPy.
+    """
+    if MODEL_PRECISION != "float32":
+        if MODEL_PRECISION not in PRECISIONS:
+            raise ValueError(f"MODEL_PRECISION inválido: {MODEL_PRECISION}")
+        return NumpyLSTMModel.from_npz
+    if INFERENCE_BACKEND == "numpy" or INFERENCE_WORKERS > 0:
+        import h5py  # noqa: F401 (usado por NumpyLSTMModel.from_h5)
+        return NumpyLSTMModel.from_h5
+    if INFERENCE_BACKEND != "keras":
+        raise ValueError(f"INFERENCE_BACKEND inválido: {INFERENCE_BACKEND}")
+    from keras.models import load_model
+    return load_model
+
+
+def load_inference_model(path: str):
+    """
+    Carrega o modelo com o backend configurado em INFERENCE_BACKEND.
+    """
+    return import_inference_backend()(path)
+
+
+def load_model_bundle(version: str, model_path: str = MODEL_PATH, scaler_path: str = SCALER_PATH,
+                      batching: bool = BATCHING_ENABLED,
+                      stream_capacity: int = STREAM_MAX_TICKERS,
+                      workers: int = INFERENCE_WORKERS) -> ModelBundle:
+    """
+    Carrega uma versão dos artefatos com tudo que depende dela (processos de
+    inferência, motor de estado, streaming, micro-batcher) e a aquece antes de
+    receber tráfego. A duração de cada fase fica em `bundle.load_timings`.
+    """
+    timer = PhaseTimer(f"modelo {version}")
+    with timer.phase("import_backend"):
+        load = import_inference_backend()
+    with timer.phase("load_model"):
+        model = load(model_path)
+    with timer.phase("load_scaler"):
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+    inference_pool = None
+    batcher = None
+    try:
+        if workers > 0:
+            with timer.phase("inference_workers"):
+                inference_pool = InferenceWorkerPool(model, workers, threads_per_worker=INFERENCE_WORKER_THREADS,
+                                                     max_rows=max(INFERENCE_CHUNK_SIZE, BATCH_MAX_SIZE),
+                                                     max_steps=WINDOW_SIZE, name=version).start()
+            # O forward pass vai para os processos; aqui ficam só os pesos mapeados (rollout e streaming)
+            model = inference_pool
+        with timer.phase("state_engine"):
+            # Motor NumPy com API de estado (usado no rollout do /forecast e no streaming), independente do backend
+            if inference_pool is not None:
+                state_model = inference_pool.model
+            elif isinstance(model, NumpyLSTMModel):
+                state_model = model
+            else:
+                state_model = NumpyLSTMModel.from_keras(model)
+            stream_store = StreamStateStore(state_model, WINDOW_SIZE, capacity=stream_capacity,
+                                            idle_ttl_seconds=STREAM_IDLE_TTL_SECONDS,
+                                            resync_interval=STREAM_RESYNC_INTERVAL)
+
+        if batching:
+            batcher = MicroBatcher(lambda x: model.predict(x, verbose=0),
+                                   max_batch_size=BATCH_MAX_SIZE,
+                                   max_wait_ms=BATCH_MAX_WAIT_MS,
+                                   name=version, window_size=WINDOW_SIZE).start()
+
+        # Aquecimento: inferência sintética em cada caminho usado pelas rotas (o Keras
+        # rastreia o grafo na primeira chamada, o escalonador valida a entrada etc.)
+        with timer.phase("warmup"):
+            zeros = np.zeros((max(BATCH_MAX_SIZE, 1), WINDOW_SIZE, 1), dtype=np.float32)
+            model.predict(zeros[:1], verbose=0)
+            if batching:
+                model.predict(zeros, verbose=0)
+                batcher.predict(zeros[0])
+            state_model.encode(zeros[:1, :, 0])
+            scaler.inverse_transform(scaler.transform(np.ones((WINDOW_SIZE, 1))))
+    except BaseException:
+        # Sem bundle, ninguém encerraria a thread do micro-batcher e os processos de inferência
+        if batcher is not None:
+            batcher.close()
+        if inference_pool is not None:
+            inference_pool.close()
+        raise
+
+    # Memória estimada: pesos (o Keras guarda mais que isso, mas escala junto) + estado do streaming
+    nbytes = state_model.nbytes + stream_store.nbytes
+    if model is not state_model and inference_pool is None:
+        nbytes += state_model.nbytes
+    # O micro-batcher vem antes dos processos de inferência: ao liberar a versão, ele drena a fila primeiro
+    return ModelBundle(version, model, scaler, state_model, nbytes=nbytes,
+                       batcher=batcher, inference_pool=inference_pool, stream_store=stream_store,
+                       load_timings=timer.durations)
+
+
+def load_pool_bundle(version: str, model_path: str, scaler_path: str) -> ModelBundle:
+    """
+    Carrega um modelo de ticker/grupo. Sem micro-batcher nem processos de
+    inferência (uma thread ou processo por modelo não escala para centenas
+    deles) e com poucos slots de streaming.
+    """
+    return load_model_bundle(version, model_path, scaler_path, batching=False,
+                             stream_capacity=POOL_STREAM_CAPACITY, workers=0)
+
+
+def on_model_swap(previous: Optional[ModelBundle], current: ModelBundle) -> None:
+    """
+    Ajusta o estado global à nova versão: o cache de previsões descarta a
+    versão anterior, os tickers do streaming migram dela sob demanda e o pool
+    de modelos por ticker volta a procurar os artefatos em disco.
+    """
+    global retired_stream
+    model_pool.invalidate()
+    if prediction_cache is not None and previous is not None and previous.version != current.version:
+        prediction_cache.discard_version(previous.version)
+    retired_stream = (previous.stream_store, previous.scaler) if previous is not None else None
+
+
+model_registry = ModelRegistry(
+    loader=load_model_bundle,
+    version_fn=lambda: artifact_version(MODEL_PATH, SCALER_PATH),
+    signature_fn=lambda: artifact_signature(MODEL_PATH, SCALER_PATH),
+    poll_interval=MODEL_WATCH_INTERVAL_SECONDS,
+    on_swap=on_model_swap,
+)
+model_pool = ModelPool(MODELS_DIR, load_pool_bundle,
+                       max_bytes=MODEL_POOL_MAX_BYTES,
+                       max_models=MODEL_POOL_MAX_MODELS,
+                       check_interval=MODEL_WATCH_INTERVAL_SECONDS,
+                       model_filename=MODEL_FILENAME)
+
+
+def load_default_model() -> None:
+    """
+    Carrega e aquece o modelo padrão, registrando as fases no `startup_timer`.
+    Até terminar, o /health/ready responde 503.
+    """
+    global startup_error
+    try:
+        bundle = model_registry.reload(force=True)
+    except Exception as e:
+        startup_error = str(e)
+        logger.error(f"Erro crítico ao carregar artefatos: {e}", exc_info=True)
+        return
+
+    startup_error = None
+    startup_timer.update(bundle.load_timings)
+    logger.info(f"Artefatos carregados com sucesso (backend: {INFERENCE_BACKEND}, precisão: {MODEL_PRECISION}, "
+                f"versão: {bundle.version}); pronto para receber tráfego após {startup_timer.total:.2f}s de inicialização")
+    if INFERENCE_WORKERS > 0:
+        logger.info(f"Inferência em {INFERENCE_WORKERS} processos ({INFERENCE_WORKER_THREADS} thread(s) cada)")
+    if BATCHING_ENABLED:
+        logger.info(f"Micro-batching ativo (lote máx. {BATCH_MAX_SIZE}, espera máx. {BATCH_MAX_WAIT_MS}ms)")
 
-model = None
-scaler = None
 
 @app.on_event("startup")
 async def load_artifacts():
     """
     Carrega o modelo e o escalonador na memória quando a aplicação inicia.
     """
-    global model, scaler
-    print("=" * 50)
-    print("Iniciando carregamento de artefatos...")
-    print(f"BASE_DIR: {BASE_DIR}")
-    print(f"MODEL_PATH: {MODEL_PATH}")
-    print(f"SCALER_PATH: {SCALER_PATH}")
-    print(f"Modelo existe? {os.path.exists(MODEL_PATH)}")
-    print(f"Scaler existe? {os.path.exists(SCALER_PATH)}")
-    
-    # Listar arquivos no diretório api/models
-    models_dir = os.path.join(BASE_DIR, 'models')
-    if os.path.exists(models_dir):
-        print(f"Arquivos em {models_dir}:")
-        for f in os.listdir(models_dir):
-            print(f"  - {f}")
+    global startup_error, startup_task
+    startup_timer.record("imports", IMPORT_SECONDS)
+    logger.info(f"Iniciando carregamento de artefatos (backend: {INFERENCE_BACKEND}, MODEL_PATH: {MODEL_PATH}, "
+                f"SCALER_PATH: {SCALER_PATH})")
+    if os.path.exists(MODELS_DIR):
+        logger.info(f"Arquivos em {MODELS_DIR}: {sorted(os.listdir(MODELS_DIR))}")
     else:
-        print(f"Diretório {models_dir} não existe!")
-    print("=" * 50)
-    
+        logger.warning(f"Diretório {MODELS_DIR} não existe!")
+
+    # O observador também cobre o caso de os artefatos aparecerem depois da inicialização
+    model_registry.start_watcher()
+
     if not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH):
-        print("Erro: Arquivos de modelo ou escalonador não encontrados.")
-        print("Certifique-se de executar o script 'train_model.py' primeiro.")
+        startup_error = "Arquivos de modelo ou escalonador não encontrados."
+        logger.error(f"{startup_error} Certifique-se de executar o script 'train_model.py' primeiro.")
         return
 
+    if LOAD_MODEL_IN_BACKGROUND:
+        startup_task = asyncio.get_running_loop().run_in_executor(None, load_default_model)
+    else:
+        load_default_model()
+
+
+@app.on_event("startup")
+def start_fetch_executor():
+    """
+    Cria o pool de threads dedicado às buscas de dados externos.
+    """
+    global fetch_executor
+    fetch_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="price-fetch")
+
+
+@app.on_event("shutdown")
+def unload_artifacts():
+    """
+    Para o observador de modelos e libera a versão atual; o micro-batcher
+    processa o que ainda estiver na fila antes de encerrar.
+    """
+    global retired_stream
+    model_registry.stop()
+    model_pool.clear()
+    retired_stream = None
+
+
+@app.on_event("shutdown")
+def stop_fetch_executor():
+    """
+    Libera o pool de buscas sem esperar downloads pendentes.
+    """
+    global fetch_executor
+    if fetch_executor is not None:
+        fetch_executor.shutdown(wait=False)
+        fetch_executor = None
+
+
+@app.on_event("startup")
+def start_prewarm():
+    """
+    Agenda o pré-aquecimento dos tickers populares após cada fechamento.
+    """
+    if prewarm is not None:
+        prewarm.start()
+
+
+@app.on_event("shutdown")
+async def stop_prewarm():
+    """
+    Cancela o agendamento e as atualizações de pré-aquecimento em andamento.
+    """
+    if prewarm is not None:
+        await prewarm.stop()
+
+
+def acquire_model(ticker: Optional[str] = None) -> Optional[ModelBundle]:
+    """
+    Modelo que atende o ticker, já adquirido (liberar com `release()`): o do
+    ticker ou do grupo dele, carregado sob demanda, ou o modelo padrão.
+    Pode bloquear no primeiro uso de um modelo; chamar fora do event loop.
+    """
+    if ticker:
+        try:
+            bundle = model_pool.acquire(ticker)
+        except Exception as e:
+            logger.error(f"Erro ao carregar o modelo de {ticker}: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Erro ao carregar o modelo de {ticker.upper()}: {str(e)}")
+        if bundle is not None:
+            return bundle
+    return model_registry.acquire()
+
+
+def model_bundle(codigo_acao: Optional[str] = None):
+    """
+    Dependência das rotas de previsão: o modelo do ticker (ou None), retido
+    até o fim da requisição mesmo que uma recarga o substitua. `codigo_acao`
+    vem do caminho nas rotas por ticker e da query string nas demais.
+    """
+    bundle = acquire_model(codigo_acao)
     try:
-        model = load_model(MODEL_PATH)
-        with open(SCALER_PATH, 'rb') as f:
-            scaler = pickle.load(f)
-        print("✅ Artefatos carregados com sucesso!")
-    except Exception as e:
-        print(f"❌ Erro crítico ao carregar artefatos: {e}")
+        yield bundle
+    finally:
+        if bundle is not None:
+            bundle.release()
 
-# Middleware para monitoramento de performance
-@app.middleware("http")
-async def add_process_time_header(request, call_next):
-    start_time = time.time()
-    
-    # Capturar informações da requisição
-    client_host = request.client.host if request.client else "unknown"
-    
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    
-    # Log estruturado
-    log_data = {
-        "timestamp": datetime.now().isoformat(),
-        "method": request.method,
-        "path": request.url.path,
-        "client_ip": client_host,
-        "status_code": response.status_code,
-        "process_time_seconds": round(process_time, 4)
+
+def raise_model_unavailable() -> None:
+    """Erro 503 padrão quando nenhuma versão do modelo está carregada."""
+    logger.error("Modelo ou escalonador não carregados")
+    raise HTTPException(status_code=503,
+                        detail="Modelo ou escalonador não estão carregados. Verifique os logs do servidor.")
+
+
+def require_admin(x_admin_token: Optional[str]) -> None:
+    """Valida o token dos endpoints administrativos."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403,
+                            detail="Endpoints administrativos desabilitados. Defina ADMIN_TOKEN para habilitá-los.")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Token administrativo inválido.")
+
+
+def _cached_prediction(bundle: ModelBundle,
+                       reshaped_input: np.ndarray) -> Tuple[Optional[bytes], Optional[np.ndarray]]:
+    """
+    Consulta o cache de previsões. Retorna (chave, resultado (1, 1) ou None);
+    a chave é None quando o cache está desligado.
+    """
+    if prediction_cache is None:
+        return None, None
+    key = prediction_cache.key(reshaped_input)
+    cached = prediction_cache.get(key, bundle.version)
+    return key, (cached.reshape(1, -1) if cached is not None else None)
+
+
+def run_inference(bundle: ModelBundle, reshaped_input: np.ndarray) -> np.ndarray:
+    """
+    Executa o modelo para uma única janela (1, WINDOW_SIZE, 1).
+    Janelas já vistas com a mesma versão do modelo vêm do cache de previsões.
+    Com o micro-batching ativo, a janela é agrupada com as de outras requisições.
+    """
+    key, cached = _cached_prediction(bundle, reshaped_input)
+    if cached is not None:
+        return cached
+
+    if bundle.batcher is not None:
+        result = bundle.batcher.predict(reshaped_input[0]).reshape(1, -1)
+    else:
+        result = bundle.model.predict(reshaped_input, verbose=0)
+
+    if key is not None:
+        prediction_cache.put(key, bundle.version, result)
+    return result
+
+
+async def run_inference_async(bundle: ModelBundle, reshaped_input: np.ndarray) -> np.ndarray:
+    """
+    Versão assíncrona de `run_inference`: aguarda o micro-batcher sem ocupar
+    uma thread, ou executa o modelo no threadpool quando o batching está desligado.
+    """
+    key, cached = _cached_prediction(bundle, reshaped_input)
+    if cached is not None:
+        return cached
+
+    if bundle.batcher is not None:
+        result = await asyncio.wrap_future(bundle.batcher.submit(reshaped_input[0]))
+        result = result.reshape(1, -1)
+    else:
+        result = await run_in_threadpool(request_profiler.bind(bundle.model.predict), reshaped_input, verbose=0)
+
+    if key is not None:
+        prediction_cache.put(key, bundle.version, result)
+    return result
+
+
+async def fetch_price_history(codigo_acao: str) -> PriceHistory:
+    """
+    Histórico de preços do ticker sem bloquear o event loop.
+    Acertos no cache retornam direto; caso contrário, requisições concorrentes
+    para o mesmo ticker compartilham uma única busca (single-flight), executada
+    no pool dedicado e limitada a FETCH_TIMEOUT_SECONDS por requisição.
+    """
+    history = price_cache.get_if_fresh(codigo_acao)
+    if history is not None:
+        return history
+
+    ticker = codigo_acao.upper()
+    loop = asyncio.get_running_loop()
+    return await price_fetches.do(
+        ticker,
+        lambda: loop.run_in_executor(fetch_executor, request_profiler.bind(price_cache.get), ticker),
+        timeout=FETCH_TIMEOUT_SECONDS,
+    )
+
+
+def auto_prediction_result(ticker: str, history: PriceHistory, predicted_price: float,
+                           bundle: ModelBundle) -> dict:
+    """Corpo da resposta do /predict-auto: últimos preços e previsão do próximo pregão."""
+    return {
+        "codigo_acao": ticker,
+        "historical_prices": history.closes[-WINDOW_SIZE:].tolist(),
+        "predicted_next_day_close_price": predicted_price,
+        "last_known_date": history.last_date.strftime('%Y-%m-%d'),
+        "prediction_date": (history.last_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+        "model_version": bundle.version
     }
-    
-    logger.info(f"Request processed: {json.dumps(log_data)}")
-    
-    return response
+
+
+async def prewarm_prediction(ticker: str, close_date: date) -> Tuple[str, dict]:
+    """
+    Atualiza o histórico do ticker na fonte até o pregão de `close_date`,
+    inclusive (mesmo dentro do TTL do cache), e calcula a previsão do
+    /predict-auto. Retorna (versão do modelo, resultado).
+    """
+    bundle = acquire_model(ticker)
+    if bundle is None:
+        raise RuntimeError("Modelo não carregado")
+    try:
+        loop = asyncio.get_running_loop()
+        history = await asyncio.wait_for(
+            loop.run_in_executor(fetch_executor, functools.partial(price_cache.get, ticker, force=True,
+                                                                   through=close_date)),
+            timeout=FETCH_TIMEOUT_SECONDS)
+        if len(history) < WINDOW_SIZE:
+            raise ValueError(f"Dados insuficientes: {len(history)} dias")
+        scaled_input = scale_prices(bundle.scaler, history.closes[-WINDOW_SIZE:])
+        prediction_scaled = await run_inference_async(bundle, np.reshape(scaled_input, (1, WINDOW_SIZE, 1)))
+        predicted_price = float(inverse_scale_prices(bundle.scaler, prediction_scaled)[0][0])
+        return bundle.version, auto_prediction_result(ticker, history, predicted_price, bundle)
+    finally:
+        bundle.release()
+
+
+popularity = PopularityTracker(half_life_seconds=PREWARM_HALF_LIFE_HOURS * 3600)
+prewarm = PrewarmScheduler(prewarm_prediction, popularity, top_n=PREWARM_TOP_N,
+                           concurrency=PREWARM_CONCURRENCY, close_time=PREWARM_CLOSE_TIME,
+                           jitter_seconds=PREWARM_JITTER_SECONDS) if PREWARM_ENABLED else None
+
+
+def run_inference_chunked(bundle: ModelBundle, scaled_windows: np.ndarray) -> np.ndarray:
+    """
+    Executa o modelo sobre N janelas já escalonadas (N, WINDOW_SIZE), em chunks
+    de INFERENCE_CHUNK_SIZE para limitar a memória. Retorna (N,) escalonado.
+    """
+    n = scaled_windows.shape[0]
+    outputs = np.empty(n, dtype=np.float64)
+    windows32 = np.ascontiguousarray(scaled_windows, dtype=np.float32)
+
+    # Apenas as janelas ausentes do cache de previsões vão para o modelo
+    keys: List[Optional[bytes]] = [None] * n
+    pending = np.arange(n)
+    if prediction_cache is not None:
+        missing = []
+        for i in range(n):
+            keys[i] = prediction_cache.key(windows32[i])
+            cached = prediction_cache.get(keys[i], bundle.version)
+            if cached is None:
+                missing.append(i)
+            else:
+                outputs[i] = cached[0]
+        pending = np.asarray(missing, dtype=np.int64)
+
+    for start in range(0, len(pending), INFERENCE_CHUNK_SIZE):
+        rows = pending[start:start + INFERENCE_CHUNK_SIZE]
+        chunk = windows32[rows].reshape(len(rows), WINDOW_SIZE, 1)
+        result = bundle.model.predict(chunk, verbose=0).reshape(-1)
+        outputs[rows] = result
+        if prediction_cache is not None:
+            for i, value in zip(rows, result):
+                prediction_cache.put(keys[i], bundle.version, value)
+    return outputs
+
+# Perfilamento: instalado só quando ligado, dentro do controle de admissão (perfila apenas
+# as requisições admitidas)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# Controle de admissão (dentro do middleware de métricas, que registra também as recusas)
+ADMISSION_ROUTES = {
+    "/predict": "inference",
+    "/predict/batch": "inference",
+    "/predict-auto/{codigo_acao}": "fetch",
+    "/forecast/{codigo_acao}": "fetch",
+    "/forecast": "fetch",
+}
+admission_limiters: Dict[str, ConcurrencyLimiter] = {}
+if INFERENCE_MAX_CONCURRENT > 0:
+    admission_limiters["inference"] = ConcurrencyLimiter("inference", INFERENCE_MAX_CONCURRENT,
+                                                         INFERENCE_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS)
+if FETCH_MAX_CONCURRENT > 0:
+    admission_limiters["fetch"] = ConcurrencyLimiter("fetch", FETCH_MAX_CONCURRENT,
+                                                     FETCH_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS)
+rate_limiters: Dict[str, ClientRateLimiter] = {}
+if FETCH_RATE_LIMIT_PER_SECOND > 0:
+    rate_limiters["fetch"] = ClientRateLimiter(FETCH_RATE_LIMIT_PER_SECOND, FETCH_RATE_LIMIT_BURST)
+app.add_middleware(AdmissionMiddleware, routes=app.router.routes, route_classes=ADMISSION_ROUTES,
+                   limiters=admission_limiters, rate_limiters=rate_limiters, client_header=CLIENT_ID_HEADER)
+
+# Monitoramento de performance: latência por rota e cabeçalho X-Process-Time
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
+
+def collect_component_metrics() -> List[MetricFamily]:
+    """
+    Métricas dos caches, do micro-batcher e do pool de modelos, lidas dos
+    contadores que esses componentes já mantêm.
+    """
+    def family(name, kind, help_text, value, labels=None):
+        return name, kind, help_text, [(name, labels or {}, value)]
+
+    price = price_cache.stats()
+    fetches = price_fetches.stats()
+    pool = model_pool.stats()
+    families = [
+        family("price_cache_hits_total", "counter", "Acertos do cache de histórico", price["hits"]),
+        family("price_cache_misses_total", "counter", "Falhas do cache de histórico", price["misses"]),
+        family("price_cache_incremental_refreshes_total", "counter",
+               "Atualizações incrementais do cache de histórico", price["incremental_refreshes"]),
+        family("price_cache_hit_ratio", "gauge", "Taxa de acerto do cache de histórico", price["hit_rate"]),
+        family("price_cache_bytes", "gauge", "Memória ocupada pelo cache de histórico", price["bytes"]),
+        family("price_fetches_shared_total", "counter",
+               "Buscas de histórico atendidas por uma busca já em andamento", fetches["shared"]),
+        family("model_pool_models", "gauge", "Modelos por ticker/grupo carregados", pool["models"]),
+        family("model_pool_bytes", "gauge", "Memória estimada dos modelos por ticker/grupo", pool["bytes"]),
+        family("model_pool_loads_total", "counter", "Cargas de modelos por ticker/grupo", pool["loads"]),
+        family("model_pool_evictions_total", "counter", "Modelos despejados do pool", pool["evictions"]),
+    ]
+    for name, limiter in admission_limiters.items():
+        admission = limiter.stats()
+        labels = {"endpoint_class": name}
+        families += [
+            family("admission_active_requests", "gauge", "Requisições em execução por classe de endpoint",
+                   admission["active"], labels),
+            family("admission_queue_depth", "gauge", "Requisições aguardando admissão", admission["queue_depth"], labels),
+            ("admission_rejected_total", "counter", "Requisições recusadas por sobrecarga (503)",
+             [("admission_rejected_total", {**labels, "reason": reason}, count)
+              for reason, count in admission["rejected_total"].items()]),
+        ]
+    for name, limiter in rate_limiters.items():
+        families.append(family("rate_limited_total", "counter", "Requisições recusadas pelo limite por cliente (429)",
+                               limiter.stats()["limited_total"], {"endpoint_class": name}))
+    if prewarm is not None:
+        warm = prewarm.stats()
+        families += [
+            family("prewarm_results", "gauge", "Tickers com previsão pré-calculada", warm["results"]),
+            ("prewarm_refreshes_total", "counter", "Atualizações de pré-aquecimento",
+             [("prewarm_refreshes_total", {"result": "ok"}, warm["refreshed_total"]),
+              ("prewarm_refreshes_total", {"result": "error"}, warm["failed_total"])]),
+            ("prewarm_served_total", "counter", "Respostas do /predict-auto servidas do pré-aquecimento",
+             [("prewarm_served_total", {"freshness": freshness}, count)
+              for freshness, count in warm["served_total"].items()]),
+        ]
+    if prediction_cache is not None:
+        cache = prediction_cache.stats()
+        families += [
+            family("prediction_cache_hits_total", "counter", "Acertos do cache de previsões", cache["hits"]),
+            family("prediction_cache_misses_total", "counter", "Falhas do cache de previsões", cache["misses"]),
+            family("prediction_cache_hit_ratio", "gauge", "Taxa de acerto do cache de previsões", cache["hit_rate"]),
+        ]
+
+    bundle = model_registry.current
+    if bundle is not None and bundle.inference_pool is not None:
+        workers = bundle.inference_pool.stats()
+        families += [
+            family("inference_workers", "gauge", "Processos de inferência", workers["workers"]),
+            family("inference_workers_available", "gauge", "Processos de inferência em funcionamento",
+                   workers["available"]),
+            family("inference_worker_jobs_total", "counter", "Lotes executados nos processos de inferência",
+                   workers["jobs_total"]),
+            family("inference_worker_errors_total", "counter", "Falhas nos processos de inferência",
+                   workers["errors_total"]),
+            family("inference_worker_restarts_total", "counter", "Processos de inferência reiniciados",
+                   workers["restarts_total"]),
+        ]
+    if bundle is not None and bundle.batcher is not None:
+        batching = bundle.batcher.stats()
+        histogram = batching["batch_size_histogram"]
+        counts = [histogram[f"le_{b}"] for b in BATCH_SIZE_BUCKETS] + [histogram["le_inf"]]
+        families += [
+            ("inference_batch_size", "histogram", "Tamanho dos lotes do micro-batching",
+             histogram_samples("inference_batch_size", {}, BATCH_SIZE_BUCKETS, counts,
+                               batching["avg_batch_size"] * batching["batches_total"])),
+            family("inference_queue_depth", "gauge", "Requisições aguardando lote", batching["queue_depth"]),
+        ]
+    return families
+
+
+metrics.register_collector(collect_component_metrics)
 
 # --- 3. Definição dos Schemas de Dados (Pydantic) ---
 class StockHistory(BaseModel):
@@ -122,131 +764,764 @@ class PredictionResponse(BaseModel):
     Schema de saída da API.
     """
     predicted_next_day_close_price: float
+    model_version: Optional[str] = None
+
+    class Config:
+        protected_namespaces = ()
+
+class BatchStockHistory(BaseModel):
+    """
+    Schema de entrada do endpoint em lote.
+    Informe `windows` (várias janelas de WINDOW_SIZE preços) ou `series`
+    (uma série longa, cortada em janelas deslizantes), mas não ambos.
+    """
+    windows: Optional[List[List[float]]] = None
+    series: Optional[List[float]] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "windows": [
+                    [150.0 + i * 0.5 for i in range(60)],
+                    [180.0 + i * 0.2 for i in range(60)]
+                ]
+            }
+        }
+
+class BatchPredictionResponse(BaseModel):
+    """
+    Schema de saída do endpoint em lote.
+    No modo `series`, a previsão i corresponde ao dia seguinte à janela que
+    termina no índice i + WINDOW_SIZE - 1 da série.
+    """
+    predictions: List[float]
+    count: int
+    model_version: Optional[str] = None
+
+    class Config:
+        protected_namespaces = ()
+
+class ForecastRequest(BaseModel):
+    """
+    Schema de entrada da previsão de vários dias para uma lista de tickers.
+    """
+    tickers: List[str]
+    horizon: int = Field(5, ge=1, le=FORECAST_MAX_HORIZON)
+
+    class Config:
+        json_schema_extra = {
+            "example": {"tickers": ["AAPL", "MSFT"], "horizon": 10}
+        }
+
+class ForecastPoint(BaseModel):
+    date: str
+    predicted_close_price: float
+
+class TickerForecast(BaseModel):
+    """
+    Trajetória prevista de um ticker, um ponto por dia útil após `last_known_date`.
+    """
+    codigo_acao: str
+    last_known_date: str
+    horizon: int
+    forecast: List[ForecastPoint]
+    model_version: Optional[str] = None
+
+    class Config:
+        protected_namespaces = ()
+
+class ForecastResponse(BaseModel):
+    """
+    Schema de saída da previsão em lote. Tickers que falharam aparecem em `errors`.
+    """
+    forecasts: List[TickerForecast]
+    errors: Dict[str, str] = {}
+
+# --- Corpo das requisições: JSON (padrão) ou binário (application/x-float32) ---
+def request_body_openapi(schema: Type[BaseModel]) -> dict:
+    """Documenta no OpenAPI os dois formatos aceitos no corpo da requisição."""
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": schema.model_json_schema()},
+        binary_format.MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+    }}}
+
+
+# Resposta binária documentada ao lado do JSON (escolhida pelo cabeçalho Accept)
+BINARY_RESPONSE_DOC = {200: {"content": {binary_format.MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}}}}
+
+
+async def parse_prices_body(request: Request, schema: Type[BaseModel]) -> Union[BaseModel, np.ndarray]:
+    """
+    Lê o corpo conforme o Content-Type. No formato binário devolve o array
+    float32 apoiado nos bytes recebidos (sem cópia); nos demais, valida o JSON
+    com `schema`, com o mesmo erro 422 da validação automática do FastAPI.
+    """
+    body = await request.body()
+    if binary_format.is_binary(request.headers.get("content-type")):
+        try:
+            return binary_format.decode_array(body)
+        except binary_format.BinaryFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return schema.model_validate_json(body)
+    except ValidationError as e:
+        errors = [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        raise RequestValidationError(errors, body=body)
+
+
+async def stock_history_body(request: Request) -> Union[StockHistory, np.ndarray]:
+    return await parse_prices_body(request, StockHistory)
+
+
+async def batch_history_body(request: Request) -> Union[BatchStockHistory, np.ndarray]:
+    return await parse_prices_body(request, BatchStockHistory)
+
+
+def binary_response(values, bundle: ModelBundle) -> Response:
+    """Previsões no formato binário; a versão do modelo vai no cabeçalho X-Model-Version."""
+    return Response(binary_format.encode_array(values), media_type=binary_format.MEDIA_TYPE,
+                    headers={"X-Model-Version": bundle.version, "Vary": "Accept"})
+
 
 # --- 4. Endpoints da API ---
+# Os health checks são async: não dependem do threadpool, que pode estar ocupado pela inferência
 @app.get("/", tags=["Health Check"])
-def read_root():
+async def read_root():
     """
     Endpoint de verificação de saúde.
     """
-    if model is None or scaler is None:
+    if model_registry.current is None:
         return {"status": "AVISO: API está no ar, mas os artefatos do modelo não foram carregados."}
     return {"status": "API está funcionando e o modelo está carregado."}
 
 
-@app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
-def predict_stock_price(stock_data: StockHistory):
+@app.get("/health/live", tags=["Health Check"])
+async def liveness():
+    """
+    Probe de vida: o processo está respondendo (não depende do modelo).
+    """
+    return {"status": "alive", "uptime_seconds": round(time.perf_counter() - _IMPORT_STARTED, 1)}
+
+
+@app.get("/health/ready", tags=["Health Check"])
+async def readiness():
+    """
+    Probe de prontidão: 200 quando o modelo padrão está carregado e aquecido,
+    503 enquanto não estiver ou quando nenhum processo de inferência está em
+    funcionamento. Inclui a duração de cada fase da inicialização.
+    """
+    bundle = model_registry.current
+    body = {
+        "status": "ready" if bundle is not None else ("unavailable" if startup_error else "starting"),
+        "model_version": bundle.version if bundle is not None else None,
+        "startup": {**startup_timer.as_dict(), "error": startup_error},
+    }
+    if bundle is not None and bundle.inference_pool is not None:
+        available = bundle.inference_pool.available
+        body["inference_workers"] = {"workers": bundle.inference_pool.workers, "available": available}
+        if available == 0:
+            body["status"] = "unavailable"
+    if body["status"] != "ready":
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@app.get("/metrics", tags=["Monitoring"], response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Métricas no formato texto do Prometheus: latência por rota e por etapa
+    (validation, scaling, inference, fetch, serialization), taxas de acerto
+    dos caches, tamanho dos lotes e uso do pool de modelos.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/batching", tags=["Monitoring"])
+def batching_metrics():
+    """
+    Métricas do micro-batching: profundidade da fila e distribuição do tamanho dos lotes.
+    """
+    bundle = model_registry.current
+    if bundle is None or bundle.batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **bundle.batcher.stats()}
+
+
+@app.get("/metrics/price-cache", tags=["Monitoring"])
+def price_cache_metrics():
+    """
+    Métricas do cache de histórico de preços: ocupação, acertos e despejos.
+    """
+    return {**price_cache.stats(), "fetches": price_fetches.stats()}
+
+
+@app.get("/metrics/prediction-cache", tags=["Monitoring"])
+def prediction_cache_metrics():
+    """
+    Métricas do cache de previsões: acertos, falhas e invalidações por troca de modelo.
+    """
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+
+@app.get("/metrics/model-pool", tags=["Monitoring"])
+def model_pool_metrics():
+    """
+    Métricas dos modelos por ticker: modelos carregados, memória, cargas e despejos.
+    """
+    return model_pool.stats()
+
+
+@app.get("/metrics/admission", tags=["Monitoring"])
+def admission_metrics():
+    """
+    Controle de admissão: requisições em execução, fila e recusas por classe
+    de endpoint, e recusas pelo limite por cliente.
+    """
+    return {
+        "limits": {name: limiter.stats() for name, limiter in admission_limiters.items()},
+        "rate_limits": {name: limiter.stats() for name, limiter in rate_limiters.items()},
+    }
+
+
+@app.get("/metrics/prewarm", tags=["Monitoring"])
+def prewarm_metrics():
+    """
+    Pré-aquecimento: próxima execução, resultado da última, atualizações e
+    respostas servidas (atualizadas ou desatualizadas).
+    """
+    if prewarm is None:
+        return {"enabled": False}
+    return {"enabled": True, **prewarm.stats(), "top_tickers": popularity.top(prewarm.top_n)}
+
+
+@app.get("/metrics/streaming", tags=["Monitoring"])
+def streaming_metrics():
+    """
+    Métricas do streaming: tickers inscritos, memória ocupada e despejos.
+    """
+    bundle = model_registry.current
+    if bundle is None:
+        return {"enabled": False}
+    return {"enabled": True, **bundle.stream_store.stats()}
+
+
+@app.post("/predict", response_model=PredictionResponse, tags=["Prediction"],
+          openapi_extra=request_body_openapi(StockHistory), responses=BINARY_RESPONSE_DOC)
+@request_profiler.threaded
+def predict_stock_price(stock_data: Union[StockHistory, np.ndarray] = Depends(stock_history_body),
+                        bundle: Optional[ModelBundle] = Depends(model_bundle),
+                        accept: Optional[str] = Header(None)):
     """
     Recebe os últimos 60 dias de preços de fechamento e prevê o preço do próximo dia.
+    Aceita e devolve também o formato binário `application/x-float32` (60
+    preços float32; a resposta é um array com o preço previsto).
     """
-    logger.info("Endpoint /predict chamado")
+    logger.debug("Endpoint /predict chamado")
     
-    if model is None or scaler is None:
-        logger.error("Modelo ou escalonador não carregados")
-        raise HTTPException(status_code=503,
-                            detail="Modelo ou escalonador não estão carregados. Verifique os logs do servidor.")
+    if bundle is None:
+        raise_model_unavailable()
 
-    input_data = stock_data.historical_prices
+    if isinstance(stock_data, np.ndarray):
+        input_data = stock_data.reshape(-1)
+    else:
+        input_data = stock_data.historical_prices
 
     # 1. Validar o tamanho da entrada
-    if len(input_data)!= WINDOW_SIZE:
-        logger.warning(f"Entrada inválida: {len(input_data)} preços fornecidos, esperado {WINDOW_SIZE}")
-        raise HTTPException(status_code=400,
-                            detail=f"A entrada deve conter exatamente {WINDOW_SIZE} preços históricos.")
+    with request_metrics.stage("validation"):
+        if len(input_data)!= WINDOW_SIZE:
+            logger.warning(f"Entrada inválida: {len(input_data)} preços fornecidos, esperado {WINDOW_SIZE}")
+            raise HTTPException(status_code=400,
+                                detail=f"A entrada deve conter exatamente {WINDOW_SIZE} preços históricos.")
+        input_array = np.array(input_data, dtype=np.float64).reshape(-1, 1)
 
     try:
-        # 2. Pré-processamento (Converter, Escalonar, Remodelar)
-        input_array = np.array(input_data).reshape(-1, 1)
-        scaled_input = scaler.transform(input_array)
-        reshaped_input = np.reshape(scaled_input, (1, WINDOW_SIZE, 1))
+        # 2. Pré-processamento (Escalonar, Remodelar)
+        with request_metrics.stage("scaling"):
+            scaled_input = bundle.scaler.transform(input_array)
+            reshaped_input = np.reshape(scaled_input, (1, WINDOW_SIZE, 1))
 
         # 3. Fazer a previsão
-        prediction_start = time.time()
-        prediction_scaled = model.predict(reshaped_input, verbose=0)
-        prediction_time = time.time() - prediction_start
+        with request_metrics.stage("inference"):
+            prediction_scaled = run_inference(bundle, reshaped_input)
 
         # 4. Desfazer o escalonamento
-        prediction = scaler.inverse_transform(prediction_scaled)
+        with request_metrics.stage("scaling"):
+            prediction = bundle.scaler.inverse_transform(prediction_scaled)
         predicted_price = float(prediction[0][0])
 
-        # 5. Log da previsão
-        logger.info(f"Previsão realizada em {prediction_time:.4f}s - Preço previsto: ${predicted_price:.2f}")
-        
-        return {"predicted_next_day_close_price": predicted_price}
+        if binary_format.accepts_binary(accept):
+            return binary_response([predicted_price], bundle)
+        return {"predicted_next_day_close_price": predicted_price, "model_version": bundle.version}
 
     except Exception as e:
         logger.error(f"Erro durante previsão: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Erro interno durante a previsão: {str(e)}")
 
 
+@app.post("/predict/batch", response_model=BatchPredictionResponse, tags=["Prediction"],
+          openapi_extra=request_body_openapi(BatchStockHistory), responses=BINARY_RESPONSE_DOC)
+@request_profiler.threaded
+def predict_stock_price_batch(batch_data: Union[BatchStockHistory, np.ndarray] = Depends(batch_history_body),
+                              bundle: Optional[ModelBundle] = Depends(model_bundle),
+                              accept: Optional[str] = Header(None)):
+    """
+    Recebe várias janelas de 60 preços (ou uma série longa) e prevê o preço do
+    dia seguinte de cada janela em uma única requisição.
+    No formato binário `application/x-float32`, um array 2-D (N, 60) são as
+    janelas e um 1-D é a série; a resposta binária é o array das previsões.
+    """
+    logger.debug("Endpoint /predict/batch chamado")
+
+    if bundle is None:
+        raise_model_unavailable()
+
+    if isinstance(batch_data, np.ndarray):
+        windows_data, series_data = (batch_data, None) if batch_data.ndim == 2 else (None, batch_data)
+    else:
+        windows_data, series_data = batch_data.windows, batch_data.series
+
+    if (windows_data is None) == (series_data is None):
+        raise HTTPException(status_code=400,
+                            detail="Informe exatamente um dos campos: 'windows' ou 'series'.")
+
+    # 1. Validar e montar a matriz (N, WINDOW_SIZE)
+    try:
+        with request_metrics.stage("validation"):
+            if windows_data is not None:
+                windows = np.asarray(windows_data, dtype=np.float64)
+                if windows.ndim != 2 or windows.shape[1] != WINDOW_SIZE:
+                    raise ValueError(f"Cada janela deve conter exatamente {WINDOW_SIZE} preços históricos.")
+            else:
+                windows = sliding_windows(series_data, WINDOW_SIZE)
+    except ValueError as e:
+        logger.warning(f"Entrada em lote inválida: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if windows.shape[0] == 0:
+        raise HTTPException(status_code=400, detail="Nenhuma janela informada.")
+    if windows.shape[0] > BATCH_ENDPOINT_MAX_WINDOWS:
+        raise HTTPException(status_code=400,
+                            detail=f"No máximo {BATCH_ENDPOINT_MAX_WINDOWS} janelas por requisição.")
+
+    try:
+        # 2. Escalonar todas as janelas de uma vez e fazer a previsão em chunks
+        with request_metrics.stage("scaling"):
+            scaled_windows = scale_prices(bundle.scaler, windows)
+
+        with request_metrics.stage("inference"):
+            predictions_scaled = run_inference_chunked(bundle, scaled_windows)
+
+        with request_metrics.stage("scaling"):
+            predictions = inverse_scale_prices(bundle.scaler, predictions_scaled)
+
+        if binary_format.accepts_binary(accept):
+            return binary_response(predictions, bundle)
+        return {"predictions": predictions.tolist(), "count": len(predictions), "model_version": bundle.version}
+
+    except Exception as e:
+        logger.error(f"Erro durante previsão em lote: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erro interno durante a previsão: {str(e)}")
+
+
 @app.get("/predict-auto/{codigo_acao}", tags=["Prediction"])
-def predict_stock_auto(codigo_acao: str):
+async def predict_stock_auto(codigo_acao: str, response: Response,
+                             bundle: Optional[ModelBundle] = Depends(model_bundle)):
     """
     Busca automaticamente os últimos 60 dias de preços do código da ação e faz a previsão.
     Exemplo: /predict-auto/AAPL
     """
-    logger.info(f"Endpoint /predict-auto chamado para {codigo_acao}")
+    logger.debug(f"Endpoint /predict-auto chamado para {codigo_acao}")
     
-    if model is None or scaler is None:
-        logger.error("Modelo ou escalonador não carregados")
-        raise HTTPException(status_code=503,
-                            detail="Modelo ou escalonador não estão carregados. Verifique os logs do servidor.")
+    if bundle is None:
+        raise_model_unavailable()
+
+    ticker = codigo_acao.upper()
+    if prewarm is not None:
+        # Resultado pré-calculado após o último fechamento; até a atualização de um novo
+        # fechamento terminar, o último resultado bom é servido marcado como desatualizado
+        prewarmed = prewarm.lookup(ticker, bundle.version)
+        if prewarmed is not None:
+            result, stale = prewarmed
+            popularity.record(ticker)
+            age = (datetime.now(timezone.utc) - result.computed_at).total_seconds()
+            response.headers["Age"] = str(max(0, int(age)))
+            return {**result.value, "freshness": {
+                "source": "prewarm",
+                "computed_at": result.computed_at.isoformat(),
+                "age_seconds": round(age, 3),
+                "stale": stale,
+            }}
 
     try:
-        # 1. Baixar os últimos 60+ dias de dados
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=90)
-        
-        logger.info(f"Baixando dados para {codigo_acao} de {start_date.date()} até {end_date.date()}")
-        df = yf.download(codigo_acao.upper(), start=start_date.strftime('%Y-%m-%d'), 
-                        end=end_date.strftime('%Y-%m-%d'), progress=False)
+        # 1. Obter os últimos 90 dias de preços (cache em memória + busca incremental)
+        fetch_start = time.perf_counter()
+        with request_metrics.stage("fetch"):
+            history = await fetch_price_history(codigo_acao)
+        fetch_time = time.perf_counter() - fetch_start
         
-        if df.empty:
+        if len(history) == 0:
             logger.warning(f"Nenhum dado encontrado para {codigo_acao}")
             raise HTTPException(status_code=404, 
                               detail=f"Não foi possível obter dados para o código {codigo_acao}. Verifique se o símbolo está correto.")
         
-        # 2. Processar o DataFrame
-        if isinstance(df.columns, pd.MultiIndex):
-            df.columns = df.columns.get_level_values(0)
-        
-        close_prices = df['Close'].values
-        logger.info(f"Total de {len(close_prices)} preços obtidos para {codigo_acao}")
+        # 2. Extrair os preços de fechamento
+        close_prices = history.closes
+        logger.debug(f"Total de {len(close_prices)} preços obtidos para {codigo_acao}")
         
-        # 4. Pegar os últimos 60 valores
+        # 3. Pegar os últimos 60 valores
         if len(close_prices) < WINDOW_SIZE:
             logger.error(f"Dados insuficientes para {codigo_acao}: {len(close_prices)} dias")
             raise HTTPException(status_code=400,
                               detail=f"Dados insuficientes. Necessário {WINDOW_SIZE} dias, mas obteve apenas {len(close_prices)}.")
         
-        last_60_prices = close_prices[-WINDOW_SIZE:].tolist()
+        # 4. Pré-processamento
+        preprocess_start = time.perf_counter()
+        with request_metrics.stage("scaling"):
+            scaled_input = scale_prices(bundle.scaler, close_prices[-WINDOW_SIZE:])
+            reshaped_input = np.reshape(scaled_input, (1, WINDOW_SIZE, 1))
+        preprocess_time = time.perf_counter() - preprocess_start
         
         # 5. Fazer a previsão
-        input_array = np.array(last_60_prices).reshape(-1, 1)
-        scaled_input = scaler.transform(input_array)
-        reshaped_input = np.reshape(scaled_input, (1, WINDOW_SIZE, 1))
+        prediction_start = time.perf_counter()
+        with request_metrics.stage("inference"):
+            prediction_scaled = await run_inference_async(bundle, reshaped_input)
+        prediction_time = time.perf_counter() - prediction_start
         
-        prediction_start = time.time()
-        prediction_scaled = model.predict(reshaped_input, verbose=0)
-        prediction_time = time.time() - prediction_start
+        with request_metrics.stage("scaling"):
+            predicted_price = float(inverse_scale_prices(bundle.scaler, prediction_scaled)[0][0])
         
-        prediction = scaler.inverse_transform(prediction_scaled)
-        predicted_price = float(prediction[0][0])
-        
-        logger.info(f"Previsão para {codigo_acao} realizada em {prediction_time:.4f}s - Preço previsto: ${predicted_price:.2f}")
+        response.headers["Server-Timing"] = (f"fetch;dur={fetch_time * 1000:.2f}, "
+                                             f"preprocess;dur={preprocess_time * 1000:.2f}, "
+                                             f"inference;dur={prediction_time * 1000:.2f}")
+        logger.debug(f"Previsão para {codigo_acao} realizada - busca {fetch_time:.4f}s, "
+                    f"pré-processamento {preprocess_time:.4f}s, inferência {prediction_time:.4f}s - "
+                    f"Preço previsto: ${predicted_price:.2f}")
         
         # 6. Retornar dados históricos + previsão
-        return {
-            "codigo_acao": codigo_acao.upper(),
-            "historical_prices": last_60_prices,
-            "predicted_next_day_close_price": predicted_price,
-            "last_known_date": df.index[-1].strftime('%Y-%m-%d'),
-            "prediction_date": (df.index[-1] + timedelta(days=1)).strftime('%Y-%m-%d')
-        }
+        if prewarm is not None:
+            popularity.record(ticker)
+        return auto_prediction_result(ticker, history, predicted_price, bundle)
     
     except HTTPException:
         raise
 
+    except asyncio.TimeoutError:
+        logger.error(f"Tempo esgotado ao buscar dados para {codigo_acao} ({FETCH_TIMEOUT_SECONDS}s)")
+        raise HTTPException(status_code=504,
+                            detail=f"A fonte de dados não respondeu em {FETCH_TIMEOUT_SECONDS}s para {codigo_acao}.")
+
     except Exception as e:
         logger.error(f"Erro durante previsão automática para {codigo_acao}: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Erro interno durante a previsão: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro interno durante a previsão: {str(e)}")
+
+
+def acquire_models(tickers: List[str]) -> Tuple[Dict[str, ModelBundle], Dict[str, Tuple[int, str]]]:
+    """
+    Adquire o modelo de cada ticker. Retorna os modelos (liberar com `release()`)
+    e os erros (status, detalhe) dos tickers sem modelo disponível.
+    """
+    models: Dict[str, ModelBundle] = {}
+    errors: Dict[str, Tuple[int, str]] = {}
+    for ticker in tickers:
+        try:
+            bundle = acquire_model(ticker)
+        except HTTPException as e:
+            errors[ticker] = (e.status_code, e.detail)
+            continue
+        if bundle is None:
+            errors[ticker] = (503, "Modelo ou escalonador não estão carregados. Verifique os logs do servidor.")
+        else:
+            models[ticker] = bundle
+    return models, errors
+
+
+async def forecast_tickers(models: Dict[str, ModelBundle], horizon: int) -> Tuple[List[dict], Dict[str, Tuple[int, str]]]:
+    """
+    Busca o histórico de todos os tickers em paralelo e faz o rollout em um
+    único lote por modelo. Retorna as previsões e os erros (status, detalhe) por ticker.
+    """
+    tickers = list(models)
+    with request_metrics.stage("fetch"):
+        histories = await asyncio.gather(*[fetch_price_history(t) for t in tickers], return_exceptions=True)
+
+    valid: List[Tuple[str, PriceHistory]] = []
+    errors: Dict[str, Tuple[int, str]] = {}
+    for ticker, history in zip(tickers, histories):
+        if isinstance(history, asyncio.TimeoutError):
+            errors[ticker] = (504, f"A fonte de dados não respondeu em {FETCH_TIMEOUT_SECONDS}s para {ticker}.")
+        elif isinstance(history, Exception):
+            logger.error(f"Erro ao buscar dados para {ticker}: {history}")
+            errors[ticker] = (500, f"Erro ao buscar dados: {history}")
+        elif len(history) == 0:
+            errors[ticker] = (404, f"Não foi possível obter dados para o código {ticker}. Verifique se o símbolo está correto.")
+        elif len(history) < WINDOW_SIZE:
+            errors[ticker] = (400, f"Dados insuficientes. Necessário {WINDOW_SIZE} dias, mas obteve apenas {len(history)}.")
+        else:
+            valid.append((ticker, history))
+
+    if not valid:
+        return [], errors
+
+    # Tickers que compartilham o modelo (padrão ou de grupo) fazem o rollout juntos
+    groups: Dict[int, List[Tuple[str, PriceHistory]]] = {}
+    for ticker, history in valid:
+        groups.setdefault(id(models[ticker]), []).append((ticker, history))
+
+    forecasts_by_ticker = {}
+    rollout_start = time.perf_counter()
+    for group in groups.values():
+        bundle = models[group[0][0]]
+        with request_metrics.stage("scaling"):
+            windows = np.stack([history.closes[-WINDOW_SIZE:] for _, history in group])
+            scaled_windows = scale_prices(bundle.scaler, windows)
+        with request_metrics.stage("inference"):
+            predictions_scaled = await run_in_threadpool(request_profiler.bind(recursive_forecast),
+                                                         bundle.state_model, scaled_windows, horizon)
+        with request_metrics.stage("scaling"):
+            predictions = inverse_scale_prices(bundle.scaler, predictions_scaled)
+
+        for (ticker, history), path in zip(group, predictions):
+            dates = forecast_dates(history.last_date, horizon)
+            forecasts_by_ticker[ticker] = {
+                "codigo_acao": ticker,
+                "last_known_date": history.last_date.strftime('%Y-%m-%d'),
+                "horizon": horizon,
+                "forecast": [{"date": d, "predicted_close_price": float(p)} for d, p in zip(dates, path)],
+                "model_version": bundle.version
+            }
+    rollout_time = time.perf_counter() - rollout_start
+
+    logger.debug(f"Rollout de {horizon} dias para {len(valid)} tickers ({len(groups)} modelos) "
+                f"realizado em {rollout_time:.4f}s")
+
+    return [forecasts_by_ticker[ticker] for ticker, _ in valid], errors
+
+
+@app.get("/forecast/{codigo_acao}", response_model=TickerForecast, tags=["Prediction"])
+async def forecast_stock(codigo_acao: str, horizon: int = Query(5, ge=1, le=FORECAST_MAX_HORIZON),
+                         bundle: Optional[ModelBundle] = Depends(model_bundle)):
+    """
+    Prevê a trajetória de preços dos próximos `horizon` dias úteis.
+    Exemplo: /forecast/AAPL?horizon=10
+    """
+    logger.debug(f"Endpoint /forecast chamado para {codigo_acao} (horizonte {horizon})")
+
+    if bundle is None:
+        raise_model_unavailable()
+
+    ticker = codigo_acao.upper()
+    try:
+        forecasts, errors = await forecast_tickers({ticker: bundle}, horizon)
+    except Exception as e:
+        logger.error(f"Erro durante previsão de {horizon} dias para {ticker}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erro interno durante a previsão: {str(e)}")
+
+    if ticker in errors:
+        status_code, detail = errors[ticker]
+        raise HTTPException(status_code=status_code, detail=detail)
+    return forecasts[0]
+
+
+@app.post("/forecast", response_model=ForecastResponse, tags=["Prediction"])
+async def forecast_stocks(request: ForecastRequest):
+    """
+    Prevê a trajetória de vários tickers de uma vez, com um rollout em lote por modelo.
+    """
+    logger.debug(f"Endpoint /forecast (lote) chamado para {len(request.tickers)} tickers")
+
+    tickers = list(dict.fromkeys(t.upper() for t in request.tickers))
+    if not tickers:
+        raise HTTPException(status_code=400, detail="Informe pelo menos um ticker.")
+    if len(tickers) > FORECAST_MAX_TICKERS:
+        raise HTTPException(status_code=400,
+                            detail=f"No máximo {FORECAST_MAX_TICKERS} tickers por requisição.")
+
+    models, errors = await run_in_threadpool(acquire_models, tickers)
+    if not models and all(status_code == 503 for status_code, _ in errors.values()):
+        raise_model_unavailable()
+
+    try:
+        forecasts, fetch_errors = await forecast_tickers(models, request.horizon)
+    except Exception as e:
+        logger.error(f"Erro durante previsão em lote de {request.horizon} dias: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erro interno durante a previsão: {str(e)}")
+    finally:
+        for bundle in models.values():
+            bundle.release()
+
+    errors.update(fetch_errors)
+    return {"forecasts": forecasts, "errors": {t: detail for t, (_, detail) in errors.items()}}
+
+
+def migrate_stream_ticker(bundle: ModelBundle, ticker: str) -> bool:
+    """
+    Leva um ticker do streaming da versão anterior do modelo para a atual:
+    a janela é convertida para preços com o escalonador antigo, reescalonada
+    com o novo e o estado da LSTM é recalculado.
+    """
+    if retired_stream is None:
+        return False
+    old_store, old_scaler = retired_stream
+    window = old_store.window(ticker)
+    if window is None:
+        return False
+    bundle.stream_store.seed(ticker, scale_prices(bundle.scaler, inverse_scale_prices(old_scaler, window)))
+    old_store.remove(ticker)
+    return True
+
+
+async def handle_stream_message(message: dict) -> dict:
+    """
+    Processa uma mensagem do streaming e devolve a resposta para o cliente.
+    Cada mensagem usa a versão atual do modelo do ticker: uma recarga vale a
+    partir da próxima barra.
+    """
+    ticker, prices, price = parse_stream_message(message)
+    bundle = await run_in_threadpool(acquire_model, ticker)
+    if bundle is None:
+        raise ValueError("Modelo ou escalonador não estão carregados.")
+    try:
+        return await _stream_prediction(bundle, ticker, prices, price)
+    finally:
+        bundle.release()
+
+
+async def _stream_prediction(bundle: ModelBundle, ticker: str, prices: Optional[list],
+                             price: Optional[float]) -> dict:
+    """Inicializa ou avança o ticker no estado de streaming do modelo dele."""
+    stream_store = bundle.stream_store
+    scaler = bundle.scaler
+
+    if price is not None:
+        if ticker not in stream_store and not migrate_stream_ticker(bundle, ticker):
+            raise ValueError(f"Ticker {ticker} não inicializado. Envie 'prices' com {WINDOW_SIZE} preços "
+                             f"ou apenas o 'ticker' para usar o histórico do servidor.")
+        with request_metrics.stage("inference"):
+            output, bars_seen, resynced = stream_store.update(ticker, float(scale_prices(scaler, price)))
+    else:
+        if prices is None:
+            with request_metrics.stage("fetch"):
+                history = await fetch_price_history(ticker)
+            if len(history) < WINDOW_SIZE:
+                raise ValueError(f"Dados insuficientes para {ticker}: {len(history)} dias")
+            prices = history.closes[-WINDOW_SIZE:]
+        with request_metrics.stage("inference"):
+            output, bars_seen = stream_store.seed(ticker, scale_prices(scaler, prices))
+        resynced = True
+
+    return {
+        "ticker": ticker,
+        "predicted_next_day_close_price": float(inverse_scale_prices(scaler, output)),
+        "bars_seen": bars_seen,
+        "resynced": resynced,
+        "model_version": bundle.version,
+    }
+
+
+@app.websocket("/ws/predict")
+async def stream_predictions(websocket: WebSocket):
+    """
+    Previsão em streaming: o servidor mantém a janela e o estado da LSTM de cada
+    ticker, e cada nova barra custa um único passo do modelo.
+
+    Mensagens (JSON):
+      {"ticker": "AAPL", "prices": [...60 preços...]}  inicializa o ticker
+      {"ticker": "AAPL"}                               inicializa com o histórico do servidor
+      {"ticker": "AAPL", "price": 231.2}               novo fechamento -> previsão atualizada
+    """
+    await websocket.accept()
+
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (ValueError, KeyError):
+                await websocket.send_json({"error": "Mensagem JSON inválida"})
+                continue
+
+            try:
+                await websocket.send_json(await handle_stream_message(message))
+            except ValueError as e:
+                await websocket.send_json({"error": str(e)})
+            except HTTPException as e:
+                await websocket.send_json({"error": e.detail})
+            except asyncio.TimeoutError:
+                await websocket.send_json({"error": f"A fonte de dados não respondeu em {FETCH_TIMEOUT_SECONDS}s."})
+            except Exception as e:
+                logger.error(f"Erro no streaming: {str(e)}", exc_info=True)
+                await websocket.send_json({"error": f"Erro interno durante a previsão: {str(e)}"})
+    except WebSocketDisconnect:
+        logger.info("Cliente de streaming desconectado")
+
+
+@app.post("/admin/reload", tags=["Admin"])
+async def reload_model(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """
+    Recarrega os artefatos do diretório de modelos. A nova versão é carregada e
+    aquecida em segundo plano e trocada atomicamente; requisições em andamento
+    terminam com a versão anterior, liberada quando a última delas acaba.
+    Com `force=true`, recarrega mesmo que a versão em disco seja a atual e
+    descarta os modelos por ticker, que voltam a ser carregados no próximo uso.
+    """
+    require_admin(x_admin_token)
+    previous = model_registry.current
+    if force:
+        model_pool.clear()
+    else:
+        model_pool.reload_groups()
+    try:
+        bundle = await run_in_threadpool(model_registry.reload, force)
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao recarregar o modelo: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500,
+                            detail=f"Erro ao recarregar o modelo (a versão atual foi mantida): {str(e)}")
+
+    return {
+        "reloaded": bundle is not None,
+        "model_version": model_registry.current.version if model_registry.current else None,
+        "previous_version": previous.version if previous else None,
+    }
+
+
+@app.get("/admin/model", tags=["Admin"])
+def model_info(x_admin_token: Optional[str] = Header(None)):
+    """
+    Versão do modelo em uso, versões ainda drenando e contadores de recarga.
+    """
+    require_admin(x_admin_token)
+    bundle = model_registry.current
+    inference_workers = bundle.inference_pool.stats() if bundle and bundle.inference_pool else None
+    return {"backend": INFERENCE_BACKEND, "precision": MODEL_PRECISION, **model_registry.stats(),
+            "inference_workers": inference_workers}
+
+
+@app.get("/admin/profiles", tags=["Admin"])
+def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Perfis de requisições guardados (mais recentes primeiro), sem a tabela de funções.
+    """
+    require_admin(x_admin_token)
+    if not PROFILING_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, "sample_rate": PROFILE_SAMPLE_RATE, **request_profiler.store.stats(),
+            "items": request_profiler.store.summaries()}
+
+
+@app.get("/admin/profiles/{profile_id}", tags=["Admin"])
+def get_profile(profile_id: str, format: str = Query("json", pattern="^(json|text)$"),
+                x_admin_token: Optional[str] = Header(None)):
+    """
+    Perfil de uma requisição (id do cabeçalho X-Profile-Id): funções com maior
+    tempo acumulado no event loop e nas threads. Com `format=text`, a saída do pstats.
+    """
+    require_admin(x_admin_token)
+    profile = request_profiler.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Perfil {profile_id} não encontrado.")
+    if format == "text":
+        return PlainTextResponse(profile["text"])
+    return profile
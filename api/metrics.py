@@ -0,0 +1,260 @@
+"""
+Métricas em memória expostas no formato texto do Prometheus.
+
+Contadores e histogramas com rótulos são atualizados no caminho das
+requisições com um lock por métrica e nenhuma alocação além da primeira
+ocorrência de cada combinação de rótulos. Métricas que já existem em outros
+componentes (caches, micro-batcher, pool) entram por coletores, chamados
+apenas na leitura do endpoint.
+
+`RequestMetrics` mede a latência por rota (middleware ASGI) e por etapa da
+requisição (`stage`); a etapa "serialization" é o tempo entre o fim da
+última etapa medida e o início da resposta.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Faixas (segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (nome, rótulos, valor)
+Sample = Tuple[str, Dict[str, str], float]
+# (nome, tipo, descrição, amostras)
+MetricFamily = Tuple[str, str, str, List[Sample]]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def render(families: Iterable[MetricFamily]) -> str:
+    """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def histogram_samples(name: str, labels: Dict[str, str], buckets: Sequence[float],
+                      counts: Sequence[int], total: float) -> List[Sample]:
+    """
+    Amostras de um histograma a partir das contagens por faixa (não
+    acumuladas; a última posição é a faixa +Inf).
+    """
+    samples: List[Sample] = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + [float("inf")], counts):
+        cumulative += count
+        samples.append((f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+    samples.append((f"{name}_sum", labels, total))
+    samples.append((f"{name}_count", labels, cumulative))
+    return samples
+
+
+class Counter:
+    """Contador monotônico com rótulos."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            items = list(self._values.items())
+        samples = [(self.name, dict(zip(self.labelnames, key)), value) for key, value in items]
+        return self.name, "counter", self.help, samples
+
+
+class Histogram:
+    """Histograma com rótulos: contagem por faixa, soma e total de observações."""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagens por faixa (+Inf por último), soma]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series is not None else 0
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        samples: List[Sample] = []
+        for key, counts, total in items:
+            samples += histogram_samples(self.name, dict(zip(self.labelnames, key)), self.buckets, counts, total)
+        return self.name, "histogram", self.help, samples
+
+
+class MetricsRegistry:
+    """Conjunto de métricas e coletores exportados juntos por `render()`."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """`collector()` devolve famílias de métricas calculadas na hora da leitura."""
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        families = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        return render(self.collect())
+
+
+class _RequestTimings:
+    __slots__ = ("scope", "last_stage_end")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.last_stage_end: Optional[float] = None
+
+    @property
+    def route(self) -> str:
+        # O FastAPI grava a rota encontrada no scope; até lá (ou em um 404) não há rota
+        route = self.scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+
+_current_request: ContextVar[Optional[_RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+class RequestMetrics:
+    """Latência por rota e por etapa das requisições."""
+
+    def __init__(self, registry: MetricsRegistry, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.requests = registry.counter("http_requests_total", "Requisições HTTP por rota e status",
+                                         ("method", "route", "status"))
+        self.latency = registry.histogram("http_request_duration_seconds",
+                                          "Latência até o início da resposta, por rota",
+                                          ("method", "route"), buckets)
+        self.stages = registry.histogram("request_stage_duration_seconds",
+                                         "Duração de cada etapa das requisições, por rota",
+                                         ("route", "stage"), buckets)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mede uma etapa (ex.: "validation", "scaling", "inference", "fetch")."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            timings = _current_request.get()
+            self.stages.observe(end - start, timings.route if timings is not None else "none", name)
+            if timings is not None:
+                timings.last_stage_end = end
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra a latência por rota e adiciona o cabeçalho
+    X-Process-Time. Por ser ASGI puro, não cria tarefas nem copia o corpo da
+    resposta como o `BaseHTTPMiddleware`.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            token = _current_request.set(_RequestTimings(scope))
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _current_request.reset(token)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = _RequestTimings(scope)
+        token = _current_request.set(timings)
+        start = time.perf_counter()
+        responded = False
+
+        def record(status: int, now: float) -> None:
+            route = timings.route
+            self.metrics.latency.observe(now - start, scope["method"], route)
+            self.metrics.requests.inc(scope["method"], route, str(status))
+            if timings.last_stage_end is not None:
+                self.metrics.stages.observe(now - timings.last_stage_end, route, "serialization")
+
+        async def send_with_metrics(message):
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                responded = True
+                record(message["status"], now)
+                headers = list(message.get("headers", []))
+                headers.append((b"x-process-time", str(now - start).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not responded:
+                record(500, time.perf_counter())
+            raise
+        finally:
+            _current_request.reset(token)
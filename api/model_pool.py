@@ -0,0 +1,227 @@
+"""
+Modelos por ticker (ou grupo de tickers) carregados sob demanda.
+
+Os artefatos de um ticker ficam em `<models_dir>/<TICKER>/` e os de um grupo
+em `<models_dir>/<grupo>/`, com os tickers de cada grupo listados em
+`<models_dir>/groups.json` (ex.: {"bancos": ["ITUB4.SA", "BBDC4.SA"]}).
+Tickers sem artefatos próprios usam o modelo padrão do registro.
+
+Cada modelo é carregado no primeiro uso (uma única carga mesmo com
+requisições concorrentes) e fica em um LRU limitado por quantidade e por
+memória. Um modelo despejado continua atendendo as requisições que já o
+adquiriram e é liberado quando elas terminam.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api.model_registry import ModelBundle, artifact_signature, artifact_version
+
+logger = logging.getLogger(__name__)
+
+# Nomes aceitos como diretório de artefatos (impede caminhos como "../")
+_ARTIFACT_KEY = re.compile(r"^[A-Z0-9^][A-Z0-9.^=_-]*$", re.IGNORECASE)
+
+
+class _Entry:
+    __slots__ = ("bundle", "signature", "checked_at")
+
+    def __init__(self, bundle: ModelBundle, signature: Optional[tuple], checked_at: float):
+        self.bundle = bundle
+        self.signature = signature
+        self.checked_at = checked_at
+
+
+class ModelPool:
+    """
+    LRU de modelos por ticker/grupo. `loader(version, model_path, scaler_path)`
+    carrega um `ModelBundle`; o tamanho de cada um vem de `bundle.nbytes`.
+    A cada `check_interval` segundos o uso de um modelo confere se os arquivos
+    mudaram em disco; nesse caso a nova versão é carregada no lugar da antiga.
+    A resolução ticker -> artefatos também é guardada por `check_interval`
+    segundos (até `max_resolved` tickers), para não consultar o disco a cada
+    requisição; `invalidate()` a descarta.
+    """
+
+    def __init__(self, models_dir: str, loader: Callable[[str, str, str], ModelBundle],
+                 max_bytes: int = 512 * 1024 * 1024, max_models: int = 256,
+                 check_interval: float = 30.0, max_resolved: int = 10000,
+                 model_filename: str = "stock_lstm_model.h5", scaler_filename: str = "scaler.pkl",
+                 groups_filename: str = "groups.json",
+                 clock: Callable[[], float] = time.monotonic):
+        if max_models < 1:
+            raise ValueError("max_models deve ser maior ou igual a 1")
+        self.models_dir = models_dir
+        self.max_bytes = max_bytes
+        self.max_models = max_models
+        self.check_interval = check_interval
+        self.max_resolved = max_resolved
+        self.model_filename = model_filename
+        self.scaler_filename = scaler_filename
+        self.groups_path = os.path.join(models_dir, groups_filename)
+        self._loader = loader
+        self._clock = clock
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._groups: Dict[str, str] = {}
+        # ticker -> (diretório de artefatos ou None, instante da resolução)
+        self._resolved: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+        self.hits = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+
+        self.reload_groups()
+
+    # --- Resolução ticker -> artefatos ---
+    def reload_groups(self) -> None:
+        """Relê o mapeamento de grupos (`groups.json`)."""
+        groups: Dict[str, str] = {}
+        if os.path.exists(self.groups_path):
+            try:
+                with open(self.groups_path, "r", encoding="utf-8") as f:
+                    for group, tickers in json.load(f).items():
+                        for ticker in tickers:
+                            groups[ticker.upper()] = group
+            except (OSError, ValueError, AttributeError, TypeError) as e:
+                logger.error(f"Arquivo de grupos inválido ({self.groups_path}): {e}")
+        self._groups = groups
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Descarta as resoluções guardadas (ex.: após uma recarga dos modelos)."""
+        with self._lock:
+            self._resolved.clear()
+
+    def artifact_paths(self, key: str) -> Tuple[str, str]:
+        directory = os.path.join(self.models_dir, key)
+        return os.path.join(directory, self.model_filename), os.path.join(directory, self.scaler_filename)
+
+    def _has_artifacts(self, key: str) -> bool:
+        return bool(_ARTIFACT_KEY.match(key)) and all(os.path.isfile(p) for p in self.artifact_paths(key))
+
+    def resolve(self, ticker: str) -> Optional[str]:
+        """Diretório de artefatos do ticker (próprio ou do grupo), ou None para o modelo padrão."""
+        ticker = ticker.upper()
+        now = self._clock()
+        with self._lock:
+            cached = self._resolved.get(ticker)
+            if cached is not None and now - cached[1] < self.check_interval:
+                self._resolved.move_to_end(ticker)
+                return cached[0]
+
+        key = None
+        if self._has_artifacts(ticker):
+            key = ticker
+        else:
+            group = self._groups.get(ticker)
+            if group is not None and self._has_artifacts(group):
+                key = group
+
+        with self._lock:
+            self._resolved[ticker] = (key, now)
+            self._resolved.move_to_end(ticker)
+            while len(self._resolved) > self.max_resolved:
+                self._resolved.popitem(last=False)
+        return key
+
+    # --- Uso ---
+    def acquire(self, ticker: str) -> Optional[ModelBundle]:
+        """
+        Modelo do ticker já adquirido (o chamador deve chamar `release()`),
+        ou None quando o ticker não tem artefatos próprios.
+        """
+        key = self.resolve(ticker)
+        if key is None:
+            return None
+
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.checked_at < self.check_interval:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.bundle.acquire()
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Uma única carga por chave: quem chega depois espera e reaproveita o resultado
+        with key_lock:
+            paths = self.artifact_paths(key)
+            signature = artifact_signature(*paths)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.signature == signature:
+                    entry.checked_at = self._clock()
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.bundle.acquire()
+
+            try:
+                start = time.perf_counter()
+                bundle = self._loader(artifact_version(*paths), *paths)
+            except Exception:
+                self.load_failures += 1
+                raise
+            logger.info(f"Modelo '{key}' (versão {bundle.version}) carregado em {time.perf_counter() - start:.2f}s")
+
+            with self._lock:
+                previous = self._entries.pop(key, None)
+                self._entries[key] = _Entry(bundle, signature, self._clock())
+                bundle.acquire()
+                self.loads += 1
+                evicted = self._evict()
+
+        if previous is not None:
+            previous.bundle.retire()
+        for old in evicted:
+            old.retire()
+        return bundle
+
+    def clear(self) -> None:
+        """Descarta todos os modelos (recarregados no próximo uso) e relê os grupos."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.bundle.retire()
+        self.reload_groups()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.bundle.nbytes for entry in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "models": len(self._entries),
+                "max_models": self.max_models,
+                "bytes": self.nbytes,
+                "max_bytes": self.max_bytes,
+                "groups": len(set(self._groups.values())),
+                "hits": self.hits,
+                "loads": self.loads,
+                "load_failures": self.load_failures,
+                "evictions": self.evictions,
+                "loaded": [{"key": key, "model_version": entry.bundle.version,
+                            "bytes": entry.bundle.nbytes, "in_flight": entry.bundle.in_flight}
+                           for key, entry in self._entries.items()],
+            }
+
+    # --- Internos (chamados com o lock adquirido) ---
+    def _evict(self) -> List[ModelBundle]:
+        evicted = []
+        # O modelo recém-carregado (último do LRU) nunca é despejado
+        while len(self._entries) > 1 and (len(self._entries) > self.max_models or self.nbytes > self.max_bytes):
+            key, entry = self._entries.popitem(last=False)
+            logger.info(f"Modelo '{key}' despejado do pool")
+            evicted.append(entry.bundle)
+            self.evictions += 1
+        return evicted
@@ -0,0 +1,260 @@
+"""
+Registro de versões do modelo com recarga a quente.
+
+Uma versão carregada (`ModelBundle`) reúne o modelo, o escalonador e os
+componentes que dependem deles. O registro carrega e aquece a nova versão
+fora do caminho das requisições e a publica com uma troca atômica de
+referência. Requisições em andamento seguram a versão que adquiriram; a
+versão antiga só é liberada depois que a última delas termina.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_version(*paths: str) -> str:
+    """
+    Versão dos artefatos: hash do conteúdo dos arquivos (modelo, escalonador).
+    Muda sempre que qualquer um deles é substituído.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_signature(*paths: str) -> Optional[tuple]:
+    """Assinatura barata (mtime, tamanho) dos arquivos, ou None se algum faltar."""
+    try:
+        return tuple((os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in paths)
+    except FileNotFoundError:
+        return None
+
+
+class ReloadInProgress(RuntimeError):
+    """Já existe uma recarga em andamento."""
+
+
+class ModelBundle:
+    """
+    Uma versão carregada dos artefatos. `extras` guarda componentes ligados a
+    esta versão (ex.: batcher, estado do streaming); os que tiverem `close()`
+    são encerrados quando a versão é liberada. `nbytes` é a memória estimada.
+    """
+
+    def __init__(self, version: str, model, scaler, state_model=None, nbytes: int = 0, **extras):
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.state_model = state_model
+        self.nbytes = nbytes
+        self.extras = extras
+        self.loaded_at = time.time()
+
+        self._lock = threading.Lock()
+        self._refs = 0
+        self._retired = False
+        self.closed = False
+
+    def __getattr__(self, name):
+        extras = self.__dict__.get("extras", {})
+        if name in extras:
+            return extras[name]
+        raise AttributeError(name)
+
+    @property
+    def in_flight(self) -> int:
+        return self._refs
+
+    def acquire(self) -> "ModelBundle":
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self) -> None:
+        with self._lock:
+            self._refs -= 1
+            drained = self._retired and self._refs == 0
+        if drained:
+            self.close()
+
+    def retire(self) -> None:
+        """Marca a versão como substituída; ela é liberada ao drenar."""
+        with self._lock:
+            self._retired = True
+            drained = self._refs == 0
+        if drained:
+            self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        for component in self.extras.values():
+            close = getattr(component, "close", None)
+            if callable(close):
+                close()
+        logger.info(f"Versão {self.version} do modelo liberada")
+
+
+class ModelRegistry:
+    """
+    Mantém a versão atual do modelo e troca de versão sem bloquear requisições.
+
+    `version_fn` calcula a versão dos artefatos em disco e `loader(version)`
+    carrega e aquece um `ModelBundle`. Com `poll_interval` > 0, uma thread
+    observa `signature_fn` e recarrega quando os arquivos mudam (esperando a
+    assinatura ficar estável por um ciclo, para não ler arquivos pela metade).
+    Artefatos que falharam ao carregar só são tentados de novo quando mudam.
+    """
+
+    def __init__(self, loader: Callable[[str], ModelBundle], version_fn: Callable[[], str],
+                 signature_fn: Optional[Callable[[], Optional[tuple]]] = None,
+                 poll_interval: float = 0.0,
+                 on_swap: Optional[Callable[[Optional[ModelBundle], ModelBundle], None]] = None):
+        self._loader = loader
+        self._version_fn = version_fn
+        self._signature_fn = signature_fn
+        self.poll_interval = poll_interval
+        self._on_swap = on_swap
+
+        self._current: Optional[ModelBundle] = None
+        self._draining: List[ModelBundle] = []
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loaded_signature: Optional[tuple] = None
+        self._failed_signature: Optional[tuple] = None
+
+        self.reloads = 0
+        self.failed_reloads = 0
+
+    @property
+    def current(self) -> Optional[ModelBundle]:
+        return self._current
+
+    def acquire(self) -> Optional[ModelBundle]:
+        """Versão atual já adquirida (o chamador deve chamar `release()`), ou None."""
+        with self._lock:
+            bundle = self._current
+            return bundle.acquire() if bundle is not None else None
+
+    @contextmanager
+    def use(self) -> Iterator[Optional[ModelBundle]]:
+        """Adquire a versão atual pelo tempo da requisição (None se não houver modelo)."""
+        bundle = self.acquire()
+        try:
+            yield bundle
+        finally:
+            if bundle is not None:
+                bundle.release()
+
+    def reload(self, force: bool = False) -> Optional[ModelBundle]:
+        """
+        Carrega os artefatos em disco e publica a nova versão. Retorna a nova
+        versão, ou None se a versão em disco já é a atual (e `force` é falso).
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgress("Já existe uma recarga do modelo em andamento")
+        try:
+            signature = self._signature_fn() if self._signature_fn else None
+            version = self._version_fn()
+            current = self._current
+            if current is not None and current.version == version and not force:
+                self._loaded_signature = signature
+                return None
+
+            try:
+                start = time.perf_counter()
+                bundle = self._loader(version)
+            except Exception:
+                self.failed_reloads += 1
+                self._failed_signature = signature
+                raise
+            logger.info(f"Versão {version} do modelo carregada e aquecida em "
+                        f"{time.perf_counter() - start:.2f}s")
+
+            with self._lock:
+                previous = self._current
+                self._current = bundle
+                if previous is not None:
+                    self._draining.append(previous)
+            self._loaded_signature = signature
+            self._failed_signature = None
+            self.reloads += 1
+
+            if self._on_swap is not None:
+                self._on_swap(previous, bundle)
+            if previous is not None:
+                logger.info(f"Modelo trocado: {previous.version} -> {version} "
+                            f"({previous.in_flight} requisições ainda usando a versão anterior)")
+                previous.retire()
+            return bundle
+        finally:
+            self._reload_lock.release()
+
+    # --- Observação do diretório de modelos ---
+    def start_watcher(self) -> None:
+        if self.poll_interval <= 0 or self._signature_fn is None or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        """Para o observador e libera a versão atual."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(self.poll_interval + 1)
+            self._watcher = None
+        with self._lock:
+            current, self._current = self._current, None
+        if current is not None:
+            current.retire()
+
+    def _watch(self) -> None:
+        pending: Optional[tuple] = None
+        while not self._stop.wait(self.poll_interval):
+            signature = self._signature_fn()
+            if signature is None or signature in (self._loaded_signature, self._failed_signature):
+                pending = None
+                continue
+            if signature != pending:
+                # Arquivos mudaram: esperar um ciclo para garantir que a escrita terminou
+                pending = signature
+                continue
+            pending = None
+            try:
+                self.reload()
+            except ReloadInProgress:
+                pass
+            except Exception as e:
+                # Só tenta de novo quando os arquivos mudarem (mtime/tamanho)
+                logger.error(f"Falha ao recarregar o modelo: {e}; aguardando nova alteração dos arquivos",
+                             exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._draining = [b for b in self._draining if not b.closed]
+            current = self._current
+            return {
+                "model_version": current.version if current else None,
+                "loaded_at": current.loaded_at if current else None,
+                "in_flight": current.in_flight if current else 0,
+                "draining": [{"model_version": b.version, "in_flight": b.in_flight} for b in self._draining],
+                "reloads": self.reloads,
+                "failed_reloads": self.failed_reloads,
+                "waiting_for_new_artifacts": self._failed_signature is not None,
+                "watch_interval_seconds": self.poll_interval,
+            }
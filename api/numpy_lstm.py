@@ -0,0 +1,405 @@
+"""
+Motor de inferência LSTM em NumPy puro.
+
+Lê os pesos do `stock_lstm_model.h5` gerado pelo `train_model.py` (pilha de
+camadas LSTM seguida de camadas Dense) e executa o forward pass em lote sem
+importar TensorFlow/Keras. As camadas de Dropout são ignoradas, como na
+inferência do Keras.
+
+Os pesos também podem ser exportados em precisão reduzida (`save_npz` com
+"float16" ou "int8" por coluna) para um `.npz` compacto, que é carregado
+sem h5py e convertido de volta para float32 (o BLAS da CPU opera em float32).
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_DENSE_ACTIVATIONS = ("linear", "relu", "tanh", "sigmoid")
+
+# Precisões aceitas na exportação dos pesos
+PRECISIONS = ("float32", "float16", "int8")
+
+
+def quantize_array(a: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Reduz a precisão de uma matriz de pesos. Em "int8" a quantização é
+    simétrica por coluna (unidade de saída): devolve os inteiros e a escala.
+    """
+    a = np.asarray(a, dtype=np.float32)
+    if precision == "float32":
+        return a, None
+    if precision == "float16":
+        return a.astype(np.float16), None
+    if precision == "int8":
+        scale = np.abs(a).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        return np.clip(np.rint(a / scale), -127, 127).astype(np.int8), scale.astype(np.float32)
+    raise ValueError(f"Precisão '{precision}' não suportada (use uma de {PRECISIONS})")
+
+
+def dequantize_array(q: np.ndarray, scale: Optional[np.ndarray] = None) -> np.ndarray:
+    """Inverso de `quantize_array`: pesos em float32."""
+    a = np.asarray(q, dtype=np.float32)
+    return a * scale if scale is not None else a
+
+
+def _sigmoid_(a: np.ndarray) -> np.ndarray:
+    """Sigmoide logística in-place."""
+    with np.errstate(over="ignore"):
+        np.negative(a, out=a)
+        np.exp(a, out=a)
+    a += 1.0
+    np.reciprocal(a, out=a)
+    return a
+
+
+class LSTMLayer:
+    """Pesos de uma camada LSTM no layout do Keras (portas i, f, c, o)."""
+
+    def __init__(self, kernel: np.ndarray, recurrent_kernel: np.ndarray, bias: np.ndarray,
+                 return_sequences: bool, name: str = "lstm"):
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.recurrent_kernel = np.ascontiguousarray(recurrent_kernel, dtype=np.float32)
+        self.bias = np.ascontiguousarray(bias, dtype=np.float32)
+        self.units = self.recurrent_kernel.shape[0]
+        self.return_sequences = return_sequences
+        self.name = name
+
+        if self.kernel.shape[1] != 4 * self.units or self.bias.shape != (4 * self.units,):
+            raise ValueError(f"Pesos inconsistentes na camada LSTM '{name}'")
+
+
+class DenseLayer:
+    """Pesos de uma camada Dense."""
+
+    def __init__(self, kernel: np.ndarray, bias: np.ndarray, activation: str = "linear",
+                 name: str = "dense"):
+        if activation not in _DENSE_ACTIVATIONS:
+            raise ValueError(f"Ativação '{activation}' não suportada na camada '{name}'")
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.bias = np.ascontiguousarray(bias, dtype=np.float32)
+        self.activation = activation
+        self.name = name
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        out = x @ self.kernel
+        out += self.bias
+        if self.activation == "relu":
+            np.maximum(out, 0.0, out=out)
+        elif self.activation == "tanh":
+            np.tanh(out, out=out)
+        elif self.activation == "sigmoid":
+            _sigmoid_(out)
+        return out
+
+
+class LSTMState:
+    """
+    Estado recorrente de um lote: listas com h e c (N, unidades) por camada.
+    """
+
+    __slots__ = ("h", "c")
+
+    def __init__(self, h: List[np.ndarray], c: List[np.ndarray]):
+        self.h = h
+        self.c = c
+
+    def select(self, rows) -> "LSTMState":
+        """Cópia do estado apenas das linhas indicadas."""
+        return LSTMState([h[rows].copy() for h in self.h], [c[rows].copy() for c in self.c])
+
+
+class NumpyLSTMModel:
+    """
+    Pilha de LSTMs + Dense executada em NumPy.
+
+    Expõe `predict(x, verbose=0)` com a mesma assinatura usada pela API para o
+    modelo Keras, então os dois backends são intercambiáveis. Os buffers
+    intermediários são pré-alocados por thread e reaproveitados entre chamadas.
+    """
+
+    def __init__(self, lstm_layers: List[LSTMLayer], dense_layers: List[DenseLayer]):
+        if not lstm_layers:
+            raise ValueError("O modelo precisa de pelo menos uma camada LSTM")
+        for layer in lstm_layers[:-1]:
+            if not layer.return_sequences:
+                raise ValueError("Camadas LSTM intermediárias devem usar return_sequences=True")
+        if lstm_layers[-1].return_sequences:
+            raise ValueError("A última camada LSTM deve usar return_sequences=False")
+
+        self.lstm_layers = lstm_layers
+        self.dense_layers = dense_layers
+        self._local = threading.local()
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos pesos."""
+        arrays = [a for layer in self.lstm_layers for a in (layer.kernel, layer.recurrent_kernel, layer.bias)]
+        arrays += [a for layer in self.dense_layers for a in (layer.kernel, layer.bias)]
+        return sum(a.nbytes for a in arrays)
+
+    # --- Construção ---
+    @classmethod
+    def from_h5(cls, path: str) -> "NumpyLSTMModel":
+        """Carrega um modelo Sequential salvo pelo Keras no formato HDF5."""
+        # Importado aqui: só é necessário ao ler os pesos (o backend Keras nunca usa)
+        import h5py
+
+        with h5py.File(path, "r") as f:
+            config = f.attrs["model_config"]
+            if isinstance(config, bytes):
+                config = config.decode("utf-8")
+            config = json.loads(config)
+            if config.get("class_name") != "Sequential":
+                raise ValueError("Apenas modelos Sequential são suportados")
+
+            weights_group = f["model_weights"]
+
+            def read_weights(layer_name: str) -> List[np.ndarray]:
+                group = weights_group[layer_name]
+                names = [n.decode("utf-8") if isinstance(n, bytes) else n
+                         for n in group.attrs["weight_names"]]
+                return [np.asarray(group[n]) for n in names]
+
+            return cls._from_layer_configs(config["config"]["layers"], read_weights)
+
+    @classmethod
+    def from_npz(cls, path: str) -> "NumpyLSTMModel":
+        """Carrega pesos exportados por `save_npz` (em qualquer precisão)."""
+        with np.load(path, allow_pickle=False) as f:
+            return cls._from_arrays({name: f[name] for name in f.files})
+
+    @classmethod
+    def from_keras(cls, keras_model) -> "NumpyLSTMModel":
+        """Converte um modelo Keras já carregado em memória."""
+        layers = [{"class_name": layer.__class__.__name__, "config": layer.get_config()}
+                  for layer in keras_model.layers]
+        by_name = {layer.name: layer for layer in keras_model.layers}
+        return cls._from_layer_configs(layers, lambda name: by_name[name].get_weights())
+
+    @classmethod
+    def _from_layer_configs(cls, layer_configs, read_weights) -> "NumpyLSTMModel":
+        lstm_layers: List[LSTMLayer] = []
+        dense_layers: List[DenseLayer] = []
+
+        for layer in layer_configs:
+            kind = layer["class_name"]
+            cfg = layer["config"]
+            if kind in ("InputLayer", "Dropout"):
+                continue
+            if kind == "LSTM":
+                if dense_layers:
+                    raise ValueError("Camadas LSTM após camadas Dense não são suportadas")
+                if cfg.get("activation") != "tanh" or cfg.get("recurrent_activation") != "sigmoid":
+                    raise ValueError(f"Ativações não suportadas na camada '{cfg['name']}'")
+                if not cfg.get("use_bias", True) or cfg.get("go_backwards") or cfg.get("stateful"):
+                    raise ValueError(f"Configuração não suportada na camada '{cfg['name']}'")
+                kernel, recurrent_kernel, bias = read_weights(cfg["name"])
+                lstm_layers.append(LSTMLayer(kernel, recurrent_kernel, bias,
+                                             return_sequences=cfg.get("return_sequences", False),
+                                             name=cfg["name"]))
+            elif kind == "Dense":
+                if not cfg.get("use_bias", True):
+                    raise ValueError(f"Configuração não suportada na camada '{cfg['name']}'")
+                kernel, bias = read_weights(cfg["name"])
+                dense_layers.append(DenseLayer(kernel, bias, activation=cfg.get("activation", "linear"),
+                                               name=cfg["name"]))
+            else:
+                raise ValueError(f"Camada '{kind}' não suportada pelo backend NumPy")
+
+        return cls(lstm_layers, dense_layers)
+
+    # --- Exportação em precisão reduzida ---
+    def _to_arrays(self, precision: str) -> Dict[str, np.ndarray]:
+        # Só os kernels são quantizados; os vieses (poucos valores) ficam em float32
+        layers = []
+        arrays: Dict[str, np.ndarray] = {}
+
+        def put(prefix: str, a: np.ndarray) -> None:
+            q, scale = quantize_array(a, precision)
+            arrays[prefix] = q
+            if scale is not None:
+                arrays[f"{prefix}.scale"] = scale
+
+        for i, layer in enumerate(self.lstm_layers):
+            layers.append({"class_name": "LSTM", "name": layer.name, "return_sequences": layer.return_sequences})
+            put(f"lstm{i}/kernel", layer.kernel)
+            put(f"lstm{i}/recurrent_kernel", layer.recurrent_kernel)
+            arrays[f"lstm{i}/bias"] = layer.bias
+        for i, layer in enumerate(self.dense_layers):
+            layers.append({"class_name": "Dense", "name": layer.name, "activation": layer.activation})
+            put(f"dense{i}/kernel", layer.kernel)
+            arrays[f"dense{i}/bias"] = layer.bias
+        arrays["config"] = np.array(json.dumps({"precision": precision, "layers": layers}))
+        return arrays
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "NumpyLSTMModel":
+        def get(prefix: str) -> np.ndarray:
+            return dequantize_array(arrays[prefix], arrays.get(f"{prefix}.scale"))
+
+        config = json.loads(str(arrays["config"]))
+        lstm_layers: List[LSTMLayer] = []
+        dense_layers: List[DenseLayer] = []
+        for layer in config["layers"]:
+            if layer["class_name"] == "LSTM":
+                i = len(lstm_layers)
+                lstm_layers.append(LSTMLayer(get(f"lstm{i}/kernel"), get(f"lstm{i}/recurrent_kernel"),
+                                             arrays[f"lstm{i}/bias"],
+                                             return_sequences=layer["return_sequences"], name=layer["name"]))
+            else:
+                i = len(dense_layers)
+                dense_layers.append(DenseLayer(get(f"dense{i}/kernel"), arrays[f"dense{i}/bias"],
+                                               activation=layer["activation"], name=layer["name"]))
+        return cls(lstm_layers, dense_layers)
+
+    def weight_arrays(self) -> Dict[str, np.ndarray]:
+        """Pesos em float32 e a configuração ("config"), no formato de `from_arrays`."""
+        return self._to_arrays("float32")
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "NumpyLSTMModel":
+        """
+        Monta o modelo sobre arrays já existentes (ex.: em memória
+        compartilhada). Pesos float32 contíguos são usados sem cópia.
+        """
+        return cls._from_arrays(arrays)
+
+    def to_precision(self, precision: str) -> "NumpyLSTMModel":
+        """
+        Cópia do modelo com os pesos arredondados para `precision`, exatamente
+        como ficam depois de `save_npz` + `from_npz` (usada para avaliar a perda).
+        """
+        return self._from_arrays(self._to_arrays(precision))
+
+    def save_npz(self, path: str, precision: str = "float32") -> None:
+        """
+        Exporta os pesos em `precision`. A escrita é atômica (arquivo
+        temporário + rename), pois a API observa o diretório dos artefatos.
+        """
+        arrays = self._to_arrays(precision)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    # --- Buffers ---
+    def _buffer(self, key: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Devolve um buffer float32 com o formato pedido, reaproveitando a
+        alocação da thread atual sempre que ela for grande o suficiente.
+        """
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        size = int(np.prod(shape))
+        buf = buffers.get(key)
+        if buf is None or buf.size < size:
+            buf = buffers[key] = np.empty(size, dtype=np.float32)
+        return buf[:size].reshape(shape)
+
+    # --- Forward pass ---
+    @staticmethod
+    def _cell(z: np.ndarray, c: np.ndarray, h: np.ndarray, units: int) -> None:
+        """Atualiza (h, c) in-place a partir das pré-ativações z = xW + hU + b."""
+        i = z[:, :units]
+        f = z[:, units:2 * units]
+        g = z[:, 2 * units:3 * units]
+        o = z[:, 3 * units:]
+        _sigmoid_(z[:, :2 * units])
+        np.tanh(g, out=g)
+        _sigmoid_(o)
+        c *= f
+        g *= i
+        c += g
+        np.tanh(c, out=h)
+        h *= o
+
+    def _run_layer(self, index: int, layer: LSTMLayer, x_seq: np.ndarray) -> np.ndarray:
+        n, steps, _ = x_seq.shape
+        units = layer.units
+
+        # Projeção da entrada de todos os passos em uma única multiplicação
+        proj = self._buffer(f"proj{index}", (n, steps, 4 * units))
+        np.matmul(x_seq, layer.kernel, out=proj)
+        proj += layer.bias
+
+        h = self._buffer(f"h{index}", (n, units))
+        c = self._buffer(f"c{index}", (n, units))
+        z = self._buffer(f"z{index}", (n, 4 * units))
+        h.fill(0.0)
+        c.fill(0.0)
+
+        seq = self._buffer(f"seq{index}", (n, steps, units)) if layer.return_sequences else None
+        for t in range(steps):
+            np.matmul(h, layer.recurrent_kernel, out=z)
+            z += proj[:, t, :]
+            self._cell(z, c, h, units)
+            if seq is not None:
+                seq[:, t, :] = h
+        return seq if seq is not None else h
+
+    def _check_input(self, x) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[:, :, np.newaxis]
+        if x.ndim != 3 or x.shape[2] != self.lstm_layers[0].kernel.shape[0]:
+            raise ValueError(f"Formato de entrada inválido: {x.shape}")
+        return x
+
+    def _head(self, h: np.ndarray) -> np.ndarray:
+        out = h
+        for layer in self.dense_layers:
+            out = layer(out)
+        return np.array(out, dtype=np.float32, copy=True)
+
+    # --- Inferência com estado (rollout e streaming) ---
+    def encode(self, x) -> "LSTMState":
+        """
+        Processa a sequência inteira (N, passos, features) e devolve o estado
+        (h, c) final de cada camada, a partir do qual `step` continua a série.
+        """
+        x = self._check_input(x)
+        state = LSTMState([], [])
+        out = x
+        for index, layer in enumerate(self.lstm_layers):
+            seq = self._run_layer(index, layer, out)
+            units = layer.units
+            n = x.shape[0]
+            state.h.append(self._buffer(f"h{index}", (n, units)).copy())
+            state.c.append(self._buffer(f"c{index}", (n, units)).copy())
+            out = seq
+        return state
+
+    def output(self, state: "LSTMState") -> np.ndarray:
+        """Saída do modelo (N, saídas) para o estado atual da última camada."""
+        return self._head(state.h[-1])
+
+    def step(self, x_t, state: "LSTMState") -> np.ndarray:
+        """
+        Avança um único passo de tempo com a entrada (N, features), atualizando
+        `state` in-place, e devolve a nova saída (N, saídas). Custa um passo
+        de cada camada em vez de reprocessar a janela inteira.
+        """
+        inputs = np.asarray(x_t, dtype=np.float32).reshape(state.h[0].shape[0], -1)
+        for index, layer in enumerate(self.lstm_layers):
+            z = inputs @ layer.kernel
+            z += state.h[index] @ layer.recurrent_kernel
+            z += layer.bias
+            self._cell(z, state.c[index], state.h[index], layer.units)
+            inputs = state.h[index]
+        return self.output(state)
+
+    def predict(self, x, verbose: int = 0, batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Forward pass de um lote (N, passos, features). Retorna um novo array
+        (N, saídas) float32. `verbose` e `batch_size` existem apenas por
+        compatibilidade com `keras.Model.predict`.
+        """
+        out = self._check_input(x)
+        for index, layer in enumerate(self.lstm_layers):
+            out = self._run_layer(index, layer, out)
+        return self._head(out)
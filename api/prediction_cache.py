@@ -0,0 +1,81 @@
+"""
+Cache de resultados de inferência.
+
+A chave é um hash rápido (BLAKE2b) dos bytes da janela escalonada em
+float32, ou seja, exatamente a entrada que o modelo recebe. Cada entrada
+pertence a uma versão do modelo, então modelos diferentes (por ticker) e
+versões em transição compartilham o mesmo LRU sem se misturar; quando uma
+versão é substituída, `discard_version` remove suas entradas.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class PredictionCache:
+    """LRU limitado de saídas do modelo indexadas por versão e janela escalonada."""
+
+    def __init__(self, max_entries: int = 10000):
+        if max_entries < 1:
+            raise ValueError("max_entries deve ser maior ou igual a 1")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(scaled_window) -> bytes:
+        """Hash da janela escalonada, independente do formato (60,), (60, 1) ou (1, 60, 1)."""
+        data = np.ascontiguousarray(scaled_window, dtype=np.float32)
+        return hashlib.blake2b(data.tobytes(), digest_size=16).digest()
+
+    def get(self, key: bytes, version: str) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._entries.get((version, key))
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, version: str, value) -> None:
+        value = np.array(value, dtype=np.float32).reshape(-1)
+        with self._lock:
+            self._entries[(version, key)] = value
+            self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_version(self, version: str) -> int:
+        """Remove as entradas de uma versão substituída. Retorna quantas foram removidas."""
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == version]
+            for k in stale:
+                del self._entries[k]
+            if stale:
+                self.invalidations += 1
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "versions": len({version for version, _ in self._entries}),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
@@ -0,0 +1,53 @@
+"""
+Pré-processamento vetorizado das janelas de preços.
+
+O MinMaxScaler do treino é uma transformação afim por feature
+(x * scale_ + min_), então escalonar N janelas de uma vez é uma única
+operação NumPy, sem passar pelo `scaler.transform` linha a linha.
+"""
+import numpy as np
+
+
+def _affine_params(scaler):
+    """Retorna (escala, deslocamento) da única feature do escalonador, ou None."""
+    scale = getattr(scaler, "scale_", None)
+    offset = getattr(scaler, "min_", None)
+    if scale is None or offset is None:
+        return None
+    return float(np.ravel(scale)[0]), float(np.ravel(offset)[0])
+
+
+def scale_prices(scaler, prices) -> np.ndarray:
+    """
+    Escalona um array de preços de qualquer formato, preservando o formato.
+    Usa a forma afim do MinMaxScaler quando disponível.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    params = _affine_params(scaler)
+    if params is None:
+        return scaler.transform(prices.reshape(-1, 1)).reshape(prices.shape)
+    scale, offset = params
+    return prices * scale + offset
+
+
+def inverse_scale_prices(scaler, values) -> np.ndarray:
+    """Desfaz o escalonamento de um array de qualquer formato."""
+    values = np.asarray(values, dtype=np.float64)
+    params = _affine_params(scaler)
+    if params is None:
+        return scaler.inverse_transform(values.reshape(-1, 1)).reshape(values.shape)
+    scale, offset = params
+    return (values - offset) / scale
+
+
+def sliding_windows(series, window_size: int) -> np.ndarray:
+    """
+    Corta uma série 1-D em janelas deslizantes (N, window_size) sem copiar dados.
+    A janela i cobre os índices [i, i + window_size).
+    """
+    series = np.asarray(series, dtype=np.float64)
+    if series.ndim != 1:
+        raise ValueError("A série deve ser unidimensional")
+    if len(series) < window_size:
+        raise ValueError(f"A série deve conter pelo menos {window_size} preços")
+    return np.lib.stride_tricks.sliding_window_view(series, window_size)
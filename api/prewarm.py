@@ -0,0 +1,244 @@
+"""
+Pré-aquecimento das previsões dos tickers mais requisitados.
+
+O `PopularityTracker` conta as requisições por ticker com decaimento
+exponencial, de modo que a popularidade acompanha a demanda recente. Após
+cada fechamento do mercado (dias úteis, horário em UTC), o
+`PrewarmScheduler` atualiza o histórico dos `top_n` tickers mais populares e
+calcula a previsão do próximo pregão, com no máximo `concurrency`
+atualizações simultâneas e um atraso aleatório (jitter) no início, para não
+disparar todas as instâncias da API contra a fonte no mesmo instante.
+
+O último resultado bom de cada ticker fica guardado: enquanto a atualização
+de um novo fechamento não termina (ou se ela falhar), as requisições recebem
+esse resultado marcado como desatualizado, e a consulta dispara a atualização
+do ticker em segundo plano.
+
+Tudo roda no event loop da aplicação, então não há locks.
+"""
+import asyncio
+import heapq
+import logging
+import random
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def last_close(now: datetime, close_time: dtime) -> datetime:
+    """Fechamento mais recente (dia útil às `close_time` UTC) até `now`, inclusive."""
+    candidate = datetime.combine(now.date(), close_time, tzinfo=timezone.utc)
+    while candidate > now or candidate.weekday() >= 5:
+        candidate -= timedelta(days=1)
+    return candidate
+
+
+def next_close(now: datetime, close_time: dtime) -> datetime:
+    """Primeiro fechamento (dia útil às `close_time` UTC) estritamente depois de `now`."""
+    candidate = datetime.combine(now.date(), close_time, tzinfo=timezone.utc)
+    while candidate <= now or candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+class PopularityTracker:
+    """
+    Contagem de requisições por ticker com meia-vida de `half_life_seconds`.
+    Guarda no máximo `max_tickers` tickers (LRU).
+    """
+
+    def __init__(self, half_life_seconds: float = 86400.0, max_tickers: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.half_life = half_life_seconds
+        self.max_tickers = max_tickers
+        self._clock = clock
+        # ticker -> [pontuação, instante da última atualização]
+        self._scores: "OrderedDict[str, list]" = OrderedDict()
+
+    def _decayed(self, entry: list, now: float) -> float:
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life)
+
+    def record(self, ticker: str) -> None:
+        now = self._clock()
+        entry = self._scores.get(ticker)
+        if entry is None:
+            self._scores[ticker] = [1.0, now]
+            if len(self._scores) > self.max_tickers:
+                self._scores.popitem(last=False)
+            return
+        self._scores.move_to_end(ticker)
+        entry[0] = self._decayed(entry, now) + 1.0
+        entry[1] = now
+
+    def top(self, n: int) -> List[str]:
+        """Os `n` tickers mais populares, do mais para o menos requisitado."""
+        now = self._clock()
+        ranked = heapq.nlargest(n, self._scores.items(), key=lambda item: self._decayed(item[1], now))
+        return [ticker for ticker, _ in ranked]
+
+    def stats(self) -> dict:
+        return {"tickers": len(self._scores), "max_tickers": self.max_tickers,
+                "half_life_seconds": self.half_life}
+
+
+class PrewarmedResult:
+    __slots__ = ("value", "model_version", "computed_at")
+
+    def __init__(self, value: dict, model_version: str, computed_at: datetime):
+        self.value = value
+        self.model_version = model_version
+        self.computed_at = computed_at
+
+
+class PrewarmScheduler:
+    """
+    Atualiza periodicamente os tickers populares. `refresh(ticker, close_date)`
+    busca o histórico até o pregão de `close_date`, inclusive, e calcula a
+    previsão, retornando (versão do modelo, resultado).
+    `now` e `sleep` podem ser substituídos nos testes.
+    """
+
+    def __init__(self, refresh: Callable[[str, date], Awaitable[Tuple[str, dict]]], tracker: PopularityTracker,
+                 top_n: int = 50, concurrency: int = 4, close_time: dtime = dtime(21, 30),
+                 jitter_seconds: float = 600.0,
+                 now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.refresh = refresh
+        self.tracker = tracker
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.close_time = close_time
+        self.jitter_seconds = jitter_seconds
+        self._now = now
+        self._sleep = sleep
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.results: Dict[str, PrewarmedResult] = {}
+        self.runs_total = 0
+        self.refreshed_total = 0
+        self.failed_total = 0
+        self.served_total = {"fresh": 0, "stale": 0}
+        self.next_run_at: Optional[datetime] = None
+        self.last_run: Optional[dict] = None
+
+    def is_fresh(self, result: PrewarmedResult) -> bool:
+        """Calculado depois do fechamento mais recente."""
+        return result.computed_at >= last_close(self._now(), self.close_time)
+
+    def lookup(self, ticker: str, model_version: str) -> Optional[Tuple[PrewarmedResult, bool]]:
+        """
+        Último resultado bom do ticker para a versão do modelo, como
+        (resultado, desatualizado). Um resultado desatualizado dispara a
+        atualização do ticker em segundo plano.
+        """
+        result = self.results.get(ticker)
+        if result is None or result.model_version != model_version:
+            return None
+        stale = not self.is_fresh(result)
+        if stale:
+            self.refresh_soon(ticker)
+        self.served_total["stale" if stale else "fresh"] += 1
+        return result, stale
+
+    def refresh_soon(self, ticker: str) -> asyncio.Task:
+        """Agenda a atualização do ticker, a menos que já esteja em andamento."""
+        task = self._inflight.get(ticker)
+        if task is None:
+            task = self._inflight[ticker] = asyncio.ensure_future(self._refresh(ticker))
+        return task
+
+    async def _refresh(self, ticker: str) -> None:
+        try:
+            async with self._semaphore:
+                # O pregão do último fechamento entra no histórico: o resultado vale até o próximo
+                now = self._now()
+                model_version, value = await self.refresh(ticker, last_close(now, self.close_time).date())
+            self.results[ticker] = PrewarmedResult(value, model_version, now)
+            self.refreshed_total += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # O último resultado bom continua sendo servido
+            self.failed_total += 1
+            logger.warning(f"Falha ao pré-aquecer {ticker}: {e}")
+        finally:
+            self._inflight.pop(ticker, None)
+
+    async def run_once(self) -> dict:
+        """
+        Atualiza os `top_n` tickers mais populares que ainda não têm resultado
+        posterior ao último fechamento e descarta os que saíram do ranking.
+        """
+        started = time.perf_counter()
+        tickers = self.tracker.top(self.top_n)
+        pending = []
+        for ticker in tickers:
+            result = self.results.get(ticker)
+            if result is None or not self.is_fresh(result):
+                pending.append(self.refresh_soon(ticker))
+        failed_before = self.failed_total
+        await asyncio.gather(*pending)
+
+        keep = set(tickers) | set(self._inflight)
+        for ticker in [t for t in self.results if t not in keep]:
+            del self.results[ticker]
+
+        self.runs_total += 1
+        self.last_run = {
+            "finished_at": self._now().isoformat(),
+            "tickers": len(tickers),
+            "refreshed": len(pending),
+            "failed": self.failed_total - failed_before,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        return self.last_run
+
+    async def _run(self) -> None:
+        while True:
+            now = self._now()
+            delay = (next_close(now, self.close_time) - now).total_seconds()
+            delay += random.uniform(0, self.jitter_seconds)
+            self.next_run_at = now + timedelta(seconds=delay)
+            await self._sleep(delay)
+            try:
+                summary = await self.run_once()
+                logger.info(f"Pré-aquecimento concluído: {summary['refreshed']} de {summary['tickers']} ticker(s) "
+                            f"atualizados em {summary['seconds']:.1f}s ({summary['failed']} com erro)")
+            except Exception as e:
+                logger.error(f"Falha no pré-aquecimento: {e}", exc_info=True)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Cancela o agendamento e as atualizações em andamento."""
+        tasks = list(self._inflight.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "top_n": self.top_n,
+            "concurrency": self.concurrency,
+            "close_time_utc": self.close_time.strftime("%H:%M"),
+            "jitter_seconds": self.jitter_seconds,
+            "results": len(self.results),
+            "inflight": len(self._inflight),
+            "runs_total": self.runs_total,
+            "refreshed_total": self.refreshed_total,
+            "failed_total": self.failed_total,
+            "served_total": dict(self.served_total),
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "last_run": self.last_run,
+            "popularity": self.tracker.stats(),
+        }
@@ -0,0 +1,148 @@
+"""
+Cache em processo do histórico de preços por ticker.
+
+Cada entrada guarda a série de fechamentos recente de um ticker. Dentro do
+TTL a série é servida direto da memória; depois dele, apenas as barras
+posteriores à última data em cache são buscadas na fonte e anexadas.
+O cache é limitado em número de entradas e em bytes, com despejo LRU.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+from api.price_providers import PriceHistory, PriceProvider
+
+
+class _Entry:
+    __slots__ = ("history", "refreshed_at")
+
+    def __init__(self, history: PriceHistory, refreshed_at: float):
+        self.history = history
+        self.refreshed_at = refreshed_at
+
+
+class PriceHistoryCache:
+    """
+    Cache LRU com TTL e atualização incremental na frente de uma `PriceProvider`.
+
+    `lookback_days` define a janela de calendário mantida por ticker (a mesma
+    janela de 90 dias usada pelo /predict-auto). `clock` e `today` podem ser
+    substituídos nos testes.
+    """
+
+    def __init__(self, provider: PriceProvider, ttl_seconds: float = 300.0,
+                 max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024,
+                 lookback_days: int = 90,
+                 clock: Callable[[], float] = time.monotonic,
+                 today: Callable[[], date] = date.today):
+        self.provider = provider
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lookback_days = lookback_days
+        self._clock = clock
+        self._today = today
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.incremental_refreshes = 0
+        self.evictions = 0
+
+    def get_if_fresh(self, ticker: str) -> Optional[PriceHistory]:
+        """
+        Histórico do ticker se estiver em cache e dentro do TTL, sem nunca
+        acessar a fonte. Retorna None caso contrário.
+        """
+        key = ticker.upper()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry.refreshed_at >= self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.history
+
+    def get(self, ticker: str, force: bool = False, through: Optional[date] = None) -> PriceHistory:
+        """
+        Histórico recente do ticker, buscando na fonte apenas o que faltar.
+        Com `force`, busca as barras novas mesmo dentro do TTL. A busca vai até
+        ontem (o pregão de hoje pode estar em andamento); com `through`, vai
+        até essa data, inclusive (ex.: o dia de um pregão já fechado).
+        """
+        key = ticker.upper()
+        now = self._clock()
+        today = self._today()
+        window_start = today - timedelta(days=self.lookback_days)
+        end = through + timedelta(days=1) if through is not None else today
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not force and now - entry.refreshed_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.history
+
+        # A busca na fonte acontece fora do lock para não serializar tickers diferentes
+        if entry is not None and entry.history.last_date is not None:
+            start = max(entry.history.last_date + timedelta(days=1), window_start)
+            new_bars = self.provider.fetch(key, start, end) if start < end else PriceHistory.empty()
+            history = entry.history.append(new_bars).since(window_start)
+            incremental = True
+        else:
+            history = self.provider.fetch(key, window_start, end)
+            incremental = False
+
+        with self._lock:
+            if incremental:
+                self.incremental_refreshes += 1
+            else:
+                self.misses += 1
+            if len(history):
+                self._store(key, _Entry(history, now))
+        return history
+
+    def invalidate(self, ticker: Optional[str] = None) -> None:
+        """Remove um ticker (ou todos) do cache."""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(ticker.upper(), None)
+            if entry is not None:
+                self._bytes -= entry.history.nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.incremental_refreshes
+            return {
+                "provider": self.provider.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "incremental_refreshes": self.incremental_refreshes,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.history.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.history.nbytes
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.history.nbytes
+            self.evictions += 1
@@ -0,0 +1,193 @@
+"""
+Fontes de dados de preços históricos.
+
+Toda fonte implementa `fetch_bars(ticker, start, end)` e devolve as barras
+OHLCV (`PriceBars`) dos pregões no intervalo [start, end), a mesma convenção
+do `yf.download`; `fetch` devolve apenas os fechamentos (`PriceHistory`).
+O yfinance e o pandas só são importados quando a fonte Yahoo é usada.
+"""
+import zlib
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+# Colunas de uma barra diária, na ordem usada pelo armazenamento local
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class PriceHistory:
+    """Série de fechamentos diários: datas (datetime64[D]) e preços (float64)."""
+
+    __slots__ = ("dates", "closes")
+
+    def __init__(self, dates, closes):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.closes = np.asarray(closes, dtype=np.float64)
+        if self.dates.shape != self.closes.shape or self.dates.ndim != 1:
+            raise ValueError("Datas e preços devem ser arrays 1-D do mesmo tamanho")
+
+    @classmethod
+    def empty(cls) -> "PriceHistory":
+        return cls(np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64))
+
+    def __len__(self) -> int:
+        return len(self.closes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.closes.nbytes
+
+    @property
+    def last_date(self) -> Optional[date]:
+        if not len(self):
+            return None
+        return self.dates[-1].astype(date)
+
+    def append(self, other: "PriceHistory") -> "PriceHistory":
+        """Concatena barras mais novas, descartando datas já presentes."""
+        if not len(other):
+            return self
+        if len(self):
+            other = other.since(self.dates[-1] + np.timedelta64(1, "D"))
+        return PriceHistory(np.concatenate([self.dates, other.dates]),
+                            np.concatenate([self.closes, other.closes]))
+
+    def since(self, start) -> "PriceHistory":
+        """Barras com data >= start."""
+        index = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        return PriceHistory(self.dates[index:], self.closes[index:])
+
+
+class PriceBars:
+    """Barras diárias OHLCV: datas (datetime64[D]) e uma coluna float64 por campo."""
+
+    __slots__ = ("dates", "columns")
+
+    def __init__(self, dates, **columns):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        missing = set(OHLCV_COLUMNS) - set(columns)
+        if missing:
+            raise ValueError(f"Colunas ausentes: {sorted(missing)}")
+        self.columns = {name: np.asarray(columns[name], dtype=np.float64) for name in OHLCV_COLUMNS}
+        if self.dates.ndim != 1 or any(c.shape != self.dates.shape for c in self.columns.values()):
+            raise ValueError("Datas e colunas devem ser arrays 1-D do mesmo tamanho")
+
+    @classmethod
+    def empty(cls) -> "PriceBars":
+        return cls(np.empty(0, dtype="datetime64[D]"), **{name: np.empty(0) for name in OHLCV_COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def history(self) -> PriceHistory:
+        """Só os fechamentos."""
+        return PriceHistory(self.dates, self.columns["close"])
+
+
+class PriceProvider:
+    """Interface das fontes de preços."""
+
+    name = "base"
+
+    def fetch_bars(self, ticker: str, start: date, end: date) -> PriceBars:
+        raise NotImplementedError
+
+    def fetch(self, ticker: str, start: date, end: date) -> PriceHistory:
+        return self.fetch_bars(ticker, start, end).history()
+
+
+class YahooPriceProvider(PriceProvider):
+    """Baixa as barras diárias do Yahoo Finance via yfinance."""
+
+    name = "yahoo"
+
+    def fetch_bars(self, ticker: str, start: date, end: date) -> PriceBars:
+        import pandas as pd
+        import yfinance as yf
+
+        df = yf.download(ticker.upper(), start=start.strftime('%Y-%m-%d'),
+                         end=end.strftime('%Y-%m-%d'), progress=False)
+        if df.empty:
+            return PriceBars.empty()
+
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        columns = {name: df[name.capitalize()].to_numpy(dtype=np.float64) for name in OHLCV_COLUMNS}
+        valid = ~np.isnan(columns["close"])
+        return PriceBars(index.values.astype("datetime64[D]")[valid],
+                         **{name: values[valid] for name, values in columns.items()})
+
+
+class SyntheticPriceProvider(PriceProvider):
+    """
+    Gera preços sintéticos determinísticos em dias úteis, para testes e uso
+    offline. O preço de cada dia depende apenas do ticker e da data, então
+    buscas incrementais são consistentes com buscas completas.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, base_price: float = 150.0, daily_trend: float = 0.02,
+                 volatility: float = 5.0):
+        self.base_price = base_price
+        self.daily_trend = daily_trend
+        self.volatility = volatility
+
+    @staticmethod
+    def _noise(ordinal: np.ndarray, seed: int, stream: int = 0) -> np.ndarray:
+        """
+        Ruído pseudoaleatório barato e reprodutível por (ticker, dia), em
+        [-0.5, 0.5). Cada `stream` dá uma sequência independente.
+        """
+        return (((ordinal + stream * 104729) * 2654435761 + seed) % 2 ** 32) / 2 ** 32 - 0.5
+
+    def fetch_bars(self, ticker: str, start: date, end: date) -> PriceBars:
+        if end <= start:
+            return PriceBars.empty()
+        days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+        days = days[np.is_busday(days)]
+
+        seed = zlib.crc32(ticker.upper().encode("utf-8"))
+        ordinal = days.astype(np.int64)
+        noise = self._noise(ordinal, seed)
+        # Tendência linear a partir de 2018-01-01 (dia 17532 da época Unix)
+        level = self.base_price + (seed % 100) + self.daily_trend * (ordinal - 17532)
+        close = np.maximum(level + 3.0 * np.sin(ordinal / 15.0) + noise * self.volatility, 1.0)
+
+        # Abertura, máxima, mínima e volume derivados do fechamento com ruídos independentes
+        open_ = np.maximum(close * (1 + 0.01 * self._noise(ordinal, seed, 1)), 1.0)
+        high = np.maximum(open_, close) * (1 + 0.01 * (self._noise(ordinal, seed, 2) + 0.5))
+        low = np.minimum(open_, close) * (1 - 0.01 * (self._noise(ordinal, seed, 3) + 0.5))
+        volume = np.rint(5e6 * (1 + self._noise(ordinal, seed, 4)))
+        return PriceBars(days, open=open_, high=high, low=low, close=close, volume=volume)
+
+
+def create_price_provider(name: str, store_dir: Optional[str] = None) -> PriceProvider:
+    """
+    Cria a fonte de preços pelo nome configurado. A fonte "store" lê o
+    armazenamento local em `store_dir` (alimentado pelo `ingest_prices.py`).
+    """
+    name = name.lower()
+    if name == "store":
+        # Importado aqui: price_store depende deste módulo
+        from api.price_store import PriceStore, StorePriceProvider
+        if not store_dir:
+            raise ValueError("A fonte 'store' exige o diretório do armazenamento de preços")
+        return StorePriceProvider(PriceStore(store_dir))
+    providers = {
+        YahooPriceProvider.name: YahooPriceProvider,
+        SyntheticPriceProvider.name: SyntheticPriceProvider,
+    }
+    try:
+        return providers[name]()
+    except KeyError:
+        raise ValueError(f"Fonte de preços desconhecida: {name}") from None
+
@@ -0,0 +1,185 @@
+"""
+Armazenamento local de barras diárias OHLCV, em colunas por ticker.
+
+Cada ticker é um diretório `<raiz>/<TICKER>/` com um arquivo binário por
+coluna: `date.i8` (dias desde 1970-01-01, int64) e `open/high/low/close/
+volume.f8` (float64), todos em little-endian e na ordem das datas. Novas
+barras são anexadas ao fim dos arquivos (`ingest_prices.py`); nada é
+reescrito.
+
+As leituras mapeiam os arquivos com `np.memmap`: a busca do intervalo de
+datas é uma busca binária na coluna de datas e só as linhas e colunas pedidas
+são copiadas, sem carregar o arquivo inteiro. O treino (`train_model.py`) e a
+API (PRICE_PROVIDER=store) leem daqui.
+
+Um único processo de ingestão escreve em cada ticker; leitores concorrentes
+usam o menor comprimento entre as colunas, então nunca veem uma barra pela
+metade. A coluna de datas é gravada por último.
+"""
+import os
+import re
+from datetime import date
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from api.price_providers import OHLCV_COLUMNS, PriceBars, PriceHistory, PriceProvider
+
+_DATE_FILE = "date.i8"
+_DATE_DTYPE = np.dtype("<i8")
+_VALUE_DTYPE = np.dtype("<f8")
+
+# Nomes aceitos como diretório de ticker (impede caminhos como "../")
+_TICKER = re.compile(r"^[A-Z0-9^][A-Z0-9.^=_-]*$")
+
+
+def _value_file(column: str) -> str:
+    return f"{column}.f8"
+
+
+def _rows_in(path: str, itemsize: int) -> int:
+    try:
+        return os.path.getsize(path) // itemsize
+    except FileNotFoundError:
+        return 0
+
+
+class PriceStore:
+    """Barras OHLCV por ticker em `root`, lidas por intervalo de datas via memmap."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    # --- Caminhos ---
+    def _directory(self, ticker: str) -> str:
+        key = ticker.upper()
+        if not _TICKER.match(key):
+            raise ValueError(f"Ticker inválido: {ticker}")
+        return os.path.join(self.root, key)
+
+    def tickers(self) -> List[str]:
+        """Tickers com dados no armazenamento."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(os.path.join(self.root, name, _DATE_FILE)))
+
+    def __contains__(self, ticker: str) -> bool:
+        return self.rows(ticker) > 0
+
+    def rows(self, ticker: str) -> int:
+        """Barras completas do ticker (o menor comprimento entre as colunas)."""
+        directory = self._directory(ticker)
+        counts = [_rows_in(os.path.join(directory, _DATE_FILE), _DATE_DTYPE.itemsize)]
+        counts += [_rows_in(os.path.join(directory, _value_file(c)), _VALUE_DTYPE.itemsize) for c in OHLCV_COLUMNS]
+        return min(counts)
+
+    # --- Leitura ---
+    def _map(self, directory: str, filename: str, dtype: np.dtype, rows: int) -> np.memmap:
+        return np.memmap(os.path.join(directory, filename), dtype=dtype, mode="r", shape=(rows,))
+
+    def last_date(self, ticker: str) -> Optional[date]:
+        rows = self.rows(ticker)
+        if not rows:
+            return None
+        dates = self._map(self._directory(ticker), _DATE_FILE, _DATE_DTYPE, rows)
+        return np.datetime64(int(dates[-1]), "D").astype(date)
+
+    def read(self, ticker: str, start: Optional[date] = None, end: Optional[date] = None,
+             columns: Sequence[str] = OHLCV_COLUMNS) -> PriceBars:
+        """
+        Barras com data em [start, end) (sem limite quando None). Colunas fora
+        de `columns` não são lidas do disco e vêm preenchidas com NaN.
+        """
+        rows = self.rows(ticker)
+        if not rows:
+            return PriceBars.empty()
+        directory = self._directory(ticker)
+        dates = self._map(directory, _DATE_FILE, _DATE_DTYPE, rows)
+        lo = np.searchsorted(dates, np.datetime64(start, "D").astype(np.int64)) if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(end, "D").astype(np.int64)) if end is not None else rows
+        hi = max(hi, lo)
+
+        values = {}
+        for column in OHLCV_COLUMNS:
+            if column in columns:
+                values[column] = np.array(self._map(directory, _value_file(column), _VALUE_DTYPE, rows)[lo:hi])
+            else:
+                values[column] = np.full(hi - lo, np.nan)
+        return PriceBars(np.array(dates[lo:hi]).astype("datetime64[D]"), **values)
+
+    def history(self, ticker: str, start: Optional[date] = None, end: Optional[date] = None) -> PriceHistory:
+        """Apenas os fechamentos em [start, end)."""
+        return self.read(ticker, start, end, columns=("close",)).history()
+
+    # --- Escrita ---
+    def append(self, ticker: str, bars: PriceBars) -> int:
+        """
+        Anexa as barras posteriores à última data gravada e retorna quantas
+        foram anexadas. Colunas com barras incompletas (escrita interrompida)
+        são truncadas antes.
+        """
+        if not len(bars):
+            return 0
+        ordinal = bars.dates.astype(np.int64)
+        if np.any(np.diff(ordinal) <= 0):
+            raise ValueError("As barras devem estar em ordem crescente de data, sem repetição")
+
+        directory = self._directory(ticker)
+        os.makedirs(directory, exist_ok=True)
+        rows = self.rows(ticker)
+        self._truncate(directory, rows)
+
+        if rows:
+            last = int(self._map(directory, _DATE_FILE, _DATE_DTYPE, rows)[-1])
+            new = ordinal > last
+            if not new.any():
+                return 0
+            ordinal = ordinal[new]
+            bars = PriceBars(bars.dates[new], **{c: bars[c][new] for c in OHLCV_COLUMNS})
+
+        for column in OHLCV_COLUMNS:
+            self._append_file(os.path.join(directory, _value_file(column)), bars[column].astype(_VALUE_DTYPE))
+        # A data por último: só então a barra passa a contar nas leituras
+        self._append_file(os.path.join(directory, _DATE_FILE), ordinal.astype(_DATE_DTYPE))
+        return len(ordinal)
+
+    @staticmethod
+    def _append_file(path: str, values: np.ndarray) -> None:
+        with open(path, "ab") as f:
+            f.write(values.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _truncate(directory: str, rows: int) -> None:
+        files = [(_DATE_FILE, _DATE_DTYPE)] + [(_value_file(c), _VALUE_DTYPE) for c in OHLCV_COLUMNS]
+        for filename, dtype in files:
+            path = os.path.join(directory, filename)
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+
+    def stats(self, tickers: Optional[Iterable[str]] = None) -> dict:
+        tickers = list(tickers) if tickers is not None else self.tickers()
+        return {"root": self.root, "tickers": len(tickers), "rows": sum(self.rows(t) for t in tickers)}
+
+
+class StorePriceProvider(PriceProvider):
+    """Fonte de preços que lê o armazenamento local (sem acesso à rede)."""
+
+    name = "store"
+
+    def __init__(self, store: PriceStore):
+        self.store = store
+
+    def fetch_bars(self, ticker: str, start: date, end: date) -> PriceBars:
+        try:
+            return self.store.read(ticker, start, end)
+        except ValueError:
+            return PriceBars.empty()
+
+    def fetch(self, ticker: str, start: date, end: date) -> PriceHistory:
+        try:
+            return self.store.history(ticker, start, end)
+        except ValueError:
+            return PriceHistory.empty()
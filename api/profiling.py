@@ -0,0 +1,266 @@
+"""
+Perfilamento sob demanda de requisições individuais.
+
+Uma requisição é perfilada quando traz o cabeçalho `X-Profile` com o token
+administrativo ou quando é sorteada pela taxa de amostragem. O perfil
+(cProfile) cobre o código da requisição no event loop, mas só enquanto a
+corrotina dela está executando, sem misturar as requisições concorrentes. Cobre
+também o trabalho que ela delega a outras threads: endpoints síncronos
+(`threaded`) e chamadas enviadas ao threadpool ou a um executor (`bind`).
+Lotes do micro-batching e processos de inferência são compartilhados; no
+perfil aparecem como espera.
+
+Os perfis ficam em um buffer circular em memória (`ProfileStore`), servido
+pelos endpoints administrativos. O middleware só é instalado quando o
+perfilamento está ligado; desligado, `threaded` devolve a própria função e
+`bind` faz apenas uma consulta a uma ContextVar.
+"""
+import cProfile
+import functools
+import hmac
+import io
+import pstats
+import random
+import threading
+import time
+import types
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Deque, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+
+class _ActiveProfile:
+    __slots__ = ("profiles", "threads")
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        # (thread, função, segundos) do trabalho delegado a outras threads
+        self.threads: List[tuple] = []
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """Executa `fn` na thread atual com um perfil próprio, somado ao da requisição."""
+        profile = cProfile.Profile()
+        self.profiles.append(profile)
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.threads.append((threading.current_thread().name, getattr(fn, "__qualname__", repr(fn)),
+                                 round(time.perf_counter() - start, 6)))
+
+
+_active: ContextVar[Optional[_ActiveProfile]] = ContextVar("active_profile", default=None)
+
+
+class ProfileStore:
+    """Últimos `capacity` perfis, do mais antigo para o mais recente."""
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self._profiles: Deque[dict] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.recorded_total = 0
+
+    def add(self, profile: dict) -> None:
+        with self._lock:
+            self._profiles.append(profile)
+            self.recorded_total += 1
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            for profile in self._profiles:
+                if profile["id"] == profile_id:
+                    return profile
+        return None
+
+    def summaries(self) -> List[dict]:
+        """Perfis guardados sem a tabela de funções, do mais recente para o mais antigo."""
+        with self._lock:
+            profiles = list(self._profiles)
+        return [{k: v for k, v in p.items() if k not in ("functions", "text")} for p in reversed(profiles)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"capacity": self.capacity, "profiles": len(self._profiles),
+                    "recorded_total": self.recorded_total}
+
+
+class RequestProfiler:
+    """
+    Decide quais requisições perfilar e resume os perfis. Com `token`, o
+    cabeçalho `header` com esse valor liga o perfil da requisição;
+    `sample_rate` é a fração das demais requisições perfiladas.
+    """
+
+    def __init__(self, store: ProfileStore, enabled: bool = False, token: Optional[str] = None,
+                 sample_rate: float = 0.0, header: str = "X-Profile", top_functions: int = 40,
+                 sample: Callable[[], float] = random.random):
+        self.store = store
+        self.enabled = enabled
+        self.token = token
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode("latin-1")
+        self.top_functions = top_functions
+        self._sample = sample
+
+    def trigger(self, scope) -> Optional[str]:
+        """Motivo para perfilar a requisição ("header" ou "sample"), ou None."""
+        if self.token:
+            for name, value in scope.get("headers", ()):
+                if name == self.header:
+                    if hmac.compare_digest(value.decode("latin-1"), self.token):
+                        return "header"
+                    break
+        if self.sample_rate > 0 and self._sample() < self.sample_rate:
+            return "sample"
+        return None
+
+    def threaded(self, fn: Callable) -> Callable:
+        """
+        Decorador de funções executadas em outra thread com o contexto da
+        requisição (ex.: endpoints síncronos). Desligado, devolve `fn`.
+        """
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            active = _active.get()
+            if active is None:
+                return fn(*args, **kwargs)
+            return active.run(fn, *args, **kwargs)
+        return wrapper
+
+    @staticmethod
+    def bind(fn: Callable) -> Callable:
+        """
+        `fn` ligada ao perfil da requisição atual, para ser executada em um
+        executor (que não propaga o contexto). Sem perfil ativo, devolve `fn`.
+        """
+        active = _active.get()
+        if active is None:
+            return fn
+        return functools.partial(active.run, fn)
+
+    def summarize(self, active: _ActiveProfile) -> dict:
+        """Funções com maior tempo acumulado, somando o event loop e as threads."""
+        stats = None
+        for profile in active.profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile, stream=io.StringIO())
+            else:
+                stats.add(profile)
+        if stats is None:
+            return {"functions": [], "text": ""}
+
+        stats.strip_dirs().sort_stats("cumulative")
+        functions = []
+        for (filename, line, name) in stats.fcn_list[:self.top_functions]:
+            primitive_calls, calls, total, cumulative, _ = stats.stats[(filename, line, name)]
+            functions.append({
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "primitive_calls": primitive_calls,
+                "total_seconds": round(total, 6),
+                "cumulative_seconds": round(cumulative, 6),
+            })
+        stats.stream = io.StringIO()
+        stats.print_stats(self.top_functions)
+        return {"functions": functions, "text": stats.stream.getvalue()}
+
+
+@types.coroutine
+def _profiled(coro, profile: cProfile.Profile):
+    """
+    Executa a corrotina ligando o perfil apenas durante os passos dela no
+    event loop: o tempo em que outras corrotinas rodam fica de fora.
+    """
+    iterator = coro.__await__()
+    value, error = None, None
+    while True:
+        profile.enable()
+        try:
+            if error is not None:
+                pending = iterator.throw(error)
+            else:
+                pending = iterator.send(value)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            profile.disable()
+        try:
+            value, error = (yield pending), None
+        except GeneratorExit:
+            iterator.close()
+            raise
+        except BaseException as e:
+            value, error = None, e
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila as requisições escolhidas pelo `profiler`,
+    adiciona o cabeçalho X-Profile-Id à resposta e guarda o perfil no store
+    depois que a resposta é enviada.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self.profiler.trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:16]
+        active = _ActiveProfile()
+        loop_profile = cProfile.Profile()
+        active.profiles.append(loop_profile)
+        started_at = datetime.now(timezone.utc)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", profile_id.encode("latin-1"))]}
+            await send(message)
+
+        token = _active.set(active)
+        start = time.perf_counter()
+        try:
+            await _profiled(self.app(scope, receive, send_with_id), loop_profile)
+        finally:
+            duration = time.perf_counter() - start
+            _active.reset(token)
+            route = scope.get("route")
+            record = {
+                "id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", "unmatched"),
+                "status": status,
+                "started_at": started_at.isoformat(),
+                "duration_seconds": round(duration, 6),
+                "threads": [{"thread": t, "function": f, "seconds": s} for t, f, s in active.threads],
+            }
+            # O resumo roda depois da resposta, fora do event loop
+            record.update(await run_in_threadpool(self.profiler.summarize, active))
+            self.profiler.store.add(record)
+
@@ -0,0 +1,47 @@
+"""
+Deduplicação de chamadas assíncronas concorrentes (single-flight).
+
+Enquanto uma chamada para uma chave estiver em andamento, novos pedidos para
+a mesma chave aguardam o mesmo resultado em vez de disparar outra chamada.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class SingleFlight:
+    """
+    Compartilha uma única execução de `fn` entre chamadores concorrentes da
+    mesma chave. O prazo (`timeout`) vale para cada chamador: quem desiste não
+    cancela a execução compartilhada, que continua servindo os demais.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Evita o aviso "exception was never retrieved" quando todos os chamadores desistiram
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": self.calls - self.executions,
+        }
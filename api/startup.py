@@ -0,0 +1,47 @@
+"""
+Medição das fases de inicialização (imports, carga do modelo, aquecimento...).
+
+Cada fase é registrada com a sua duração e logada ao terminar, para que o
+tempo até a réplica ficar pronta seja visível nos logs e no probe de prontidão.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimer:
+    """Durações (segundos) de fases nomeadas, na ordem em que ocorreram."""
+
+    def __init__(self, label: str = "startup", clock: Callable[[], float] = time.perf_counter):
+        self.label = label
+        self.durations: Dict[str, float] = {}
+        self._clock = clock
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, self._clock() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.durations[name] = seconds
+        logger.info(f"[{self.label}] fase '{name}' concluída em {seconds * 1000:.1f}ms")
+
+    def update(self, durations: Dict[str, float]) -> None:
+        """Incorpora fases medidas em outro lugar (ex.: carga de uma versão do modelo)."""
+        self.durations.update(durations)
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in self.durations.items()},
+            "total_ms": round(self.total * 1000, 2),
+        }
@@ -0,0 +1,203 @@
+"""
+Estado por ticker para a previsão em streaming.
+
+Cada ticker inscrito ocupa uma linha de arrays pré-alocados: a janela
+escalonada (buffer circular) e o estado (h, c) de cada camada LSTM. Um novo
+preço custa um único passo da LSTM, feito in-place na linha do ticker.
+A cada `resync_interval` barras o estado é recalculado a partir da janela,
+para que a previsão volte a ser exatamente a do modelo sobre os últimos
+WINDOW_SIZE preços. Tickers ociosos são despejados (TTL e LRU).
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from api.numpy_lstm import LSTMState, NumpyLSTMModel
+
+
+class StreamStateStore:
+    """Armazena janela e estado LSTM de até `capacity` tickers em arrays compactos."""
+
+    def __init__(self, engine: NumpyLSTMModel, window_size: int, capacity: int = 10000,
+                 idle_ttl_seconds: float = 3600.0, resync_interval: int = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        if capacity < 1:
+            raise ValueError("capacity deve ser maior ou igual a 1")
+        self.engine = engine
+        self.window_size = window_size
+        self.capacity = capacity
+        self.idle_ttl = idle_ttl_seconds
+        self.resync_interval = resync_interval
+        self._clock = clock
+
+        self._windows = np.zeros((capacity, window_size), dtype=np.float32)
+        self._heads = np.zeros(capacity, dtype=np.int32)
+        self._h = [np.zeros((capacity, layer.units), dtype=np.float32) for layer in engine.lstm_layers]
+        self._c = [np.zeros((capacity, layer.units), dtype=np.float32) for layer in engine.lstm_layers]
+        self._last_seen = np.full(capacity, -np.inf)
+        self._since_sync = np.zeros(capacity, dtype=np.int32)
+        self._bars_seen = np.zeros(capacity, dtype=np.int64)
+
+        self._slots: Dict[str, int] = {}
+        self._tickers: Dict[int, str] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+
+        self.evictions = 0
+        self.resyncs = 0
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker.upper() in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self._windows, self._heads, self._last_seen, self._since_sync, self._bars_seen,
+                  *self._h, *self._c]
+        return sum(a.nbytes for a in arrays)
+
+    # --- Operações ---
+    def seed(self, ticker: str, scaled_window: np.ndarray) -> Tuple[float, int]:
+        """
+        (Re)inicializa o ticker com os últimos WINDOW_SIZE preços escalonados.
+        Retorna (previsão escalonada, barras vistas).
+        """
+        window = np.asarray(scaled_window, dtype=np.float32).reshape(-1)
+        if len(window) < self.window_size:
+            raise ValueError(f"São necessários pelo menos {self.window_size} preços para inicializar")
+        window = window[-self.window_size:]
+
+        with self._lock:
+            key = ticker.upper()
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._allocate(key)
+            self._windows[slot] = window
+            self._heads[slot] = 0
+            self._bars_seen[slot] = len(window)
+            output = self._resync(slot)
+            return output, int(self._bars_seen[slot])
+
+    def update(self, ticker: str, scaled_price: float) -> Tuple[float, int, bool]:
+        """
+        Acrescenta um preço escalonado ao ticker e devolve
+        (previsão escalonada, barras vistas, houve_resync). O(1) por barra.
+        """
+        with self._lock:
+            slot = self._slots.get(ticker.upper())
+            if slot is None:
+                raise KeyError(ticker)
+
+            head = self._heads[slot]
+            self._windows[slot, head] = scaled_price
+            self._heads[slot] = (head + 1) % self.window_size
+            self._bars_seen[slot] += 1
+            self._since_sync[slot] += 1
+
+            if self.resync_interval and self._since_sync[slot] >= self.resync_interval:
+                return self._resync(slot), int(self._bars_seen[slot]), True
+
+            # Visões das linhas do ticker: o passo atualiza o estado direto nos arrays
+            state = LSTMState([h[slot:slot + 1] for h in self._h], [c[slot:slot + 1] for c in self._c])
+            output = float(self.engine.step(np.array([[scaled_price]], dtype=np.float32), state)[0, 0])
+            self._last_seen[slot] = self._clock()
+            return output, int(self._bars_seen[slot]), False
+
+    def window(self, ticker: str) -> Optional[np.ndarray]:
+        """Cópia da janela escalonada do ticker em ordem cronológica (None se ausente)."""
+        with self._lock:
+            slot = self._slots.get(ticker.upper())
+            return None if slot is None else self._ordered_window(slot)
+
+    def remove(self, ticker: str) -> bool:
+        with self._lock:
+            slot = self._slots.get(ticker.upper())
+            if slot is None:
+                return False
+            self._release(slot)
+            return True
+
+    def evict_idle(self) -> int:
+        """Remove tickers sem atualização há mais de `idle_ttl` segundos."""
+        with self._lock:
+            return self._evict_idle()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tickers": len(self._slots),
+                "capacity": self.capacity,
+                "bytes": self.nbytes,
+                "idle_ttl_seconds": self.idle_ttl,
+                "resync_interval": self.resync_interval,
+                "evictions": self.evictions,
+                "resyncs": self.resyncs,
+            }
+
+    # --- Internos (chamados com o lock adquirido) ---
+    def _ordered_window(self, slot: int) -> np.ndarray:
+        return np.roll(self._windows[slot], -int(self._heads[slot]))
+
+    def _resync(self, slot: int) -> float:
+        state = self.engine.encode(self._ordered_window(slot)[np.newaxis, :])
+        for layer in range(len(self._h)):
+            self._h[layer][slot] = state.h[layer][0]
+            self._c[layer][slot] = state.c[layer][0]
+        self._since_sync[slot] = 0
+        self._last_seen[slot] = self._clock()
+        self.resyncs += 1
+        return float(self.engine.output(state)[0, 0])
+
+    def _allocate(self, ticker: str) -> int:
+        if not self._free:
+            self._evict_idle()
+        if not self._free:
+            # Sem ociosos: despejar o ticker usado há mais tempo
+            self._release(int(np.argmin(self._last_seen)))
+            self.evictions += 1
+        slot = self._free.pop()
+        self._slots[ticker] = slot
+        self._tickers[slot] = ticker
+        return slot
+
+    def _evict_idle(self) -> int:
+        if not self.idle_ttl:
+            return 0
+        cutoff = self._clock() - self.idle_ttl
+        idle = [slot for slot in np.flatnonzero(self._last_seen < cutoff) if slot in self._tickers]
+        for slot in idle:
+            self._release(int(slot))
+        self.evictions += len(idle)
+        return len(idle)
+
+    def _release(self, slot: int) -> None:
+        ticker = self._tickers.pop(slot)
+        del self._slots[ticker]
+        self._last_seen[slot] = -np.inf
+        self._free.append(slot)
+
+
+def parse_stream_message(message: dict) -> Tuple[str, Optional[list], Optional[float]]:
+    """
+    Valida uma mensagem do streaming e retorna (ticker, prices, price).
+    Formatos aceitos:
+      {"ticker": "AAPL", "prices": [...]}  inicializa com os preços informados
+      {"ticker": "AAPL"}                   inicializa com o histórico do servidor
+      {"ticker": "AAPL", "price": 231.2}   acrescenta um novo fechamento
+    """
+    if not isinstance(message, dict) or not isinstance(message.get("ticker"), str) or not message["ticker"]:
+        raise ValueError("A mensagem deve conter o campo 'ticker'")
+    prices = message.get("prices")
+    price = message.get("price")
+    if prices is not None and price is not None:
+        raise ValueError("Informe 'prices' ou 'price', não ambos")
+    if prices is not None:
+        if not isinstance(prices, list) or not all(isinstance(p, (int, float)) for p in prices):
+            raise ValueError("'prices' deve ser uma lista de números")
+    if price is not None and (isinstance(price, bool) or not isinstance(price, (int, float))):
+        raise ValueError("'price' deve ser numérico")
+    return message["ticker"].upper(), prices, (float(price) if price is not None else None)
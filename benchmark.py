@@ -0,0 +1,383 @@
+"""
+Benchmark de carga e latência da API.
+
+Executa cenários (`/predict`, `/predict/batch` em JSON e no formato binário,
+`/predict-auto`, `/forecast` e o streaming via WebSocket) em níveis fixos de concorrência, com a API no
+mesmo processo (TestClient) e/ou em um uvicorn real. O histórico de preços
+vem do provedor sintético (PRICE_PROVIDER=synthetic), sem acesso ao Yahoo.
+
+Os resultados (p50/p95/p99, vazão e erros) são gravados em JSON. Com
+`--compare`, compara com um baseline gravado antes e sai com código 1 se
+alguma métrica piorar além da tolerância.
+
+Exemplos:
+    python benchmark.py --mode inprocess --concurrency 1 8 32
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import numpy as np
+
+from api import binary_format
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+WINDOW_SIZE = 60
+TICKERS = ["AAPL", "MSFT", "GOOG", "AMZN", "PETR4.SA", "VALE3.SA", "ITUB4.SA", "NVDA"]
+
+SCENARIOS = ["predict", "predict_batch", "predict_batch_binary", "predict_auto", "forecast", "stream"]
+MODES = ["inprocess", "uvicorn"]
+
+# Métricas comparadas com o baseline e se "maior é pior"
+COMPARED_METRICS = {"p50_ms": True, "p95_ms": True, "p99_ms": True, "throughput_rps": False}
+
+
+# --- Alvos: API no mesmo processo ou em um uvicorn ---
+class InProcessTarget:
+    """API executada no próprio processo, via TestClient (inclui startup/shutdown)."""
+
+    name = "inprocess"
+
+    def __enter__(self):
+        from fastapi.testclient import TestClient
+        import api.main
+
+        self._client = TestClient(api.main.app)
+        self._client.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._client.__exit__(*exc)
+
+    def request(self, method, path, json_body=None, content=None, headers=None):
+        return self._client.request(method, path, json=json_body, content=content, headers=headers).status_code
+
+    def websocket(self):
+        stack = ExitStack()
+        ws = stack.enter_context(self._client.websocket_connect("/ws/predict"))
+        return _WebSocket(ws.send_json, ws.receive_json, stack.close)
+
+
+class UvicornTarget:
+    """API em um processo uvicorn separado, acessada pela rede local."""
+
+    name = "uvicorn"
+
+    def __init__(self, startup_timeout=120.0):
+        self.startup_timeout = startup_timeout
+
+    def __enter__(self):
+        import httpx
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--no-access-log", "--log-level", "warning"],
+            cwd=ROOT_DIR, env=os.environ.copy())
+        self._client = httpx.Client(base_url=f"http://127.0.0.1:{self.port}", timeout=60.0)
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou durante a inicialização (código {self._process.returncode})")
+            try:
+                if self._client.get("/health/ready").status_code == 200:
+                    return self
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"A API não ficou pronta em {self.startup_timeout:.0f}s")
+
+    def __exit__(self, *exc):
+        self._client.close()
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+
+    def request(self, method, path, json_body=None, content=None, headers=None):
+        return self._client.request(method, path, json=json_body, content=content, headers=headers).status_code
+
+    def websocket(self):
+        from websockets.sync.client import connect
+
+        stack = ExitStack()
+        ws = stack.enter_context(connect(f"ws://127.0.0.1:{self.port}/ws/predict"))
+        return _WebSocket(lambda message: ws.send(json.dumps(message)),
+                          lambda: json.loads(ws.recv()), stack.close)
+
+
+class _WebSocket:
+    def __init__(self, send_json, receive_json, close):
+        self.send_json = send_json
+        self.receive_json = receive_json
+        self.close = close
+
+
+# --- Cenários ---
+def _random_windows(rng, n):
+    """Janelas de preços distintas (o cache de previsões não as reaproveita)."""
+    steps = rng.normal(0, 1, size=(n, WINDOW_SIZE))
+    return (100 + rng.uniform(0, 100, size=(n, 1)) + np.cumsum(steps, axis=1)).round(4).tolist()
+
+
+def make_operation(scenario, target, worker, seed, batch_size=32, horizon=5):
+    """
+    Prepara um worker do cenário. Retorna (operação, encerramento); cada
+    chamada da operação faz uma requisição e devolve True em caso de sucesso.
+    """
+    rng = np.random.default_rng([seed, worker])
+
+    if scenario == "predict":
+        def op():
+            body = {"historical_prices": _random_windows(rng, 1)[0]}
+            return target.request("POST", "/predict", body) == 200
+        return op, None
+
+    if scenario == "predict_batch":
+        def op():
+            body = {"windows": _random_windows(rng, batch_size)}
+            return target.request("POST", "/predict/batch", body) == 200
+        return op, None
+
+    if scenario == "predict_batch_binary":
+        headers = {"Content-Type": binary_format.MEDIA_TYPE, "Accept": binary_format.MEDIA_TYPE}
+
+        def op():
+            body = binary_format.encode_array(_random_windows(rng, batch_size))
+            return target.request("POST", "/predict/batch", content=body, headers=headers) == 200
+        return op, None
+
+    if scenario == "predict_auto":
+        def op():
+            ticker = TICKERS[rng.integers(len(TICKERS))]
+            return target.request("GET", f"/predict-auto/{ticker}") == 200
+        return op, None
+
+    if scenario == "forecast":
+        def op():
+            ticker = TICKERS[rng.integers(len(TICKERS))]
+            return target.request("GET", f"/forecast/{ticker}?horizon={horizon}") == 200
+        return op, None
+
+    if scenario == "stream":
+        # Um ticker por worker: cada mensagem é uma barra nova (um passo da LSTM)
+        ws = target.websocket()
+        ticker = f"BENCH{worker}"
+        ws.send_json({"ticker": ticker, "prices": _random_windows(rng, 1)[0]})
+        if "error" in ws.receive_json():
+            raise RuntimeError(f"Falha ao inicializar o streaming de {ticker}")
+
+        def op():
+            ws.send_json({"ticker": ticker, "price": float(100 + rng.normal(0, 1))})
+            return "error" not in ws.receive_json()
+        return op, ws.close
+
+    raise ValueError(f"Cenário desconhecido: {scenario}")
+
+
+# --- Execução e estatísticas ---
+def summarize(latencies, errors, elapsed):
+    """Percentis (ms), média e vazão (requisições/s) de um nível de concorrência."""
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    total = len(latencies_ms)
+    if total == 0:
+        return {"requests": 0, "errors": errors, "throughput_rps": 0.0,
+                "p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+    }
+
+
+def run_level(target, scenario, concurrency, requests, warmup=10, seed=42):
+    """
+    Executa `requests` requisições do cenário com `concurrency` workers
+    (threads), após `warmup` requisições por worker que não entram na conta.
+    """
+    workers = [make_operation(scenario, target, worker, seed) for worker in range(concurrency)]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def work(index):
+        nonlocal errors
+        op = workers[index][0]
+        for _ in range(warmup):
+            try:
+                op()
+            except Exception:
+                pass
+        barrier.wait()
+        local, failed = [], 0
+        for _ in range(per_worker[index]):
+            start = time.perf_counter()
+            try:
+                ok = op()
+            except Exception:
+                ok = False
+            local.append(time.perf_counter() - start)
+            failed += 0 if ok else 1
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(work, i) for i in range(concurrency)]
+            barrier.wait()
+            start = time.perf_counter()
+            for future in futures:
+                future.result()
+            elapsed = time.perf_counter() - start
+    finally:
+        for _, close in workers:
+            if close is not None:
+                close()
+
+    return summarize(latencies, errors, elapsed)
+
+
+def run_benchmarks(modes, scenarios, concurrency_levels, requests, warmup=10, seed=42, log=print):
+    results = []
+    for mode in modes:
+        target = InProcessTarget() if mode == "inprocess" else UvicornTarget()
+        with target:
+            for scenario in scenarios:
+                for concurrency in concurrency_levels:
+                    stats = run_level(target, scenario, concurrency, requests, warmup=warmup, seed=seed)
+                    result = {"mode": mode, "scenario": scenario, "concurrency": concurrency, **stats}
+                    results.append(result)
+                    log(format_result(result))
+    return results
+
+
+def format_result(result):
+    def ms(value):
+        return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+    return (f"{result['mode']:<10} {result['scenario']:<20} c={result['concurrency']:<4} "
+            f"p50={ms(result['p50_ms'])}ms p95={ms(result['p95_ms'])}ms p99={ms(result['p99_ms'])}ms "
+            f"{result['throughput_rps']:9.1f} req/s  erros={result['errors']}")
+
+
+# --- Comparação com o baseline ---
+def compare(results, baseline, tolerance=0.2):
+    """
+    Lista as pioras em relação ao baseline: latência acima de
+    (1 + tolerance) × baseline, vazão abaixo de (1 - tolerance) × baseline, ou
+    mais erros. Combinações ausentes no baseline são ignoradas.
+    """
+    reference = {(r["mode"], r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        key = (result["mode"], result["scenario"], result["concurrency"])
+        base = reference.get(key)
+        if base is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            current, previous = result.get(metric), base.get(metric)
+            if current is None or not previous:
+                continue
+            limit = previous * (1 + tolerance) if higher_is_worse else previous * (1 - tolerance)
+            if (current > limit) if higher_is_worse else (current < limit):
+                regressions.append({"mode": key[0], "scenario": key[1], "concurrency": key[2],
+                                    "metric": metric, "baseline": previous, "current": current})
+        if result["errors"] > base["errors"]:
+            regressions.append({"mode": key[0], "scenario": key[1], "concurrency": key[2],
+                                "metric": "errors", "baseline": base["errors"], "current": result["errors"]})
+    return regressions
+
+
+def environment_info():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "inference_backend": os.environ.get("INFERENCE_BACKEND", "keras"),
+        "model_precision": os.environ.get("MODEL_PRECISION", "float32"),
+        "batching_enabled": os.environ.get("BATCHING_ENABLED", "1"),
+        "price_provider": os.environ.get("PRICE_PROVIDER"),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga e latência da API")
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=MODES,
+                        help="API no mesmo processo e/ou em um uvicorn (padrão: ambos)")
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=400, help="Requisições medidas por nível de concorrência")
+    parser.add_argument("--warmup", type=int, default=10, help="Requisições de aquecimento por worker")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["keras", "numpy"], help="INFERENCE_BACKEND da API (padrão: o do ambiente)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Arquivo JSON com os resultados")
+    parser.add_argument("--compare", metavar="BASELINE", help="Falha se piorar em relação a este resultado")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Piora relativa aceita na comparação (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # A API lê a configuração ao ser importada (no mesmo processo) ou do ambiente do uvicorn
+    os.environ["PRICE_PROVIDER"] = "synthetic"
+    # Todas as requisições saem do mesmo cliente: o limite por cliente mediria só os 429
+    os.environ.setdefault("FETCH_RATE_LIMIT_PER_SECOND", "0")
+    if args.backend:
+        os.environ["INFERENCE_BACKEND"] = args.backend
+    sys.path.insert(0, ROOT_DIR)
+
+    results = run_benchmarks(args.mode, args.scenario, args.concurrency, args.requests,
+                             warmup=args.warmup, seed=args.seed)
+    report = {"environment": environment_info(),
+              "config": {"requests": args.requests, "warmup": args.warmup, "seed": args.seed},
+              "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        common = {(r["mode"], r["scenario"], r["concurrency"]) for r in baseline["results"]}
+        if not any((r["mode"], r["scenario"], r["concurrency"]) in common for r in results):
+            print(f"\nNenhuma combinação de modo/cenário/concorrência em comum com {args.compare}.")
+            return 1
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} piora(s) acima de {args.tolerance:.0%} em relação a {args.compare}:")
+            for r in regressions:
+                print(f"  {r['mode']} {r['scenario']} c={r['concurrency']} {r['metric']}: "
+                      f"{r['baseline']} -> {r['current']}")
+            return 1
+        print(f"\nSem pioras acima de {args.tolerance:.0%} em relação a {args.compare}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
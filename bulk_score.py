@@ -0,0 +1,334 @@
+"""
+Scoring em lote (backtest) de históricos completos de muitos tickers.
+
+Lê as séries de fechamento de arquivos locais (um por ticker: `<TICKER>.csv`
+com uma coluna Close e, opcionalmente, Date, ou `<TICKER>.npy` 1-D), prevê o
+dia seguinte de cada janela de WINDOW_SIZE dias e grava, à medida que cada
+ticker termina, as previsões e o MAE/RMSE/MAPE por ticker.
+
+As janelas são views deslizantes da série original (sem cópia) e entram no
+modelo em chunks de tamanho fixo, escalonados um a um, então a memória por
+processo não depende do tamanho do histórico. Os tickers são distribuídos
+entre processos (um por núcleo, cada um com uma thread de BLAS). O modelo é
+o mesmo da API (motor NumPy, sem TensorFlow), incluindo os modelos por
+ticker/grupo em `<models_dir>/<TICKER>/`.
+
+Exemplos:
+    python bulk_score.py dados/ --output previsoes.csv --metrics metricas.csv
+    python bulk_score.py dados/*.csv --workers 8 --chunk-size 1024 --start 2023-01-01
+    python bulk_score.py dados/ --metrics metricas.csv --no-predictions
+"""
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from contextlib import nullcontext
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from api.inference_workers import limit_threads  # noqa: E402
+from api.model_pool import ModelPool  # noqa: E402
+from api.model_registry import ModelBundle, artifact_version  # noqa: E402
+from api.numpy_lstm import PRECISIONS, NumpyLSTMModel  # noqa: E402
+from api.preprocessing import inverse_scale_prices, scale_prices  # noqa: E402
+
+WINDOW_SIZE = 60
+MODELS_DIR = os.path.join(ROOT_DIR, "api", "models")
+INPUT_EXTENSIONS = (".csv", ".npy")
+
+PREDICTION_COLUMNS = ["ticker", "date", "actual", "predicted"]
+METRIC_COLUMNS = ["ticker", "windows", "mae", "rmse", "mape", "model_version", "error"]
+
+
+# --- Leitura das séries ---
+def find_inputs(paths):
+    """Arquivos de entrada: os informados e os .csv/.npy dos diretórios informados, sem repetição."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(p for p in glob.glob(os.path.join(path, "*")) if p.lower().endswith(INPUT_EXTENSIONS))
+        else:
+            files += sorted(glob.glob(path)) or [path]
+    return list(dict.fromkeys(files))
+
+
+def ticker_from_path(path):
+    return os.path.splitext(os.path.basename(path))[0].upper()
+
+
+def _column(columns, name):
+    for column in columns:
+        if str(column).strip().lower() == name.lower():
+            return column
+    return None
+
+
+def read_series(path, close_column="Close", date_column="Date"):
+    """
+    Série de fechamento do arquivo e as datas (ou None). Arquivos .npy são
+    mapeados em memória em vez de lidos; linhas sem preço são descartadas.
+    """
+    if path.lower().endswith(".npy"):
+        close = np.load(path, mmap_mode="r")
+        if close.ndim != 1:
+            raise ValueError(f"{path}: esperado um array 1-D de preços")
+        return close, None
+
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    close_name = _column(header, close_column)
+    if close_name is None:
+        raise ValueError(f"{path}: coluna '{close_column}' não encontrada")
+    date_name = _column(header, date_column)
+    usecols = [close_name] + ([date_name] if date_name is not None else [])
+    df = pd.read_csv(path, usecols=usecols).dropna(subset=[close_name])
+    close = df[close_name].to_numpy(dtype=np.float64)
+    dates = df[date_name].astype(str).to_numpy() if date_name is not None else None
+    return close, dates
+
+
+# --- Modelos ---
+def model_filename(precision):
+    return "stock_lstm_model.h5" if precision == "float32" else f"stock_lstm_model.{precision}.npz"
+
+
+def load_scoring_bundle(version, model_path, scaler_path):
+    """Modelo NumPy + escalonador, sem os componentes da API (batcher, streaming)."""
+    model = NumpyLSTMModel.from_h5(model_path) if model_path.endswith(".h5") else NumpyLSTMModel.from_npz(model_path)
+    with open(scaler_path, "rb") as f:
+        scaler = pickle.load(f)
+    return ModelBundle(version, model, scaler, nbytes=model.nbytes)
+
+
+class Scorer:
+    """
+    Modelo padrão + modelos por ticker/grupo (resolvidos como na API, pelo
+    `ModelPool`), carregados sob demanda em cada processo.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, precision="float32", chunk_size=512, window_size=WINDOW_SIZE):
+        filename = model_filename(precision)
+        model_path = os.path.join(models_dir, filename)
+        scaler_path = os.path.join(models_dir, "scaler.pkl")
+        self.default = load_scoring_bundle(artifact_version(model_path, scaler_path), model_path, scaler_path)
+        self.pool = ModelPool(models_dir, load_scoring_bundle, max_models=64,
+                              check_interval=float("inf"), model_filename=filename)
+        self.chunk_size = chunk_size
+        self.window_size = window_size
+
+    def bundle(self, ticker):
+        bundle = self.pool.acquire(ticker)
+        if bundle is None:
+            return self.default
+        bundle.release()
+        return bundle
+
+    def predict_series(self, bundle, close):
+        """
+        Previsão do dia seguinte para cada janela da série: o item i prevê
+        close[i + window_size]. Retorna um array com len(close) - window_size valores.
+        """
+        # Janelas sobre a série original (o memmap de um .npy não é copiado); cada
+        # chunk é escalonado só na hora de entrar no modelo.
+        # A última janela prevê um dia que ainda não está na série: não entra no backtest
+        windows = np.lib.stride_tricks.sliding_window_view(np.asarray(close)[:-1], self.window_size)
+        predictions = np.empty(len(windows), dtype=np.float64)
+        for start in range(0, len(windows), self.chunk_size):
+            chunk = scale_prices(bundle.scaler, windows[start:start + self.chunk_size])
+            predictions[start:start + len(chunk)] = bundle.model.predict(chunk[:, :, np.newaxis]).reshape(-1)
+        return inverse_scale_prices(bundle.scaler, predictions)
+
+    def score(self, path, close_column="Close", date_column="Date", start=None):
+        """Resultado de um arquivo: dicionário com as previsões e as métricas, ou com o erro."""
+        ticker = ticker_from_path(path)
+        try:
+            close, dates = read_series(path, close_column, date_column)
+            if start is not None and dates is None:
+                raise ValueError("--start exige uma coluna de datas (arquivos .npy não têm datas)")
+            if len(close) <= self.window_size:
+                raise ValueError(f"são necessários mais de {self.window_size} preços (há {len(close)})")
+            bundle = self.bundle(ticker)
+            predicted = self.predict_series(bundle, close)
+            actual = np.asarray(close[self.window_size:], dtype=np.float64)
+            target_dates = dates[self.window_size:] if dates is not None else None
+            if start is not None:
+                keep = target_dates >= start
+                actual, predicted, target_dates = actual[keep], predicted[keep], target_dates[keep]
+            if target_dates is None:
+                target_dates = np.arange(self.window_size, len(close))
+            return {"ticker": ticker, "dates": target_dates, "actual": actual, "predicted": predicted,
+                    "metrics": error_metrics(actual, predicted), "model_version": bundle.version}
+        except Exception as e:
+            return {"ticker": ticker, "error": f"{type(e).__name__}: {e}"}
+
+
+def error_metrics(actual, predicted):
+    """MAE, RMSE e MAPE (%), como no `train_model.evaluate`."""
+    errors = predicted - actual
+    if len(errors) == 0:
+        return {"windows": 0, "mae": None, "rmse": None, "mape": None}
+    return {"windows": len(errors),
+            "mae": float(np.mean(np.abs(errors))),
+            "rmse": float(np.sqrt(np.mean(errors ** 2))),
+            "mape": float(np.mean(np.abs(errors / actual)) * 100)}
+
+
+# --- Processos ---
+_scorer = None
+_score_options = {}
+
+
+def _init_worker(models_dir, precision, chunk_size, threads, options):
+    global _scorer, _score_options
+    if threads > 0:
+        limit_threads(threads)
+    _scorer = Scorer(models_dir, precision, chunk_size)
+    _score_options = options
+
+
+def _score_file(path):
+    return _scorer.score(path, **_score_options)
+
+
+def score_files(files, models_dir=MODELS_DIR, precision="float32", chunk_size=512, workers=None,
+                threads_per_worker=1, **options):
+    """
+    Gera o resultado de cada arquivo à medida que fica pronto (fora de ordem
+    com mais de um processo). `options` vai para `Scorer.score`.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(files) <= 1:
+        _init_worker(models_dir, precision, chunk_size, 0, options)
+        for path in files:
+            yield _score_file(path)
+        return
+
+    with multiprocessing.Pool(min(workers, len(files)), initializer=_init_worker,
+                              initargs=(models_dir, precision, chunk_size, threads_per_worker, options)) as pool:
+        yield from pool.imap_unordered(_score_file, files)
+
+
+# --- Saída ---
+class Totals:
+    """Métricas agregadas de todas as janelas pontuadas."""
+
+    def __init__(self):
+        self.windows = 0
+        self.abs_error = 0.0
+        self.sq_error = 0.0
+        self.abs_pct_error = 0.0
+
+    def add(self, actual, predicted):
+        errors = predicted - actual
+        self.windows += len(errors)
+        self.abs_error += float(np.sum(np.abs(errors)))
+        self.sq_error += float(np.sum(errors ** 2))
+        self.abs_pct_error += float(np.sum(np.abs(errors / actual)))
+
+    def metrics(self):
+        if not self.windows:
+            return {"windows": 0, "mae": None, "rmse": None, "mape": None}
+        return {"windows": self.windows, "mae": self.abs_error / self.windows,
+                "rmse": (self.sq_error / self.windows) ** 0.5, "mape": self.abs_pct_error / self.windows * 100}
+
+
+def _fmt(value):
+    return "" if value is None else f"{value:.6f}"
+
+
+def run(files, output=None, metrics_path=None, **kwargs):
+    """Pontua os arquivos e grava os resultados em streaming. Retorna (totais, tickers com erro)."""
+    totals = Totals()
+    failed = []
+    for path in (output, metrics_path):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(output, "w", newline="", encoding="utf-8") if output else nullcontext() as out, \
+            open(metrics_path, "w", newline="", encoding="utf-8") if metrics_path else nullcontext() as met:
+        predictions_writer = csv.writer(out) if out else None
+        metrics_writer = csv.writer(met) if met else None
+        if predictions_writer:
+            predictions_writer.writerow(PREDICTION_COLUMNS)
+        if metrics_writer:
+            metrics_writer.writerow(METRIC_COLUMNS)
+
+        for result in score_files(files, **kwargs):
+            ticker = result["ticker"]
+            if "error" in result:
+                failed.append(ticker)
+                print(f"{ticker}: {result['error']}", file=sys.stderr)
+                if metrics_writer:
+                    metrics_writer.writerow([ticker, 0, "", "", "", "", result["error"]])
+                continue
+            totals.add(result["actual"], result["predicted"])
+            if predictions_writer:
+                predictions_writer.writerows(
+                    (ticker, date, f"{a:.6f}", f"{p:.6f}")
+                    for date, a, p in zip(result["dates"], result["actual"], result["predicted"]))
+            if metrics_writer:
+                m = result["metrics"]
+                metrics_writer.writerow([ticker, m["windows"], _fmt(m["mae"]), _fmt(m["rmse"]), _fmt(m["mape"]),
+                                         result["model_version"], ""])
+    return totals, failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scoring em lote (backtest) de históricos de preços")
+    parser.add_argument("inputs", nargs="+", help="Arquivos <TICKER>.csv/.npy ou diretórios com eles")
+    parser.add_argument("--output", default="bulk_predictions.csv", help="CSV com as previsões por dia")
+    parser.add_argument("--no-predictions", action="store_true", help="Grava apenas as métricas")
+    parser.add_argument("--metrics", default="bulk_metrics.csv", help="CSV com MAE/RMSE/MAPE por ticker")
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--precision", choices=PRECISIONS, default=os.getenv("MODEL_PRECISION", "float32"),
+                        help="Pesos usados (como MODEL_PRECISION na API)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos (padrão: um por núcleo)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Threads do BLAS em cada processo")
+    parser.add_argument("--chunk-size", type=int, default=512, help="Janelas por chamada do modelo")
+    parser.add_argument("--close-column", default="Close")
+    parser.add_argument("--date-column", default="Date")
+    parser.add_argument("--start", help="Pontua apenas os dias a partir desta data (AAAA-MM-DD); exige entradas com coluna de datas")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = find_inputs(args.inputs)
+    if not files:
+        print("Nenhum arquivo de entrada encontrado.", file=sys.stderr)
+        return 1
+
+    if args.start:
+        undated = [path for path in files if path.lower().endswith(".npy")]
+        if undated:
+            print(f"--start exige datas, que arquivos .npy não têm: {', '.join(undated)}", file=sys.stderr)
+            return 1
+
+    print(f"Pontuando {len(files)} ticker(s) com {min(args.workers or 1, len(files))} processo(s)...")
+    started = time.perf_counter()
+    totals, failed = run(files, output=None if args.no_predictions else args.output, metrics_path=args.metrics,
+                         models_dir=args.models_dir, precision=args.precision, chunk_size=args.chunk_size,
+                         workers=args.workers, threads_per_worker=args.threads_per_worker,
+                         close_column=args.close_column, date_column=args.date_column, start=args.start)
+    elapsed = time.perf_counter() - started
+
+    summary = totals.metrics()
+    print(f"{len(files) - len(failed)} ticker(s) e {summary['windows']} janelas em {elapsed:.1f}s "
+          f"({summary['windows'] / elapsed:.0f} janelas/s); {len(failed)} com erro")
+    if summary["windows"]:
+        print(f"MAE: {summary['mae']:.4f}  RMSE: {summary['rmse']:.4f}  MAPE: {summary['mape']:.2f}%")
+    if not args.no_predictions:
+        print(f"Previsões em {args.output}")
+    print(f"Métricas por ticker em {args.metrics}")
+    return 1 if failed and len(failed) == len(files) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
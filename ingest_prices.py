@@ -0,0 +1,109 @@
+"""
+Ingestão de barras diárias OHLCV no armazenamento local de preços.
+
+Para cada ticker, busca na fonte apenas os pregões posteriores à última data
+já gravada e os anexa às colunas em `<store-dir>/<TICKER>/` (veja
+`api/price_store.py`). Rodar de novo é barato e idempotente: só as barras
+novas são buscadas e gravadas.
+
+Com `--provider synthetic` os preços são gerados localmente (os mesmos da API
+com PRICE_PROVIDER=synthetic), então treino e API funcionam sem rede.
+
+Exemplos:
+    python ingest_prices.py AAPL MSFT PETR4.SA
+    python ingest_prices.py AAPL MSFT --provider synthetic --start 2018-01-01
+    python ingest_prices.py --list
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from api.price_providers import create_price_provider  # noqa: E402
+from api.price_store import PriceStore  # noqa: E402
+
+STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(ROOT_DIR, "data", "prices"))
+DEFAULT_START = "2018-01-01"
+
+
+def ingest_ticker(store: PriceStore, provider, ticker: str, start: date, end: date) -> int:
+    """Busca e anexa as barras de `ticker` posteriores às já gravadas; retorna quantas entraram."""
+    last = store.last_date(ticker)
+    if last is not None:
+        start = max(start, last + timedelta(days=1))
+    if start >= end:
+        return 0
+    return store.append(ticker, provider.fetch_bars(ticker, start, end))
+
+
+def ingest(tickers, store: PriceStore, provider, start: date, end: date, workers: int = 4):
+    """
+    Ingere os tickers em paralelo (a busca é dominada por E/S). Retorna
+    {ticker: barras anexadas ou a exceção}.
+    """
+    def run(ticker):
+        try:
+            return ticker, ingest_ticker(store, provider, ticker, start, end)
+        except Exception as e:
+            return ticker, e
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return dict(executor.map(run, tickers))
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestão incremental de preços no armazenamento local")
+    parser.add_argument("tickers", nargs="*", help="Tickers a ingerir (padrão: os já presentes no armazenamento)")
+    parser.add_argument("--provider", choices=("yahoo", "synthetic"), default=os.getenv("INGEST_PROVIDER", "yahoo"),
+                        help="Fonte das barras")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--start", type=parse_date, default=parse_date(DEFAULT_START),
+                        help="Primeira data de um ticker novo (AAAA-MM-DD)")
+    # O pregão de hoje pode estar em andamento e o armazenamento só anexa: por padrão, até ontem
+    parser.add_argument("--end", type=parse_date, default=date.today(),
+                        help="Data final, exclusiva (padrão: hoje, ou seja, até o pregão de ontem)")
+    parser.add_argument("--workers", type=int, default=4, help="Tickers buscados em paralelo")
+    parser.add_argument("--list", action="store_true", help="Lista os tickers gravados e sai")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = PriceStore(args.store_dir)
+
+    if args.list:
+        for ticker in store.tickers():
+            print(f"{ticker:<12} {store.rows(ticker):>6} barras até {store.last_date(ticker)}")
+        return 0
+
+    tickers = [t.upper() for t in args.tickers] or store.tickers()
+    if not tickers:
+        print("Nenhum ticker informado e o armazenamento está vazio.", file=sys.stderr)
+        return 1
+
+    print(f"Ingerindo {len(tickers)} ticker(s) de '{args.provider}' em {args.store_dir}...")
+    started = time.perf_counter()
+    results = ingest(tickers, store, create_price_provider(args.provider), args.start, args.end, args.workers)
+    failed = 0
+    for ticker in tickers:
+        result = results[ticker]
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{ticker:<12} erro: {result}", file=sys.stderr)
+        else:
+            print(f"{ticker:<12} +{result} barras (total {store.rows(ticker)}, até {store.last_date(ticker)})")
+    print(f"Concluído em {time.perf_counter() - started:.1f}s; {failed} com erro")
+    return 1 if failed == len(tickers) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
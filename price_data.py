@@ -0,0 +1,97 @@
+"""
+Coleta das séries de preços do treino (`train_model.py`) e da avaliação
+walk-forward (`walk_forward.py`).
+
+Usa o armazenamento local de preços quando ele tem o ticker e, caso
+contrário, baixa do Yahoo Finance (ou gera dados sintéticos se o download
+falhar). Não importa TensorFlow nem Keras: os processos de coleta são criados
+com "spawn" e importam só este módulo, então cada um custa apenas yfinance e
+pandas.
+"""
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from api.price_store import PriceStore
+
+# Armazenamento local de preços (ingest_prices.py): quando tem o ticker, é usado
+# no lugar do download
+PRICE_STORE_DIR = os.getenv('PRICE_STORE_DIR', 'data/prices')
+
+
+def load_stored_data(ticker, start, end, store_dir=None):
+    """Barras do armazenamento local em [start, end), ou None se o ticker não estiver nele."""
+    bars = PriceStore(store_dir or PRICE_STORE_DIR).read(ticker, pd.Timestamp(start).date(), pd.Timestamp(end).date())
+    if not len(bars):
+        return None
+    return pd.DataFrame({name.capitalize(): bars[name] for name in ('close', 'open', 'high', 'low', 'volume')},
+                        index=pd.DatetimeIndex(bars.dates, name='Date'))
+
+
+def download_data(ticker, start, end, store_dir=None):
+    store_dir = store_dir or PRICE_STORE_DIR
+    df = load_stored_data(ticker, start, end, store_dir)
+    if df is not None:
+        print(f"Dados de {ticker} lidos do armazenamento local ({store_dir}): {len(df)} registros")
+        return df
+
+    print(f"Baixando dados para {ticker} de {start} até {end}...")
+    try:
+        df = yf.download(ticker, start=start, end=end, progress=False)
+        if df.empty:
+            raise ValueError("DataFrame vazio")
+        print("Dados baixados com sucesso.")
+        print(f"Total de registros: {len(df)}")
+    except Exception as e:
+        print(f"Erro ao baixar dados: {e}")
+        print("Criando dados sintéticos para demonstração...")
+        # Criar dados sintéticos para teste
+        date_range = pd.date_range(start=start, end=end, freq='B')  # Business days
+        np.random.seed(42)
+        # Simular preços de ações com tendência e volatilidade
+        base_price = 150
+        trend = np.linspace(0, 50, len(date_range))
+        volatility = np.random.randn(len(date_range)) * 5
+        prices = base_price + trend + volatility
+        prices = np.maximum(prices, 1)  # Garantir preços positivos
+
+        df = pd.DataFrame({
+            'Close': prices,
+            'Open': prices * (1 + np.random.randn(len(date_range)) * 0.01),
+            'High': prices * (1 + np.abs(np.random.randn(len(date_range))) * 0.02),
+            'Low': prices * (1 - np.abs(np.random.randn(len(date_range))) * 0.02),
+            'Volume': np.random.randint(1000000, 10000000, len(date_range))
+        }, index=date_range)
+        print(f"Dados sintéticos criados. Total de registros: {len(df)}")
+
+    # Verificar se o DataFrame tem multi-level columns (caso do yfinance atualizado)
+    if isinstance(df.columns, pd.MultiIndex):
+        # Achatar as colunas multi-level
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+
+def load_ticker_series(ticker, start, end, store_dir=None):
+    """Datas e fechamentos (float64) de um ticker. Executada nos processos de coleta."""
+    df = download_data(ticker, start, end, store_dir)
+    return df.index.values.astype('datetime64[D]'), df['Close'].to_numpy(dtype=np.float64)
+
+
+def load_series(tickers, start, end, workers=1, store_dir=None):
+    """
+    Séries de fechamento dos tickers, na ordem de `tickers`. Com mais de um
+    ticker, a coleta (download ou leitura do armazenamento local) é feita em
+    paralelo por até `workers` processos.
+    """
+    args = [(ticker, start, end, store_dir or PRICE_STORE_DIR) for ticker in tickers]
+    if len(tickers) == 1 or workers <= 1:
+        return [load_ticker_series(*a) for a in args]
+    # spawn: o processo que chama já pode ter importado o TensorFlow, que não é seguro
+    # após fork. Processos, e não threads, porque o yf.download guarda o resultado em
+    # estado global do módulo
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(min(workers, len(tickers))) as pool:
+        return pool.starmap(load_ticker_series, args)
@@ -0,0 +1,133 @@
+"""
+Testes do controle de admissão e do limite por cliente (api/admission.py)
+"""
+import asyncio
+import threading
+
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.admission import AdmissionMiddleware, ClientRateLimiter, ConcurrencyLimiter, Overloaded
+
+
+def test_limiter_queue_and_rejections():
+    """Acima do limite espera na fila; com a fila cheia ou após o prazo é recusada"""
+    async def scenario():
+        limiter = ConcurrencyLimiter("inference", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        await limiter.acquire()
+
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.stats()["queue_depth"] == 1
+        with pytest.raises(Overloaded) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_full" and rejected.value.retry_after >= 1
+
+        # A vaga liberada passa direto para a requisição da fila
+        limiter.release(0.01)
+        await waiting
+        assert limiter.stats()["active"] == 1
+
+        with pytest.raises(Overloaded) as expired:
+            await limiter.acquire()
+        assert expired.value.reason == "queue_timeout"
+        limiter.release()
+        assert limiter.stats()["active"] == 0
+        assert limiter.stats()["rejected_total"] == {"queue_full": 1, "queue_timeout": 1}
+        assert limiter.stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_slots():
+    async def scenario():
+        limiter = ConcurrencyLimiter("fetch", max_concurrent=1, max_queue=4, queue_timeout=5)
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        limiter.release()
+        assert limiter.stats()["active"] == 0 and limiter.stats()["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_rate_limiter_token_bucket():
+    now = [0.0]
+    limiter = ClientRateLimiter(rate=2.0, burst=3, max_clients=2, clock=lambda: now[0])
+    assert [limiter.check("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("a") == pytest.approx(0.5)
+    # Outros clientes têm o próprio balde
+    assert limiter.check("b") == 0.0
+    now[0] += 0.5
+    assert limiter.check("a") == 0.0
+    assert limiter.stats()["limited_total"] == 1
+    # Só os `max_clients` mais recentes são mantidos
+    limiter.check("c")
+    assert limiter.stats()["clients"] == 2
+
+
+def make_app(limiters, rate_limiters=None):
+    app = FastAPI()
+    release = threading.Event()
+
+    @app.get("/slow")
+    def slow():
+        release.wait(5)
+        return {"ok": True}
+
+    @app.get("/fetch/{ticker}")
+    def fetch(ticker: str):
+        return {"ticker": ticker}
+
+    @app.get("/health")
+    def health():
+        return {"status": "alive"}
+
+    app.add_middleware(AdmissionMiddleware, routes=app.router.routes,
+                       route_classes={"/slow": "inference", "/fetch/{ticker}": "fetch"},
+                       limiters=limiters, rate_limiters=rate_limiters, client_header="X-Forwarded-For")
+    return app, release
+
+
+def test_middleware_sheds_load_with_retry_after():
+    """Com a vaga e a fila ocupadas, a requisição seguinte recebe 503 na hora; health não é limitado"""
+    limiter = ConcurrencyLimiter("inference", max_concurrent=1, max_queue=0)
+    app, release = make_app({"inference": limiter})
+    with TestClient(app) as client:
+        worker = threading.Thread(target=client.get, args=("/slow",))
+        worker.start()
+        try:
+            for _ in range(100):
+                if limiter.stats()["active"]:
+                    break
+                threading.Event().wait(0.01)
+            response = client.get("/slow")
+            assert response.status_code == 503
+            assert int(response.headers["Retry-After"]) >= 1
+            assert client.get("/health").status_code == 200
+        finally:
+            release.set()
+            worker.join()
+        assert client.get("/slow").status_code == 200
+    assert limiter.stats()["active"] == 0
+
+
+def test_middleware_rate_limits_per_client():
+    app, _ = make_app({}, {"fetch": ClientRateLimiter(rate=0.1, burst=2)})
+    with TestClient(app) as client:
+        headers = {"X-Forwarded-For": "10.0.0.1, 10.0.0.254"}
+        assert [client.get("/fetch/AAPL", headers=headers).status_code for _ in range(3)] == [200, 200, 429]
+        limited = client.get("/fetch/AAPL", headers=headers)
+        assert limited.status_code == 429 and int(limited.headers["Retry-After"]) >= 1
+        assert client.get("/fetch/AAPL", headers={"X-Forwarded-For": "10.0.0.2"}).status_code == 200
+        assert client.get("/health").status_code == 200
@@ -10,6 +10,7 @@ import os
 # Adicionar o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from api import binary_format
 from api.main import app
 
 @pytest.fixture
@@ -220,5 +221,174 @@ def test_predict_auto_valid_ticker(client):
         assert result["codigo_acao"] == "AAPL"
 
 
+def test_predict_batch_windows(client):
+    """Testa o endpoint em lote com várias janelas"""
+    windows = [[150.0 + i * 0.5 for i in range(60)], [180.0 + i * 0.2 for i in range(60)]]
+
+    response = client.post("/predict/batch", json={"windows": windows})
+    assert response.status_code in [200, 503]
+    if response.status_code == 200:
+        result = response.json()
+        assert result["count"] == 2
+        assert len(result["predictions"]) == 2
+
+
+def test_predict_batch_series(client):
+    """Testa o endpoint em lote com uma série cortada em janelas deslizantes"""
+    series = [150.0 + i * 0.5 for i in range(70)]
+
+    response = client.post("/predict/batch", json={"series": series})
+    assert response.status_code in [200, 503]
+    if response.status_code == 200:
+        assert response.json()["count"] == 11
+
+
+def test_predict_batch_invalid_window_size(client):
+    """Testa o endpoint em lote com janela de tamanho incorreto"""
+    response = client.post("/predict/batch", json={"windows": [[150.0] * 30]})
+    assert response.status_code in [400, 503]
+
+
+def test_predict_batch_requires_one_field(client):
+    """Testa o endpoint em lote sem janelas nem série"""
+    response = client.post("/predict/batch", json={})
+    assert response.status_code in [400, 503]
+
+
+def test_forecast_single_ticker(client):
+    """Testa a previsão de vários dias para um ticker"""
+    response = client.get("/forecast/AAPL?horizon=5")
+    assert response.status_code in [200, 503, 500]
+    if response.status_code == 200:
+        result = response.json()
+        assert result["codigo_acao"] == "AAPL"
+        assert len(result["forecast"]) == 5
+
+
+def test_forecast_invalid_horizon(client):
+    """Testa a previsão de vários dias com horizonte fora do limite"""
+    response = client.get("/forecast/AAPL?horizon=0")
+    assert response.status_code == 422
+
+
+def test_forecast_batch(client):
+    """Testa a previsão de vários dias para uma lista de tickers"""
+    response = client.post("/forecast", json={"tickers": ["AAPL", "MSFT"], "horizon": 3})
+    assert response.status_code in [200, 503]
+    if response.status_code == 200:
+        assert "forecasts" in response.json()
+
+
+def test_stream_websocket(client):
+    """Testa o endpoint de streaming via WebSocket"""
+    with client.websocket_connect("/ws/predict") as websocket:
+        websocket.send_json({"ticker": "AAPL", "prices": [150.0 + i * 0.5 for i in range(60)]})
+        message = websocket.receive_json()
+        # Modelo não carregado em ambiente de teste gera uma mensagem de erro
+        assert "error" in message or "predicted_next_day_close_price" in message
+
+
+def test_batching_metrics(client):
+    """Testa o endpoint de métricas do micro-batching"""
+    response = client.get("/metrics/batching")
+    assert response.status_code == 200
+    assert "enabled" in response.json()
+
+
+def test_prediction_cache_metrics(client):
+    """Testa o endpoint de métricas do cache de previsões"""
+    response = client.get("/metrics/prediction-cache")
+    assert response.status_code == 200
+    assert "enabled" in response.json()
+
+
+def test_admin_reload_requires_token(client):
+    """Testa que a recarga do modelo exige o token administrativo"""
+    response = client.post("/admin/reload")
+    assert response.status_code in [401, 403]
+    response = client.get("/admin/model", headers={"X-Admin-Token": "errado"})
+    assert response.status_code in [401, 403]
+
+
+def test_liveness_probe(client):
+    """Testa o probe de vida (não depende do modelo)"""
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json()["status"] == "alive"
+
+
+def test_readiness_probe(client):
+    """Testa o probe de prontidão: 503 enquanto o modelo não estiver pronto"""
+    response = client.get("/health/ready")
+    assert response.status_code in [200, 503]
+    assert "phases_ms" in response.json()["startup"]
+
+
+def test_prometheus_metrics(client):
+    """Testa o endpoint de métricas no formato Prometheus"""
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
+    assert "# TYPE request_stage_duration_seconds histogram" in response.text
+    assert 'admission_active_requests{endpoint_class="inference"}' in response.text
+
+
+def test_admission_metrics(client):
+    """Testa o endpoint de métricas do controle de admissão"""
+    response = client.get("/metrics/admission")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["limits"]) == {"inference", "fetch"}
+    assert data["limits"]["inference"]["active"] == 0
+    assert "fetch" in data["rate_limits"]
+
+
+def test_prewarm_metrics(client):
+    """Testa o endpoint de métricas do pré-aquecimento"""
+    response = client.get("/metrics/prewarm")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["enabled"] is True
+    assert data["top_n"] > 0
+    assert isinstance(data["top_tickers"], list)
+
+
+def test_predict_binary_format(client):
+    """Testa o /predict com corpo e resposta no formato binário"""
+    body = binary_format.encode_array([150.0 + i * 0.5 for i in range(60)])
+    headers = {"Content-Type": binary_format.MEDIA_TYPE, "Accept": binary_format.MEDIA_TYPE}
+
+    response = client.post("/predict", content=body, headers=headers)
+    assert response.status_code in [200, 503]
+    if response.status_code == 200:
+        assert response.headers["content-type"] == binary_format.MEDIA_TYPE
+        assert binary_format.decode_array(response.content).shape == (1,)
+        assert "X-Model-Version" in response.headers
+
+
+def test_predict_binary_malformed(client):
+    """Testa o /predict com corpo binário mal formado"""
+    response = client.post("/predict", content=b"xyz", headers={"Content-Type": binary_format.MEDIA_TYPE})
+    assert response.status_code == 400
+
+
+def test_predict_batch_binary_windows(client):
+    """Testa o endpoint em lote com janelas no formato binário e resposta JSON"""
+    windows = [[150.0 + i * 0.5 for i in range(60)], [180.0 + i * 0.2 for i in range(60)]]
+    response = client.post("/predict/batch", content=binary_format.encode_array(windows),
+                           headers={"Content-Type": binary_format.MEDIA_TYPE})
+    assert response.status_code in [200, 503]
+    if response.status_code == 200:
+        assert response.json()["count"] == 2
+
+
+def test_predict_invalid_json_body(client):
+    """Testa que um corpo JSON inválido continua retornando 422"""
+    response = client.post("/predict", content=b"{nao e json", headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
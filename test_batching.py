@@ -0,0 +1,130 @@
+"""
+Testes do micro-batching de inferência (api/batching.py)
+Usa uma função de previsão falsa para não depender do modelo treinado
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.batching import MicroBatcher
+
+
+def fake_predict(batch):
+    """Simula o modelo: devolve a média de cada janela, formato (N, 1)"""
+    time.sleep(0.01)
+    return batch.mean(axis=1)
+
+
+@pytest.fixture
+def batcher():
+    """Fixture com um batcher de janela larga para forçar agrupamento"""
+    b = MicroBatcher(fake_predict, max_batch_size=8, max_wait_ms=50).start()
+    yield b
+    b.close()
+
+
+def test_single_request(batcher):
+    """Uma requisição isolada é processada após a janela de espera"""
+    window = np.arange(60, dtype=np.float32)
+    result = batcher.predict(window, timeout=5)
+    assert result.shape == (1,)
+    assert result[0] == pytest.approx(window.mean())
+
+
+def test_concurrent_requests_are_batched(batcher):
+    """Requisições concorrentes formam lotes e cada uma recebe o seu resultado"""
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.predict(np.full(60, float(i)), timeout=5)[0]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: pytest.approx(float(i)) for i in range(16)}
+    stats = batcher.stats()
+    assert stats["requests_total"] == 16
+    assert stats["batches_total"] < 16
+    assert stats["avg_batch_size"] > 1
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] <= 16
+
+
+def test_max_batch_size_is_respected():
+    """Nenhum lote ultrapassa max_batch_size"""
+    sizes = []
+
+    def recording_predict(batch):
+        sizes.append(batch.shape[0])
+        return batch.mean(axis=1)
+
+    b = MicroBatcher(recording_predict, max_batch_size=4, max_wait_ms=20).start()
+    futures = [b.submit(np.ones(60)) for _ in range(10)]
+    for f in futures:
+        f.result(timeout=5)
+    b.close()
+
+    assert sum(sizes) == 10
+    assert max(sizes) <= 4
+
+
+def test_errors_are_propagated_to_callers():
+    """Uma falha do modelo é repassada a todas as requisições do lote"""
+    def failing_predict(batch):
+        raise ValueError("falha simulada")
+
+    b = MicroBatcher(failing_predict, max_batch_size=4, max_wait_ms=1).start()
+    with pytest.raises(ValueError):
+        b.predict(np.ones(60), timeout=5)
+    assert b.stats()["errors_total"] == 1
+    b.close()
+
+
+def test_mismatched_window_does_not_kill_worker():
+    """Janelas de tamanhos diferentes no mesmo lote falham só esse lote; o worker continua atendendo"""
+    b = MicroBatcher(fake_predict, max_batch_size=4, max_wait_ms=50).start()
+    futures = [b.submit(np.ones(60)), b.submit(np.ones(30))]
+    for f in futures:
+        with pytest.raises(ValueError):
+            f.result(timeout=5)
+    assert b.stats()["errors_total"] == 1
+
+    result = b.predict(np.full(60, 2.0), timeout=5)
+    assert result[0] == pytest.approx(2.0)
+    b.close()
+
+
+def test_window_size_is_validated_on_submit():
+    """Com window_size, a janela de outro tamanho é recusada na hora e não entra na fila"""
+    b = MicroBatcher(fake_predict, max_batch_size=4, max_wait_ms=1, window_size=60).start()
+    with pytest.raises(ValueError):
+        b.submit(np.ones(30))
+    assert b.stats()["requests_total"] == 0
+    assert b.predict(np.ones(60), timeout=5)[0] == pytest.approx(1.0)
+    b.close()
+
+
+def test_submit_after_close_fails():
+    """Não é possível enfileirar após o encerramento"""
+    b = MicroBatcher(fake_predict).start()
+    b.close()
+    with pytest.raises(RuntimeError):
+        b.submit(np.ones(60))
+
+
+def test_invalid_configuration():
+    """Parâmetros inválidos são rejeitados"""
+    with pytest.raises(ValueError):
+        MicroBatcher(fake_predict, max_batch_size=0)
+    with pytest.raises(ValueError):
+        MicroBatcher(fake_predict, max_wait_ms=-1)
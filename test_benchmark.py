@@ -0,0 +1,58 @@
+"""
+Testes das estatísticas e da comparação com o baseline do benchmark.py
+"""
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import compare, run_level, summarize
+
+
+def result(p50=10.0, p95=20.0, p99=30.0, throughput=100.0, errors=0, concurrency=8):
+    return {"mode": "inprocess", "scenario": "predict", "concurrency": concurrency, "errors": errors,
+            "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "throughput_rps": throughput}
+
+
+def test_summarize():
+    """Percentis em milissegundos e vazão em requisições por segundo"""
+    stats = summarize([0.001 * i for i in range(1, 101)], errors=2, elapsed=2.0)
+    assert stats["requests"] == 100
+    assert stats["errors"] == 2
+    assert stats["throughput_rps"] == 50.0
+    assert stats["p50_ms"] == pytest.approx(50.5)
+    assert stats["p99_ms"] == pytest.approx(99.01)
+
+
+def test_compare_within_tolerance():
+    baseline = {"results": [result()]}
+    assert compare([result(p50=11.0, throughput=90.0)], baseline, tolerance=0.2) == []
+
+
+def test_compare_detects_regressions():
+    """Latência maior, vazão menor ou mais erros que o baseline são pioras"""
+    baseline = {"results": [result()]}
+    regressions = compare([result(p99=40.0, throughput=70.0, errors=1)], baseline, tolerance=0.2)
+    assert sorted(r["metric"] for r in regressions) == ["errors", "p99_ms", "throughput_rps"]
+
+
+def test_compare_ignores_missing_combinations():
+    baseline = {"results": [result(concurrency=1)]}
+    assert compare([result(p50=1000.0, concurrency=32)], baseline) == []
+
+
+def test_run_level_counts_requests_and_errors():
+    """Cada nível executa exatamente o número de requisições pedido"""
+
+    class FakeTarget:
+        calls = 0
+
+        def request(self, method, path, json_body=None):
+            FakeTarget.calls += 1
+            return 500 if FakeTarget.calls % 10 == 0 else 200
+
+    stats = run_level(FakeTarget(), "predict", concurrency=3, requests=20, warmup=0)
+    assert stats["requests"] == 20
+    assert stats["errors"] == 2
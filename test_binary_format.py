@@ -0,0 +1,71 @@
+"""
+Testes do formato binário compacto (application/x-float32)
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.binary_format import (MEDIA_TYPE, BinaryFormatError, accepts_binary, decode_array, encode_array,
+                               is_binary)
+
+
+@pytest.mark.parametrize("values", [[1.5, 2.5, 3.5], [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]])
+def test_round_trip(values):
+    """Serializar e ler de volta preserva formato e valores"""
+    decoded = decode_array(encode_array(values))
+    np.testing.assert_array_equal(decoded, np.asarray(values, dtype=np.float32))
+
+
+def test_decode_is_zero_copy():
+    """O array lido aponta para os próprios bytes recebidos"""
+    data = encode_array(np.arange(60, dtype=np.float32))
+    decoded = decode_array(data)
+    assert not decoded.flags.writeable
+    assert not decoded.flags.owndata
+    assert decoded.base is not None
+
+
+def test_header_size():
+    """Cabeçalho de 4 + 4·ndim bytes seguido dos float32"""
+    assert len(encode_array([1.0] * 60)) == 8 + 60 * 4
+    assert len(encode_array([[1.0] * 60] * 2)) == 12 + 120 * 4
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"JSON",
+    b"F32\x03" + b"\x00" * 12,
+    b"F32\x01\x02\x00",
+    b"F32\x01\x03\x00\x00\x00" + b"\x00" * 8,
+    encode_array([1.0, 2.0]) + b"\x00",
+    encode_array([1.0, float("nan")]),
+])
+def test_decode_malformed(data):
+    """Corpos mal formados geram BinaryFormatError"""
+    with pytest.raises(BinaryFormatError):
+        decode_array(data)
+
+
+def test_is_binary():
+    assert is_binary(MEDIA_TYPE)
+    assert is_binary("Application/X-Float32; charset=binary")
+    assert not is_binary("application/json")
+    assert not is_binary(None)
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, False),
+    ("application/json", False),
+    ("*/*", False),
+    (MEDIA_TYPE, True),
+    (f"{MEDIA_TYPE}, application/json;q=0.5", True),
+    (f"application/json, {MEDIA_TYPE};q=0.5", False),
+    (f"{MEDIA_TYPE};q=0", False),
+])
+def test_accepts_binary(accept, expected):
+    """JSON continua o padrão; binário só quando preferido no Accept"""
+    assert accepts_binary(accept) is expected
@@ -0,0 +1,134 @@
+"""
+Testes do scoring em lote (bulk_score.py)
+Usa o modelo treinado em api/models e séries sintéticas em arquivos temporários
+"""
+import csv
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Adicionar o diretório raiz ao path
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from bulk_score import MODELS_DIR, Scorer, error_metrics, find_inputs, main, run
+from api.preprocessing import inverse_scale_prices, scale_prices
+
+requires_model = pytest.mark.skipif(not os.path.exists(os.path.join(MODELS_DIR, "stock_lstm_model.h5")),
+                                    reason="Modelo treinado não encontrado")
+
+
+def random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    return 150 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Dois tickers em CSV (com datas), um em .npy e um com histórico curto demais"""
+    for i, ticker in enumerate(["AAA", "BBB"]):
+        prices = random_walk(200, i)
+        pd.DataFrame({"Date": pd.bdate_range("2023-01-02", periods=200).strftime("%Y-%m-%d"),
+                      "close": prices}).to_csv(tmp_path / f"{ticker}.csv", index=False)
+    np.save(tmp_path / "CCC.npy", random_walk(130, 7))
+    pd.DataFrame({"Date": ["2024-01-02"], "Close": [10.0]}).to_csv(tmp_path / "SHORT.csv", index=False)
+    (tmp_path / "notas.txt").write_text("ignorado")
+    return tmp_path
+
+
+def read_csv_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_find_inputs(data_dir):
+    """Diretórios contribuem só com .csv/.npy; arquivos repetidos aparecem uma vez"""
+    files = find_inputs([str(data_dir), str(data_dir / "AAA.csv")])
+    assert sorted(os.path.basename(f) for f in files) == ["AAA.csv", "BBB.csv", "CCC.npy", "SHORT.csv"]
+
+
+def test_error_metrics():
+    metrics = error_metrics(np.array([100.0, 200.0]), np.array([110.0, 190.0]))
+    assert metrics == {"windows": 2, "mae": 10.0, "rmse": 10.0, "mape": pytest.approx(7.5)}
+    assert error_metrics(np.array([]), np.array([]))["mae"] is None
+
+
+@requires_model
+def test_predict_series_matches_model(data_dir):
+    """Cada previsão é a saída do modelo para a janela que termina no dia anterior"""
+    scorer = Scorer(chunk_size=16)
+    bundle = scorer.default
+    prices = random_walk(200, 0)
+    predicted = scorer.predict_series(bundle, prices)
+    assert len(predicted) == 200 - 60
+
+    scaled = scale_prices(bundle.scaler, prices)
+    for i in (0, 17, 139):
+        window = scaled[i:i + 60].reshape(1, 60, 1)
+        expected = inverse_scale_prices(bundle.scaler, bundle.model.predict(window))[0, 0]
+        assert predicted[i] == pytest.approx(expected, rel=1e-5)
+
+
+@requires_model
+def test_run_writes_predictions_and_metrics(data_dir, tmp_path):
+    """Previsões e métricas por ticker são gravadas; erros ficam na coluna 'error'"""
+    output, metrics_path = tmp_path / "out" / "p.csv", tmp_path / "out" / "m.csv"
+    totals, failed = run(find_inputs([str(data_dir)]), output=str(output), metrics_path=str(metrics_path),
+                         workers=1, chunk_size=32)
+    assert failed == ["SHORT"]
+    assert totals.windows == 140 + 140 + 70
+
+    predictions = read_csv_rows(output)
+    assert len(predictions) == totals.windows
+    assert predictions[0]["ticker"] == "AAA"
+    assert predictions[0]["date"] == pd.bdate_range("2023-01-02", periods=61)[-1].strftime("%Y-%m-%d")
+
+    metrics = {row["ticker"]: row for row in read_csv_rows(metrics_path)}
+    assert metrics["CCC"]["windows"] == "70"
+    assert float(metrics["AAA"]["mae"]) > 0
+    assert metrics["SHORT"]["error"]
+
+
+@requires_model
+def test_multiprocess_matches_single_process(data_dir, tmp_path):
+    """Distribuir os tickers entre processos não muda os resultados"""
+    files = find_inputs([str(data_dir)])
+    single, _ = run(files, metrics_path=str(tmp_path / "m1.csv"), workers=1)
+    multi, _ = run(files, metrics_path=str(tmp_path / "m2.csv"), workers=2)
+    assert multi.metrics() == pytest.approx(single.metrics())
+    by_ticker = lambda path: {r["ticker"]: r for r in read_csv_rows(path)}  # noqa: E731
+    assert by_ticker(tmp_path / "m1.csv") == by_ticker(tmp_path / "m2.csv")
+
+
+@requires_model
+def test_start_date_filter(data_dir, tmp_path):
+    """Com --start, só os dias a partir da data entram nas previsões e métricas"""
+    totals, _ = run([str(data_dir / "AAA.csv")], output=str(tmp_path / "p.csv"), workers=1, start="2023-09-01")
+    dates = [row["date"] for row in read_csv_rows(tmp_path / "p.csv")]
+    assert dates and min(dates) >= "2023-09-01"
+    assert totals.windows == len(dates) < 140
+
+
+@requires_model
+def test_start_date_rejects_undated_inputs(data_dir, tmp_path):
+    """--start com arquivos sem datas (.npy) é recusado em vez de ignorado"""
+    _, failed = run([str(data_dir / "CCC.npy")], metrics_path=str(tmp_path / "m.csv"), workers=1,
+                    start="2023-09-01")
+    assert failed == ["CCC"]
+    assert "--start" in read_csv_rows(tmp_path / "m.csv")[0]["error"]
+    assert main([str(data_dir), "--start", "2023-09-01", "--metrics", str(tmp_path / "m2.csv")]) == 1
+    assert not (tmp_path / "m2.csv").exists()
+
+
+@requires_model
+def test_predict_series_memmap_float32(data_dir):
+    """Séries .npy float32 mapeadas em memória dão o mesmo resultado da série em memória"""
+    scorer = Scorer(chunk_size=16)
+    prices = random_walk(130, 3).astype(np.float32)
+    np.save(data_dir / "F32.npy", prices)
+    mapped = np.load(data_dir / "F32.npy", mmap_mode="r")
+    np.testing.assert_allclose(scorer.predict_series(scorer.default, mapped),
+                               scorer.predict_series(scorer.default, prices.astype(np.float64)))
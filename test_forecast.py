@@ -0,0 +1,71 @@
+"""
+Testes da previsão de vários dias (api/forecast.py) e da API de estado do motor NumPy
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from api.forecast import forecast_dates, recursive_forecast
+from api.numpy_lstm import NumpyLSTMModel
+
+MODEL_PATH = os.path.join(ROOT_DIR, 'api', 'models', 'stock_lstm_model.h5')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="Modelo treinado não encontrado")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return NumpyLSTMModel.from_h5(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def windows():
+    return np.random.default_rng(7).uniform(0.3, 0.9, size=(4, 60)).astype(np.float32)
+
+
+def test_step_continues_encoded_sequence(engine, windows):
+    """encode + step no último preço equivale ao forward pass da janela inteira"""
+    state = engine.encode(windows[:, :-1])
+    stepped = engine.step(windows[:, -1:], state)
+    np.testing.assert_allclose(stepped, engine.predict(windows), atol=1e-6)
+
+
+def test_first_day_matches_predict(engine, windows):
+    """O primeiro dia do rollout é a previsão normal do modelo"""
+    path = recursive_forecast(engine, windows, horizon=10)
+    assert path.shape == (4, 10)
+    np.testing.assert_allclose(path[:, 0], engine.predict(windows)[:, 0], atol=1e-6)
+
+
+def test_rollout_feeds_back_predictions(engine, windows):
+    """Cada dia é o passo da LSTM alimentado com a previsão anterior"""
+    path = recursive_forecast(engine, windows, horizon=3)
+    extended = np.concatenate([windows, path[:, :2]], axis=1)
+    # Com o estado acumulado, o dia 3 equivale a processar a janela estendida de 62 passos
+    np.testing.assert_allclose(path[:, 2], engine.predict(extended)[:, 0], atol=1e-5)
+
+
+def test_batched_rollout_matches_individual(engine, windows):
+    """Rollout em lote dá o mesmo resultado que ticker a ticker"""
+    batched = recursive_forecast(engine, windows, horizon=5)
+    for i in range(len(windows)):
+        np.testing.assert_allclose(recursive_forecast(engine, windows[i:i + 1], horizon=5)[0],
+                                   batched[i], atol=1e-6)
+
+
+def test_invalid_horizon(engine, windows):
+    with pytest.raises(ValueError):
+        recursive_forecast(engine, windows, horizon=0)
+
+
+def test_forecast_dates_skip_weekends():
+    """As datas previstas são dias úteis após a última data conhecida"""
+    # 2024-07-19 é uma sexta-feira
+    assert forecast_dates(date(2024, 7, 19), 3) == ["2024-07-22", "2024-07-23", "2024-07-24"]
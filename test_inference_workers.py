@@ -0,0 +1,174 @@
+"""
+Testes dos processos de inferência com pesos compartilhados (api/inference_workers.py)
+Usa um modelo NumPy pequeno com pesos aleatórios
+"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.inference_workers import InferenceWorkerPool, SharedWeights
+from api.numpy_lstm import DenseLayer, LSTMLayer, NumpyLSTMModel
+
+
+def make_model(units=8, seed=0):
+    """LSTM (com sequência) + LSTM + Dense, como o modelo treinado, em tamanho reduzido"""
+    rng = np.random.default_rng(seed)
+    w = lambda *shape: rng.normal(0, 0.3, size=shape).astype(np.float32)  # noqa: E731
+    return NumpyLSTMModel(
+        [LSTMLayer(w(1, 4 * units), w(units, 4 * units), w(4 * units), return_sequences=True, name="lstm"),
+         LSTMLayer(w(units, 4 * units), w(units, 4 * units), w(4 * units), return_sequences=False, name="lstm_1")],
+        [DenseLayer(w(units, 1), w(1), name="dense")])
+
+
+@pytest.fixture(scope="module")
+def model():
+    return make_model()
+
+
+@pytest.fixture(scope="module")
+def pool(model):
+    """Dois processos, com lotes de no máximo 16 janelas para forçar a divisão"""
+    p = InferenceWorkerPool(model, workers=2, max_rows=16, max_steps=60, name="teste").start()
+    yield p
+    p.close()
+
+
+@pytest.fixture
+def windows():
+    return np.random.default_rng(1).uniform(0, 1, size=(50, 60, 1)).astype(np.float32)
+
+
+def test_shared_weights_round_trip(model, windows):
+    """O modelo montado sobre o arquivo mapeado é idêntico ao original e somente leitura"""
+    weights = SharedWeights.create(model)
+    try:
+        shared = weights.model()
+        np.testing.assert_array_equal(shared.predict(windows), model.predict(windows))
+        assert not shared.lstm_layers[0].kernel.flags.writeable
+        with pytest.raises(ValueError):
+            shared.lstm_layers[0].kernel[0, 0] = 1.0
+    finally:
+        weights.close()
+    assert not os.path.exists(weights.path)
+
+
+def test_predict_matches_model(pool, model, windows):
+    """Lotes divididos entre os processos dão o mesmo resultado do modelo em processo"""
+    np.testing.assert_array_equal(pool.predict(windows), model.predict(windows))
+    np.testing.assert_array_equal(pool.predict(windows[:1, :, 0]), model.predict(windows[:1]))
+
+
+def test_pool_model_uses_shared_weights(pool, model, windows):
+    """O modelo do processo principal lê os mesmos pesos mapeados"""
+    assert not pool.model.lstm_layers[0].kernel.flags.writeable
+    np.testing.assert_array_equal(pool.model.predict(windows), model.predict(windows))
+
+
+def test_concurrent_callers(pool, model, windows):
+    """Chamadas de várias threads recebem cada uma o seu resultado"""
+    expected = model.predict(windows)
+    errors = []
+
+    def call(i):
+        rows = slice(i, i + 20)
+        for _ in range(5):
+            if not np.array_equal(pool.predict(windows[rows]), expected[rows]):
+                errors.append(i)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_invalid_input(pool):
+    """Formatos incompatíveis são rejeitados antes de chegar aos processos"""
+    with pytest.raises(ValueError):
+        pool.predict(np.zeros((2, 61, 1), dtype=np.float32))
+    with pytest.raises(ValueError):
+        pool.predict(np.zeros((2, 60, 3), dtype=np.float32))
+
+
+def test_dead_worker_is_replaced(model, windows):
+    """Um processo que morre falha a requisição em curso e é substituído"""
+    p = InferenceWorkerPool(model, workers=1, max_rows=64, name="restart").start()
+    try:
+        p._workers[0].process.kill()
+        p._workers[0].process.join(5)
+        with pytest.raises(RuntimeError):
+            p.predict(windows)
+        np.testing.assert_array_equal(p.predict(windows), model.predict(windows))
+        assert p.stats()["restarts_total"] == 1
+    finally:
+        p.close()
+
+
+def test_failed_respawn_is_retried(model, windows, monkeypatch):
+    """Se a recriação falhar, o processo continua reservado e é recriado na nova tentativa"""
+    p = InferenceWorkerPool(model, workers=1, max_rows=64, name="respawn", respawn_backoff=0.05).start()
+    try:
+        spawn = p._spawn
+        calls = []
+
+        def flaky_spawn(index):
+            calls.append(index)
+            if len(calls) == 1:
+                raise RuntimeError("falha simulada")
+            return spawn(index)
+
+        monkeypatch.setattr(p, "_spawn", flaky_spawn)
+        p._workers[0].process.kill()
+        p._workers[0].process.join(5)
+        with pytest.raises(RuntimeError):
+            p.predict(windows)
+        assert p.stats()["respawn_failures_total"] == 1
+        # A nova tentativa, em segundo plano, recria o processo
+        deadline = time.monotonic() + 30
+        while p.stats()["available"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert calls == [0, 0]
+        np.testing.assert_array_equal(p.predict(windows), model.predict(windows))
+    finally:
+        p.close()
+
+
+def test_no_available_worker_fails_fast(model, windows, monkeypatch):
+    """Sem nenhum processo em funcionamento, a previsão falha em vez de bloquear"""
+    p = InferenceWorkerPool(model, workers=1, max_rows=64, name="down", respawn_backoff=60.0).start()
+    try:
+        def broken_spawn(index):
+            raise RuntimeError("falha simulada")
+
+        monkeypatch.setattr(p, "_spawn", broken_spawn)
+        p._workers[0].process.kill()
+        p._workers[0].process.join(5)
+        with pytest.raises(RuntimeError):
+            p.predict(windows)
+        assert p.stats()["available"] == 0
+        with pytest.raises(RuntimeError, match="Nenhum processo"):
+            p.predict(windows)
+    finally:
+        p.close()
+    assert not p._respawning
+
+
+def test_close_removes_files(model):
+    """Encerrar o pool para os processos e remove os arquivos mapeados"""
+    p = InferenceWorkerPool(model, workers=1, max_rows=8, name="close").start()
+    worker = p._workers[0]
+    paths = [p._weights.path, worker.io_path]
+    p.close()
+    assert not worker.process.is_alive()
+    assert not any(os.path.exists(path) for path in paths)
+    with pytest.raises(RuntimeError):
+        p.predict(np.zeros((1, 60, 1), dtype=np.float32))
+    p.close()  # idempotente
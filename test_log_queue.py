@@ -0,0 +1,50 @@
+"""
+Testes do logging via fila (api/log_queue.py)
+"""
+import logging
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.log_queue import configure_logging, enqueue_handlers
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_enqueued_handlers_receive_records_with_args():
+    """Os registros chegam ao handler original sem perder `args` (usado pelo log de acesso do uvicorn)"""
+    logger = logging.getLogger("test_log_queue.access")
+    logger.propagate = False
+    handler = ListHandler()
+    logger.addHandler(handler)
+
+    listener = enqueue_handlers(logger.name)
+    assert handler not in logger.handlers
+    logger.warning("%s - %d", "GET /", 200)
+    listener.stop()
+
+    assert [r.getMessage() for r in handler.records] == ["GET / - 200"]
+    assert handler.records[0].args == ("GET /", 200)
+    # Aplicar de novo não cria outra fila
+    assert enqueue_handlers(logger.name) is None
+
+
+def test_configure_logging_respects_existing_handlers():
+    """Como o basicConfig, não altera um logger raiz já configurado"""
+    root = logging.getLogger()
+    handler = ListHandler()
+    root.addHandler(handler)
+    try:
+        assert configure_logging() is None
+        assert handler in root.handlers
+    finally:
+        root.removeHandler(handler)
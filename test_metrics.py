@@ -0,0 +1,85 @@
+"""
+Testes das métricas em formato Prometheus (api/metrics.py)
+"""
+import asyncio
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.metrics import MetricsMiddleware, MetricsRegistry, RequestMetrics
+
+
+def test_histogram_render():
+    """Faixas acumuladas, soma e contagem por combinação de rótulos"""
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latência", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, "/predict")
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{route="/predict",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/predict",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/predict",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{route="/predict"} 4' in text
+    assert 'latency_seconds_sum{route="/predict"} 4.05' in text
+
+
+def test_counter_and_label_escaping():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requisições", ("path",))
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    assert requests.value('/a"b') == 3
+    assert 'requests_total{path="/a\\"b"} 3' in registry.render()
+
+
+def test_collectors_are_read_on_render():
+    registry = MetricsRegistry()
+    state = {"hits": 1}
+    registry.register_collector(lambda: [("hits_total", "counter", "Acertos", [("hits_total", {}, state["hits"])])])
+    state["hits"] = 5
+    assert "hits_total 5" in registry.render()
+
+
+def test_middleware_records_route_and_stages():
+    """O middleware mede a rota encontrada e a etapa de serialização"""
+    registry = MetricsRegistry()
+    metrics = RequestMetrics(registry)
+
+    class Route:
+        path = "/predict/{ticker}"
+
+    async def app(scope, receive, send):
+        scope["route"] = Route()
+        with metrics.stage("inference"):
+            pass
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = MetricsMiddleware(app, metrics)
+    asyncio.run(middleware({"type": "http", "method": "GET"}, None, send))
+
+    assert any(name == b"x-process-time" for name, _ in sent[0]["headers"])
+    assert metrics.requests.value("GET", "/predict/{ticker}", "200") == 1
+    assert metrics.stages.count("/predict/{ticker}", "inference") == 1
+    assert metrics.stages.count("/predict/{ticker}", "serialization") == 1
+
+
+def test_middleware_counts_unhandled_errors():
+    registry = MetricsRegistry()
+    metrics = RequestMetrics(registry)
+
+    async def app(scope, receive, send):
+        raise RuntimeError("falha")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(MetricsMiddleware(app, metrics)({"type": "http", "method": "GET"}, None, None))
+    assert metrics.requests.value("GET", "unmatched", "500") == 1
@@ -0,0 +1,187 @@
+"""
+Testes do pool de modelos por ticker (api/model_pool.py)
+"""
+import json
+import threading
+import time
+
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.model_pool import ModelPool
+from api.model_registry import ModelBundle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLoader:
+    """Carregador que registra as cargas; cada modelo "ocupa" `nbytes`."""
+
+    def __init__(self, nbytes=100, delay=0.0):
+        self.nbytes = nbytes
+        self.delay = delay
+        self.loaded = []
+
+    def __call__(self, version, model_path, scaler_path):
+        time.sleep(self.delay)
+        self.loaded.append(os.path.basename(os.path.dirname(model_path)))
+        return ModelBundle(version, model=model_path, scaler=scaler_path, nbytes=self.nbytes)
+
+
+def write_artifacts(models_dir, key, content=b"pesos"):
+    directory = models_dir / key
+    directory.mkdir(exist_ok=True)
+    (directory / "stock_lstm_model.h5").write_bytes(content)
+    (directory / "scaler.pkl").write_bytes(b"scaler")
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    for key in ["AAPL", "MSFT", "GOOG", "bancos"]:
+        write_artifacts(tmp_path, key, content=key.encode())
+    (tmp_path / "groups.json").write_text(json.dumps({"bancos": ["ITUB4.SA", "BBDC4.SA"]}))
+    return tmp_path
+
+
+def test_resolve_ticker_group_and_default(models_dir):
+    """Artefatos próprios, do grupo ou nenhum (modelo padrão)"""
+    pool = ModelPool(str(models_dir), FakeLoader())
+    assert pool.resolve("aapl") == "AAPL"
+    assert pool.resolve("ITUB4.SA") == "bancos"
+    assert pool.resolve("TSLA") is None
+    assert pool.resolve("..") is None
+    assert pool.resolve("../AAPL") is None
+
+
+def test_lazy_load_and_reuse(models_dir):
+    """O modelo é carregado no primeiro uso e reaproveitado depois"""
+    loader = FakeLoader()
+    pool = ModelPool(str(models_dir), loader)
+    assert loader.loaded == []
+    first = pool.acquire("AAPL")
+    first.release()
+    second = pool.acquire("AAPL")
+    second.release()
+    assert first is second
+    assert loader.loaded == ["AAPL"]
+    assert pool.acquire("TSLA") is None
+    assert pool.stats()["hits"] == 1
+
+
+def test_group_members_share_model(models_dir):
+    """Tickers do mesmo grupo usam o mesmo modelo"""
+    loader = FakeLoader()
+    pool = ModelPool(str(models_dir), loader)
+    a = pool.acquire("ITUB4.SA")
+    b = pool.acquire("BBDC4.SA")
+    assert a is b
+    assert loader.loaded == ["bancos"]
+
+
+def test_lru_eviction_by_count(models_dir):
+    """Com o limite de modelos atingido, o menos usado é despejado"""
+    pool = ModelPool(str(models_dir), FakeLoader(), max_models=2)
+    for ticker in ["AAPL", "MSFT", "AAPL", "GOOG"]:
+        pool.acquire(ticker).release()
+    loaded = [m["key"] for m in pool.stats()["loaded"]]
+    assert loaded == ["AAPL", "GOOG"]
+    assert pool.stats()["evictions"] == 1
+
+
+def test_lru_eviction_by_memory(models_dir):
+    """O orçamento de memória limita quantos modelos ficam carregados"""
+    pool = ModelPool(str(models_dir), FakeLoader(nbytes=100), max_bytes=250)
+    for ticker in ["AAPL", "MSFT", "GOOG"]:
+        pool.acquire(ticker).release()
+    assert pool.stats()["models"] == 2
+    assert pool.nbytes == 200
+
+
+def test_evicted_model_drains_before_release(models_dir):
+    """Um modelo despejado continua válido para quem já o adquiriu"""
+    pool = ModelPool(str(models_dir), FakeLoader(), max_models=1)
+    held = pool.acquire("AAPL")
+    pool.acquire("MSFT").release()
+    assert not held.closed
+    held.release()
+    assert held.closed
+
+
+def test_concurrent_first_use_loads_once(models_dir):
+    """Requisições simultâneas no primeiro uso disparam uma única carga"""
+    loader = FakeLoader(delay=0.05)
+    pool = ModelPool(str(models_dir), loader)
+    results = []
+
+    def use():
+        bundle = pool.acquire("AAPL")
+        results.append(bundle)
+        bundle.release()
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loader.loaded == ["AAPL"]
+    assert len({id(b) for b in results}) == 1
+
+
+def test_changed_artifacts_are_reloaded(models_dir):
+    """Arquivos alterados em disco geram uma nova versão após o intervalo de verificação"""
+    clock = FakeClock()
+    pool = ModelPool(str(models_dir), FakeLoader(), check_interval=30, clock=clock)
+    old = pool.acquire("AAPL")
+    old.release()
+    write_artifacts(models_dir, "AAPL", content=b"pesos-retreinados")
+    clock.now = 31
+    new = pool.acquire("AAPL")
+    new.release()
+    assert new.version != old.version
+    assert old.closed
+
+
+def test_clear_rereads_groups(models_dir):
+    """`clear` descarta os modelos e relê o groups.json"""
+    pool = ModelPool(str(models_dir), FakeLoader())
+    pool.acquire("ITUB4.SA").release()
+    (models_dir / "groups.json").write_text(json.dumps({"bancos": ["SANB11.SA"]}))
+    pool.clear()
+    assert pool.stats()["models"] == 0
+    assert pool.resolve("ITUB4.SA") is None
+    assert pool.resolve("SANB11.SA") == "bancos"
+
+
+def test_resolution_is_cached_until_invalidated(models_dir, monkeypatch):
+    """A resolução não consulta o disco a cada uso; expira no intervalo ou ao invalidar"""
+    clock = FakeClock()
+    pool = ModelPool(str(models_dir), FakeLoader(), check_interval=30, clock=clock)
+    checks = []
+    has_artifacts = pool._has_artifacts
+    monkeypatch.setattr(pool, "_has_artifacts", lambda key: checks.append(key) or has_artifacts(key))
+
+    assert pool.resolve("NVDA") is None
+    write_artifacts(models_dir, "NVDA")
+    checks.clear()
+    assert pool.resolve("nvda") is None
+    assert checks == []
+
+    pool.invalidate()
+    assert pool.resolve("NVDA") == "NVDA"
+    checks.clear()
+    assert pool.resolve("NVDA") == "NVDA"
+    assert checks == []
+
+    clock.now = 31
+    assert pool.resolve("NVDA") == "NVDA"
+    assert checks == ["NVDA"]
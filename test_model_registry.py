@@ -0,0 +1,203 @@
+"""
+Testes do registro de versões do modelo (api/model_registry.py)
+"""
+import threading
+import time
+
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.model_registry import (ModelBundle, ModelRegistry, ReloadInProgress,
+                                artifact_signature, artifact_version)
+
+
+class FakeBatcher:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeArtifacts:
+    """Artefatos em disco simulados: a versão é um contador controlado pelo teste."""
+
+    def __init__(self):
+        self.version = "v1"
+        self.loads = 0
+        self.fail = False
+        self.gate = None
+
+    def load(self, version):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("arquivo corrompido")
+        self.loads += 1
+        return ModelBundle(version, model=f"modelo-{version}", scaler=None, batcher=FakeBatcher())
+
+
+@pytest.fixture
+def artifacts():
+    return FakeArtifacts()
+
+
+@pytest.fixture
+def registry(artifacts):
+    registry = ModelRegistry(artifacts.load, lambda: artifacts.version)
+    registry.reload()
+    return registry
+
+
+def test_reload_swaps_to_new_version(registry, artifacts):
+    """Uma versão nova em disco é carregada e publicada"""
+    assert registry.current.version == "v1"
+    artifacts.version = "v2"
+    bundle = registry.reload()
+    assert bundle is registry.current
+    assert registry.current.version == "v2"
+    assert registry.stats()["reloads"] == 2
+
+
+def test_reload_skips_unchanged_version(registry, artifacts):
+    """Sem mudança nos artefatos não há recarga, a menos que seja forçada"""
+    assert registry.reload() is None
+    assert artifacts.loads == 1
+    assert registry.reload(force=True) is not None
+    assert artifacts.loads == 2
+
+
+def test_old_version_drains_before_release(registry, artifacts):
+    """Requisições em andamento terminam com a versão antiga, liberada ao final"""
+    with registry.use() as old:
+        artifacts.version = "v2"
+        registry.reload()
+        # A requisição continua com a versão que adquiriu
+        assert old.version == "v1" and not old.closed
+        assert registry.stats()["draining"] == [{"model_version": "v1", "in_flight": 1}]
+        with registry.use() as new:
+            assert new.version == "v2"
+    assert old.closed and old.batcher.closed
+    assert not registry.current.closed
+    assert registry.stats()["draining"] == []
+
+
+def test_failed_reload_keeps_current_version(registry, artifacts):
+    """Falha ao carregar mantém a versão atual em uso"""
+    artifacts.version = "v2"
+    artifacts.fail = True
+    with pytest.raises(RuntimeError):
+        registry.reload()
+    assert registry.current.version == "v1"
+    assert registry.stats()["failed_reloads"] == 1
+
+
+def test_concurrent_reload_is_rejected(registry, artifacts):
+    """Só uma recarga por vez; requisições seguem atendidas durante o carregamento"""
+    artifacts.version = "v2"
+    artifacts.gate = threading.Event()
+    worker = threading.Thread(target=registry.reload)
+    worker.start()
+    try:
+        time.sleep(0.05)
+        with pytest.raises(ReloadInProgress):
+            registry.reload()
+        with registry.use() as bundle:
+            assert bundle.version == "v1"
+    finally:
+        artifacts.gate.set()
+        worker.join(5)
+    assert registry.current.version == "v2"
+
+
+def test_on_swap_callback(artifacts):
+    """O callback recebe a versão anterior e a nova"""
+    swaps = []
+    registry = ModelRegistry(artifacts.load, lambda: artifacts.version,
+                             on_swap=lambda old, new: swaps.append((old and old.version, new.version)))
+    registry.reload()
+    artifacts.version = "v2"
+    registry.reload()
+    assert swaps == [(None, "v1"), ("v1", "v2")]
+
+
+def test_use_without_model(artifacts):
+    """Sem versão carregada, `use` entrega None"""
+    registry = ModelRegistry(artifacts.load, lambda: artifacts.version)
+    with registry.use() as bundle:
+        assert bundle is None
+
+
+def test_watcher_reloads_changed_artifacts(tmp_path, artifacts):
+    """O observador recarrega quando os arquivos mudam e ficam estáveis"""
+    model_file = tmp_path / "model.h5"
+    model_file.write_bytes(b"pesos-v1")
+    registry = ModelRegistry(artifacts.load, lambda: artifact_version(str(model_file)),
+                             signature_fn=lambda: artifact_signature(str(model_file)),
+                             poll_interval=0.02)
+    registry.reload()
+    first = registry.current.version
+    registry.start_watcher()
+    try:
+        model_file.write_bytes(b"pesos-v2 maiores")
+        deadline = time.monotonic() + 5
+        while registry.current.version == first and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert registry.current.version == artifact_version(str(model_file))
+    finally:
+        registry.stop()
+    assert registry.current is None
+
+
+def test_watcher_does_not_retry_failed_artifacts(tmp_path, artifacts):
+    """Artefatos que falharam ao carregar só são tentados de novo quando mudam"""
+    model_file = tmp_path / "model.h5"
+    model_file.write_bytes(b"pesos-v1")
+    attempts = []
+
+    def load(version):
+        attempts.append(version)
+        return artifacts.load(version)
+
+    registry = ModelRegistry(load, lambda: artifact_version(str(model_file)),
+                             signature_fn=lambda: artifact_signature(str(model_file)),
+                             poll_interval=0.02)
+    registry.reload()
+    registry.start_watcher()
+    try:
+        artifacts.fail = True
+        model_file.write_bytes(b"pesos-v2 corrompidos")
+        deadline = time.monotonic() + 5
+        while registry.stats()["failed_reloads"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.3)
+        assert registry.stats()["failed_reloads"] == 1
+        assert registry.stats()["waiting_for_new_artifacts"]
+
+        artifacts.fail = False
+        model_file.write_bytes(b"pesos-v3 corrigidos e maiores")
+        deadline = time.monotonic() + 5
+        while registry.current.version != artifact_version(str(model_file)) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert registry.current.version == artifact_version(str(model_file))
+        assert not registry.stats()["waiting_for_new_artifacts"]
+        assert len(attempts) == 3
+    finally:
+        registry.stop()
+
+
+def test_artifact_version_tracks_content(tmp_path):
+    """A versão muda quando o conteúdo do artefato muda"""
+    model_file = tmp_path / "model.h5"
+    scaler_file = tmp_path / "scaler.pkl"
+    model_file.write_bytes(b"pesos-v1")
+    scaler_file.write_bytes(b"scaler")
+    v1 = artifact_version(str(model_file), str(scaler_file))
+    assert artifact_version(str(model_file), str(scaler_file)) == v1
+    model_file.write_bytes(b"pesos-v2")
+    assert artifact_version(str(model_file), str(scaler_file)) != v1
+    assert artifact_signature(str(tmp_path / "ausente.h5")) is None
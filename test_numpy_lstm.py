@@ -0,0 +1,134 @@
+"""
+Testes do motor de inferência em NumPy (api/numpy_lstm.py)
+Inclui o teste de paridade com o Keras usando o modelo treinado
+"""
+import subprocess
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Adicionar o diretório raiz ao path
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from api.numpy_lstm import DenseLayer, LSTMLayer, NumpyLSTMModel
+
+MODEL_PATH = os.path.join(ROOT_DIR, 'api', 'models', 'stock_lstm_model.h5')
+
+# Tolerância absoluta (na escala 0-1 do MinMaxScaler) aceita entre os backends
+PARITY_ATOL = 1e-5
+
+requires_model = pytest.mark.skipif(not os.path.exists(MODEL_PATH),
+                                    reason="Modelo treinado não encontrado")
+
+
+@pytest.fixture(scope="module")
+def windows():
+    """Janelas escalonadas aleatórias, no formato de entrada do modelo"""
+    return np.random.default_rng(42).uniform(0, 1, size=(32, 60, 1)).astype(np.float32)
+
+
+@requires_model
+def test_parity_with_keras(windows):
+    """O backend NumPy reproduz o Keras dentro da tolerância"""
+    keras_models = pytest.importorskip("keras.models")
+    keras_model = keras_models.load_model(MODEL_PATH)
+    numpy_model = NumpyLSTMModel.from_h5(MODEL_PATH)
+
+    expected = keras_model.predict(windows, verbose=0)
+    result = numpy_model.predict(windows, verbose=0)
+
+    assert result.shape == expected.shape
+    np.testing.assert_allclose(result, expected, atol=PARITY_ATOL)
+
+    # A conversão a partir do modelo em memória deve dar o mesmo resultado
+    np.testing.assert_allclose(NumpyLSTMModel.from_keras(keras_model).predict(windows),
+                               expected, atol=PARITY_ATOL)
+
+
+@requires_model
+def test_buffers_are_reused_across_batch_sizes(windows):
+    """Lotes de tamanhos diferentes dão o mesmo resultado por janela"""
+    model = NumpyLSTMModel.from_h5(MODEL_PATH)
+    full = model.predict(windows)
+    single = np.vstack([model.predict(windows[i:i + 1]) for i in range(4)])
+    np.testing.assert_allclose(single, full[:4], atol=1e-6)
+    # O resultado não pode ser um buffer interno sobrescrito na chamada seguinte
+    again = model.predict(windows[:1])
+    np.testing.assert_allclose(single[0], again[0], atol=1e-6)
+
+
+@requires_model
+def test_serving_without_tensorflow():
+    """A API com INFERENCE_BACKEND=numpy não importa o TensorFlow"""
+    code = (
+        "import sys, asyncio\n"
+        "import api.main as m\n"
+        "asyncio.run(m.load_artifacts())\n"
+        "assert m.model_registry.current is not None\n"
+        "m.unload_artifacts()\n"
+        "assert 'tensorflow' not in sys.modules, 'tensorflow importado'\n"
+    )
+    env = dict(os.environ, INFERENCE_BACKEND="numpy")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+
+def test_single_unit_lstm_matches_reference():
+    """Compara com uma implementação direta das equações da LSTM"""
+    rng = np.random.default_rng(0)
+    units = 3
+    kernel = rng.normal(size=(1, 4 * units))
+    recurrent = rng.normal(size=(units, 4 * units))
+    bias = rng.normal(size=4 * units)
+    dense_kernel = rng.normal(size=(units, 1))
+    dense_bias = rng.normal(size=1)
+    model = NumpyLSTMModel([LSTMLayer(kernel, recurrent, bias, return_sequences=False)],
+                           [DenseLayer(dense_kernel, dense_bias)])
+
+    x = rng.uniform(size=(2, 5, 1))
+    sigmoid = lambda v: 1 / (1 + np.exp(-v))
+    h = np.zeros((2, units))
+    c = np.zeros((2, units))
+    for t in range(5):
+        z = x[:, t, :] @ kernel + h @ recurrent + bias
+        i, f, g, o = np.split(z, 4, axis=1)
+        c = sigmoid(f) * c + sigmoid(i) * np.tanh(g)
+        h = sigmoid(o) * np.tanh(c)
+    expected = h @ dense_kernel + dense_bias
+
+    np.testing.assert_allclose(model.predict(x), expected, atol=1e-5)
+
+
+def test_invalid_layer_stack():
+    """Pilhas de LSTM inconsistentes são rejeitadas"""
+    units = 2
+    layer = LSTMLayer(np.zeros((1, 8)), np.zeros((units, 8)), np.zeros(8), return_sequences=True)
+    with pytest.raises(ValueError):
+        NumpyLSTMModel([layer], [])
+
+
+@requires_model
+@pytest.mark.parametrize("precision,atol", [("float32", 0), ("float16", 1e-3), ("int8", 1e-2)])
+def test_reduced_precision_export(tmp_path, windows, precision, atol):
+    """Pesos exportados em precisão reduzida ficam próximos do float32 e menores em disco"""
+    model = NumpyLSTMModel.from_h5(MODEL_PATH)
+    path = str(tmp_path / f"model.{precision}.npz")
+    model.save_npz(path, precision)
+    loaded = NumpyLSTMModel.from_npz(path)
+
+    np.testing.assert_allclose(loaded.predict(windows), model.predict(windows), atol=atol)
+    # `to_precision` reproduz exatamente o que será servido
+    np.testing.assert_array_equal(model.to_precision(precision).predict(windows), loaded.predict(windows))
+    if precision == "int8":
+        assert os.path.getsize(path) < model.nbytes / 3
+
+
+def test_invalid_precision():
+    """Precisões desconhecidas são rejeitadas"""
+    layer = LSTMLayer(np.zeros((1, 8)), np.zeros((2, 8)), np.zeros(8), return_sequences=False)
+    with pytest.raises(ValueError):
+        NumpyLSTMModel([layer], []).to_precision("int4")
@@ -0,0 +1,71 @@
+"""
+Testes do cache de previsões (api/prediction_cache.py)
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.prediction_cache import PredictionCache
+
+
+@pytest.fixture
+def window():
+    return np.linspace(0.2, 0.8, 60)
+
+
+def test_key_ignores_shape_and_float_width(window):
+    """A mesma janela gera a mesma chave em qualquer formato usado pela API"""
+    key = PredictionCache.key(window)
+    assert PredictionCache.key(window.reshape(1, 60, 1)) == key
+    assert PredictionCache.key(window.astype(np.float32).reshape(60, 1)) == key
+    assert PredictionCache.key(window + 1e-3) != key
+
+
+def test_hit_and_miss_counters(window):
+    cache = PredictionCache()
+    key = cache.key(window)
+    assert cache.get(key, "v1") is None
+    cache.put(key, "v1", np.array([[0.42]]))
+    np.testing.assert_allclose(cache.get(key, "v1"), [0.42])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(0.5)
+
+
+def test_discard_version(window):
+    """Descartar a versão substituída remove apenas as entradas dela"""
+    cache = PredictionCache()
+    key = cache.key(window)
+    cache.put(key, "v1", 0.42)
+    cache.put(key, "v2", 0.43)
+    assert cache.discard_version("v1") == 1
+    assert cache.get(key, "v1") is None
+    np.testing.assert_allclose(cache.get(key, "v2"), [0.43])
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_versions_do_not_mix(window):
+    """A mesma janela em modelos diferentes gera entradas independentes"""
+    cache = PredictionCache()
+    key = cache.key(window)
+    cache.put(key, "aapl-v1", 0.42)
+    assert cache.get(key, "petr4-v1") is None
+    np.testing.assert_allclose(cache.get(key, "aapl-v1"), [0.42])
+    assert cache.stats()["versions"] == 1
+
+
+def test_lru_bound():
+    cache = PredictionCache(max_entries=2)
+    keys = [cache.key(np.full(60, float(i))) for i in range(3)]
+    cache.put(keys[0], "v1", 0.0)
+    cache.put(keys[1], "v1", 1.0)
+    cache.get(keys[0], "v1")
+    cache.put(keys[2], "v1", 2.0)
+    assert cache.get(keys[1], "v1") is None
+    assert cache.get(keys[0], "v1") is not None
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,60 @@
+"""
+Testes do pré-processamento vetorizado (api/preprocessing.py)
+"""
+import numpy as np
+import pytest
+import sys
+import os
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.preprocessing import inverse_scale_prices, scale_prices, sliding_windows
+
+
+@pytest.fixture
+def scaler():
+    """Escalonador ajustado como no train_model.py"""
+    s = MinMaxScaler(feature_range=(0, 1))
+    s.fit(np.linspace(30, 240, 500).reshape(-1, 1))
+    return s
+
+
+def test_scale_matches_sklearn(scaler):
+    """O escalonamento afim é igual ao scaler.transform"""
+    windows = np.random.default_rng(0).uniform(50, 200, size=(10, 60))
+    expected = scaler.transform(windows.reshape(-1, 1)).reshape(windows.shape)
+    np.testing.assert_allclose(scale_prices(scaler, windows), expected, rtol=1e-12)
+
+
+def test_inverse_scale_roundtrip(scaler):
+    """inverse_scale_prices desfaz scale_prices"""
+    prices = np.array([[100.0], [150.5], [210.25]])
+    np.testing.assert_allclose(inverse_scale_prices(scaler, scale_prices(scaler, prices)), prices)
+    np.testing.assert_allclose(inverse_scale_prices(scaler, scale_prices(scaler, prices)[:, 0]),
+                               scaler.inverse_transform(scale_prices(scaler, prices))[:, 0])
+
+
+def test_fallback_for_non_minmax_scaler():
+    """Escalonadores sem a forma afim do MinMaxScaler usam transform"""
+    s = StandardScaler().fit(np.arange(100, dtype=float).reshape(-1, 1))
+    windows = np.arange(120, dtype=float).reshape(2, 60)
+    expected = s.transform(windows.reshape(-1, 1)).reshape(windows.shape)
+    np.testing.assert_allclose(scale_prices(s, windows), expected)
+
+
+def test_sliding_windows():
+    """Janelas deslizantes cobrem a série inteira sem copiar"""
+    series = np.arange(65, dtype=float)
+    windows = sliding_windows(series, 60)
+    assert windows.shape == (6, 60)
+    np.testing.assert_array_equal(windows[0], series[:60])
+    np.testing.assert_array_equal(windows[-1], series[5:])
+    assert np.shares_memory(windows, series)
+
+
+def test_sliding_windows_short_series():
+    """Séries menores que a janela são rejeitadas"""
+    with pytest.raises(ValueError):
+        sliding_windows(np.arange(10, dtype=float), 60)
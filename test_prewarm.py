@@ -0,0 +1,196 @@
+"""
+Testes do pré-aquecimento dos tickers populares (api/prewarm.py)
+"""
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+from api.price_cache import PriceHistoryCache
+from api.price_providers import SyntheticPriceProvider
+from api.prewarm import PopularityTracker, PrewarmScheduler, last_close, next_close
+
+CLOSE = time(21, 30)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_close_boundaries_skip_weekends():
+    # 2024-01-05 é uma sexta-feira
+    friday_night = utc(2024, 1, 5, 22, 0)
+    assert last_close(friday_night, CLOSE) == utc(2024, 1, 5, 21, 30)
+    assert next_close(friday_night, CLOSE) == utc(2024, 1, 8, 21, 30)
+    assert last_close(utc(2024, 1, 7, 12, 0), CLOSE) == utc(2024, 1, 5, 21, 30)
+    assert last_close(utc(2024, 1, 8, 12, 0), CLOSE) == utc(2024, 1, 5, 21, 30)
+    assert next_close(utc(2024, 1, 8, 21, 30), CLOSE) == utc(2024, 1, 9, 21, 30)
+
+
+def test_popularity_decays():
+    """Requisições antigas pesam menos que as recentes; o ranking é limitado a `n`"""
+    now = [0.0]
+    tracker = PopularityTracker(half_life_seconds=10.0, max_tickers=3, clock=lambda: now[0])
+    for _ in range(4):
+        tracker.record("AAPL")
+    now[0] = 30.0
+    # 4 requisições há três meias-vidas valem 0.5; 2 recentes valem 2
+    tracker.record("MSFT")
+    tracker.record("MSFT")
+    tracker.record("PETR4.SA")
+    assert tracker.top(2) == ["MSFT", "PETR4.SA"]
+    assert tracker.top(10) == ["MSFT", "PETR4.SA", "AAPL"]
+    # Só os `max_tickers` mais recentes são mantidos
+    tracker.record("VALE3.SA")
+    assert tracker.stats()["tickers"] == 3 and "AAPL" not in tracker.top(10)
+
+
+class FakeSource:
+    """Refresh controlável: conta chamadas simultâneas e pode falhar por ticker."""
+
+    def __init__(self):
+        self.version = "v1"
+        self.failing = set()
+        self.calls = []
+        self.close_dates = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, ticker, close_date):
+        self.calls.append(ticker)
+        self.close_dates.append(close_date)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if ticker in self.failing:
+                raise RuntimeError("fonte indisponível")
+            return self.version, {"codigo_acao": ticker, "call": len(self.calls)}
+        finally:
+            self.active -= 1
+
+
+def make_scheduler(source, now, top_n=10, concurrency=2):
+    tracker = PopularityTracker()
+    scheduler = PrewarmScheduler(source, tracker, top_n=top_n, concurrency=concurrency,
+                                 close_time=CLOSE, jitter_seconds=0, now=lambda: now[0])
+    return scheduler, tracker
+
+
+def test_run_once_refreshes_top_tickers_with_bounded_concurrency():
+    async def scenario():
+        source = FakeSource()
+        now = [utc(2024, 1, 8, 22, 0)]
+        scheduler, tracker = make_scheduler(source, now, top_n=4, concurrency=2)
+        for i, ticker in enumerate(["A", "B", "C", "D", "E"]):
+            for _ in range(5 - i):
+                tracker.record(ticker)
+
+        summary = await scheduler.run_once()
+        assert summary["tickers"] == 4 and summary["refreshed"] == 4 and summary["failed"] == 0
+        assert sorted(source.calls) == ["A", "B", "C", "D"]
+        # O pregão que acabou de fechar entra na atualização
+        assert set(source.close_dates) == {date(2024, 1, 8)}
+        assert source.max_active == 2
+
+        result, stale = scheduler.lookup("A", "v1")
+        assert not stale and result.value["codigo_acao"] == "A"
+        # Outra versão do modelo não usa o resultado
+        assert scheduler.lookup("A", "v2") is None
+        assert scheduler.lookup("E", "v1") is None
+
+        # Já atualizados depois do fechamento: nada a fazer
+        assert (await scheduler.run_once())["refreshed"] == 0
+        assert scheduler.stats()["served_total"] == {"fresh": 1, "stale": 0}
+
+    asyncio.run(scenario())
+
+
+def test_stale_result_is_served_until_refresh_finishes():
+    """Após um novo fechamento, o último resultado bom é servido e a atualização roda em segundo plano"""
+    async def scenario():
+        source = FakeSource()
+        now = [utc(2024, 1, 8, 22, 0)]
+        scheduler, tracker = make_scheduler(source, now)
+        tracker.record("AAPL")
+        await scheduler.run_once()
+        first = scheduler.results["AAPL"].value
+
+        now[0] += timedelta(days=1)
+        result, stale = scheduler.lookup("AAPL", "v1")
+        assert stale and result.value == first
+        assert scheduler.stats()["inflight"] == 1
+        # Consultas seguintes não disparam outra atualização
+        scheduler.lookup("AAPL", "v1")
+        await asyncio.sleep(0.05)
+        assert source.calls == ["AAPL", "AAPL"]
+
+        result, stale = scheduler.lookup("AAPL", "v1")
+        assert not stale and result.value != first
+
+        # Se a atualização falhar, o último resultado bom continua disponível
+        source.failing.add("AAPL")
+        now[0] += timedelta(days=1)
+        summary = await scheduler.run_once()
+        assert summary["failed"] == 1
+        result, stale = scheduler.lookup("AAPL", "v1")
+        assert stale and result.value["codigo_acao"] == "AAPL"
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_waits_for_close_with_jitter():
+    async def scenario():
+        source = FakeSource()
+        delays = []
+        stop = asyncio.Event()
+
+        async def fake_sleep(seconds):
+            delays.append(seconds)
+            if len(delays) > 1:
+                stop.set()
+                await asyncio.Event().wait()
+
+        now = [utc(2024, 1, 8, 21, 0)]
+        tracker = PopularityTracker()
+        tracker.record("AAPL")
+        scheduler = PrewarmScheduler(source, tracker, close_time=CLOSE, jitter_seconds=60,
+                                     now=lambda: now[0], sleep=fake_sleep)
+        scheduler.start()
+        await asyncio.wait_for(stop.wait(), 1)
+        await scheduler.stop()
+
+        assert 1800 <= delays[0] <= 1860
+        assert source.calls == ["AAPL"]
+        assert scheduler.stats()["runs_total"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_prewarm_prediction_includes_close_day_bar(monkeypatch):
+    """A previsão pré-calculada após o fechamento usa a barra do pregão que acabou de fechar"""
+    from api import main
+
+    close_day = date(2024, 1, 8)
+    cache = PriceHistoryCache(SyntheticPriceProvider(), ttl_seconds=300, today=lambda: close_day)
+    monkeypatch.setattr(main, "price_cache", cache)
+    # Em cache, o histórico de antes do fechamento termina no pregão anterior
+    assert cache.get("AAPL").last_date == date(2024, 1, 5)
+
+    with TestClient(main.app) as client:
+        current = main.model_registry.current
+        if current is None:
+            pytest.skip("Modelo não carregado")
+        version, result = client.portal.call(main.prewarm_prediction, "AAPL", close_day)
+    assert version == current.version
+    assert result["last_known_date"] == "2024-01-08"
+    assert result["prediction_date"] == "2024-01-09"
+    assert cache.get_if_fresh("AAPL").last_date == close_day
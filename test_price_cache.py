@@ -0,0 +1,156 @@
+"""
+Testes do cache de histórico de preços (api/price_cache.py)
+Usa a fonte sintética local, sem acesso ao Yahoo Finance
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.price_cache import PriceHistoryCache
+from api.price_providers import PriceHistory, SyntheticPriceProvider, create_price_provider
+
+
+class RecordingProvider(SyntheticPriceProvider):
+    """Fonte sintética que registra os intervalos pedidos"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def fetch(self, ticker, start, end):
+        self.calls.append((ticker, start, end))
+        return super().fetch(ticker, start, end)
+
+
+class FakeClock:
+    """Relógio e calendário controláveis"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.day = date(2024, 7, 19)
+
+    def clock(self):
+        return self.now
+
+    def today(self):
+        return self.day
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def provider():
+    return RecordingProvider()
+
+
+@pytest.fixture
+def cache(provider, clock):
+    return PriceHistoryCache(provider, ttl_seconds=60, lookback_days=90,
+                             clock=clock.clock, today=clock.today)
+
+
+def test_hit_within_ttl(cache, provider):
+    """Dentro do TTL o histórico vem da memória"""
+    first = cache.get("aapl")
+    second = cache.get("AAPL")
+    assert second is first
+    assert len(provider.calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # Com force, a entrada é atualizada mesmo dentro do TTL
+    cache.get("AAPL", force=True)
+    assert cache.stats()["incremental_refreshes"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_entry_fetches_only_new_bars(cache, provider, clock):
+    """Após o TTL apenas as barras novas são buscadas e anexadas"""
+    first = cache.get("AAPL")
+    clock.now += 120
+    clock.day += timedelta(days=3)
+
+    refreshed = cache.get("AAPL")
+    _, start, end = provider.calls[-1]
+    assert start == first.last_date + timedelta(days=1)
+    assert end == clock.day
+    assert cache.stats()["incremental_refreshes"] == 1
+
+    # O resultado incremental é igual ao de uma busca completa
+    full = provider.fetch("AAPL", clock.day - timedelta(days=90), clock.day)
+    np.testing.assert_array_equal(refreshed.dates, full.dates)
+    np.testing.assert_allclose(refreshed.closes, full.closes)
+
+
+def test_refresh_through_closed_session(cache, provider, clock):
+    """Por padrão a busca termina ontem; com `through` inclui o pregão desse dia"""
+    first = cache.get("AAPL")
+    assert first.last_date < clock.day
+
+    refreshed = cache.get("AAPL", force=True, through=clock.day)
+    _, start, end = provider.calls[-1]
+    assert start == first.last_date + timedelta(days=1)
+    assert end == clock.day + timedelta(days=1)
+    assert refreshed.last_date == clock.day
+
+
+def test_lru_eviction_by_entries(provider, clock):
+    """O ticker menos usado recentemente é despejado"""
+    cache = PriceHistoryCache(provider, max_entries=2, clock=clock.clock, today=clock.today)
+    cache.get("AAPL")
+    cache.get("MSFT")
+    cache.get("AAPL")
+    cache.get("GOOG")
+
+    provider.calls.clear()
+    cache.get("AAPL")
+    assert provider.calls == []
+    cache.get("MSFT")
+    assert len(provider.calls) == 1
+    assert cache.stats()["evictions"] >= 1
+
+
+def test_memory_bound(provider, clock):
+    """O total de bytes em cache respeita o limite"""
+    one_entry = len(provider.fetch("AAPL", clock.day - timedelta(days=90), clock.day)) * 16
+    cache = PriceHistoryCache(provider, max_bytes=one_entry * 2, clock=clock.clock, today=clock.today)
+    for ticker in ["AAPL", "MSFT", "GOOG", "AMZN"]:
+        cache.get(ticker)
+    stats = cache.stats()
+    assert stats["bytes"] <= one_entry * 2
+    assert stats["entries"] == 2
+
+
+def test_empty_result_is_not_cached(clock):
+    """Tickers sem dados não ocupam o cache"""
+    class EmptyProvider(SyntheticPriceProvider):
+        def fetch(self, ticker, start, end):
+            return PriceHistory.empty()
+
+    cache = PriceHistoryCache(EmptyProvider(), clock=clock.clock, today=clock.today)
+    assert len(cache.get("INVALID")) == 0
+    assert cache.stats()["entries"] == 0
+
+
+def test_synthetic_provider_is_deterministic():
+    """A fonte sintética gera os mesmos preços para o mesmo ticker e data"""
+    provider = create_price_provider("synthetic")
+    a = provider.fetch("AAPL", date(2024, 1, 1), date(2024, 3, 1))
+    b = provider.fetch("AAPL", date(2024, 2, 1), date(2024, 3, 1))
+    np.testing.assert_allclose(a.since(np.datetime64("2024-02-01")).closes, b.closes)
+    assert np.all(np.is_busday(a.dates))
+
+
+def test_unknown_provider():
+    """Nomes de fonte desconhecidos são rejeitados"""
+    with pytest.raises(ValueError):
+        create_price_provider("bloomberg")
@@ -0,0 +1,127 @@
+"""
+Testes do armazenamento local de preços (api/price_store.py) e da ingestão
+incremental (ingest_prices.py). Usa a fonte sintética, sem acesso à rede
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ingest_prices
+from api.price_providers import OHLCV_COLUMNS, SyntheticPriceProvider, create_price_provider
+from api.price_store import PriceStore, StorePriceProvider
+
+START = date(2023, 1, 1)
+END = date(2024, 1, 1)
+
+
+def test_synthetic_bars_are_consistent():
+    """Máxima e mínima envolvem abertura e fechamento; o fechamento é o mesmo de fetch"""
+    provider = SyntheticPriceProvider()
+    bars = provider.fetch_bars("AAPL", START, END)
+    assert len(bars) > 200
+    assert np.all(bars["high"] >= np.maximum(bars["open"], bars["close"]))
+    assert np.all(bars["low"] <= np.minimum(bars["open"], bars["close"]))
+    assert np.all(bars["volume"] > 0)
+    np.testing.assert_array_equal(bars["close"], provider.fetch("AAPL", START, END).closes)
+
+
+def test_append_is_incremental(tmp_path):
+    """Barras já gravadas são ignoradas e o resultado é igual a uma ingestão única"""
+    provider = SyntheticPriceProvider()
+    store = PriceStore(str(tmp_path))
+    middle = date(2023, 7, 1)
+
+    first = store.append("AAPL", provider.fetch_bars("AAPL", START, middle))
+    # Sobreposição com o que já está gravado: só o que é novo entra
+    second = store.append("AAPL", provider.fetch_bars("AAPL", date(2023, 6, 1), END))
+    assert store.append("AAPL", provider.fetch_bars("AAPL", START, END)) == 0
+
+    full = provider.fetch_bars("AAPL", START, END)
+    assert first + second == len(full) == store.rows("AAPL")
+    stored = store.read("AAPL")
+    np.testing.assert_array_equal(stored.dates, full.dates)
+    for column in OHLCV_COLUMNS:
+        np.testing.assert_array_equal(stored[column], full[column])
+    assert store.last_date("AAPL") == full.dates[-1].astype(date)
+    assert store.tickers() == ["AAPL"]
+
+
+def test_read_date_range(tmp_path):
+    provider = SyntheticPriceProvider()
+    store = PriceStore(str(tmp_path))
+    store.append("MSFT", provider.fetch_bars("MSFT", START, END))
+
+    bars = store.read("MSFT", date(2023, 3, 1), date(2023, 4, 1))
+    expected = provider.fetch_bars("MSFT", date(2023, 3, 1), date(2023, 4, 1))
+    np.testing.assert_array_equal(bars.dates, expected.dates)
+    np.testing.assert_array_equal(bars["close"], expected["close"])
+
+    # Só o fechamento é lido; as demais colunas vêm como NaN
+    history = store.history("MSFT", date(2023, 3, 1), date(2023, 4, 1))
+    np.testing.assert_array_equal(history.closes, expected["close"])
+
+    assert len(store.read("MSFT", date(2025, 1, 1))) == 0
+    assert len(store.read("MSFT", date(2023, 5, 1), date(2023, 4, 1))) == 0
+    assert len(store.read("NOPE")) == 0
+
+
+def test_interrupted_append_is_recovered(tmp_path):
+    """Uma escrita interrompida deixa colunas maiores; leituras as ignoram e o append trunca"""
+    provider = SyntheticPriceProvider()
+    store = PriceStore(str(tmp_path))
+    store.append("AAPL", provider.fetch_bars("AAPL", START, date(2023, 6, 1)))
+    rows = store.rows("AAPL")
+
+    with open(tmp_path / "AAPL" / "close.f8", "ab") as f:
+        f.write(np.ones(3).tobytes())
+    assert store.rows("AAPL") == rows
+    assert len(store.read("AAPL")) == rows
+
+    store.append("AAPL", provider.fetch_bars("AAPL", START, END))
+    full = provider.fetch_bars("AAPL", START, END)
+    np.testing.assert_array_equal(store.read("AAPL")["close"], full["close"])
+
+
+def test_invalid_input(tmp_path):
+    store = PriceStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.rows("../etc")
+    bars = SyntheticPriceProvider().fetch_bars("AAPL", START, END)
+    reversed_bars = type(bars)(bars.dates[::-1], **{c: bars[c][::-1] for c in OHLCV_COLUMNS})
+    with pytest.raises(ValueError):
+        store.append("AAPL", reversed_bars)
+
+
+def test_store_provider(tmp_path):
+    provider = create_price_provider("store", store_dir=str(tmp_path))
+    assert isinstance(provider, StorePriceProvider)
+    assert len(provider.fetch("AAPL", START, END)) == 0
+    assert len(provider.fetch("../x", START, END)) == 0
+
+    provider.store.append("AAPL", SyntheticPriceProvider().fetch_bars("AAPL", START, END))
+    history = provider.fetch("AAPL", date(2023, 12, 1), END)
+    assert history.last_date == date(2023, 12, 29)
+
+    with pytest.raises(ValueError):
+        create_price_provider("store")
+
+
+def test_ingest_command(tmp_path):
+    store_dir = str(tmp_path)
+    argv = ["AAPL", "MSFT", "--provider", "synthetic", "--store-dir", store_dir,
+            "--start", "2023-01-01", "--end", "2023-07-01"]
+    assert ingest_prices.main(argv) == 0
+    store = PriceStore(store_dir)
+    assert store.tickers() == ["AAPL", "MSFT"]
+    rows = store.rows("AAPL")
+
+    # Sem tickers, atualiza os já gravados a partir da última data
+    assert ingest_prices.main(["--provider", "synthetic", "--store-dir", store_dir, "--end", "2024-01-01"]) == 0
+    assert store.rows("AAPL") == store.rows("MSFT") == len(SyntheticPriceProvider().fetch_bars("AAPL", START, END))
+    assert store.rows("AAPL") > rows
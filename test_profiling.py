@@ -0,0 +1,136 @@
+"""
+Testes do perfilamento sob demanda de requisições (api/profiling.py)
+"""
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.profiling import ProfileStore, ProfilingMiddleware, RequestProfiler
+
+TOKEN = "segredo"
+
+
+def scale_window(n):
+    return sum(i * 0.5 for i in range(n))
+
+
+def fetch_history(n):
+    return [scale_window(n) for _ in range(3)]
+
+
+def unrelated_work():
+    return sum(range(1000))
+
+
+def function_names(profile):
+    return {row["function"].rsplit("(", 1)[1].rstrip(")") for row in profile["functions"]}
+
+
+def make_app(profiler):
+    app = FastAPI()
+
+    @app.get("/sync/{n}")
+    @profiler.threaded
+    def sync_endpoint(n: int):
+        return {"value": scale_window(n)}
+
+    @app.get("/async/{n}")
+    async def async_endpoint(n: int):
+        history = await run_in_threadpool(profiler.bind(fetch_history), n)
+        return {"value": history[-1]}
+
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return app
+
+
+def test_trigger_by_header_or_sample():
+    samples = iter([0.5, 0.01])
+    profiler = RequestProfiler(ProfileStore(), enabled=True, token=TOKEN, sample_rate=0.1,
+                               sample=lambda: next(samples))
+    assert profiler.trigger({"headers": [(b"x-profile", TOKEN.encode())]}) == "header"
+    assert profiler.trigger({"headers": [(b"x-profile", b"errado")]}) is None
+    assert profiler.trigger({"headers": []}) == "sample"
+    # Sem token o cabeçalho não liga o perfil
+    assert RequestProfiler(ProfileStore(), enabled=True).trigger({"headers": [(b"x-profile", b"")]}) is None
+
+
+def test_disabled_profiler_adds_nothing():
+    profiler = RequestProfiler(ProfileStore())
+    assert profiler.threaded(scale_window) is scale_window
+    assert profiler.bind(scale_window) is scale_window
+
+
+def test_profiles_request_and_delegated_threads():
+    """O perfil cobre o event loop e as threads; requisições não escolhidas não são perfiladas"""
+    profiler = RequestProfiler(ProfileStore(capacity=2), enabled=True, token=TOKEN, top_functions=1000)
+    with TestClient(make_app(profiler)) as client:
+        plain = client.get("/sync/10")
+        assert plain.status_code == 200 and "x-profile-id" not in plain.headers
+        assert profiler.store.stats()["profiles"] == 0
+
+        response = client.get("/sync/10", headers={"X-Profile": TOKEN})
+        assert response.json() == {"value": scale_window(10)}
+        profile = profiler.store.get(response.headers["x-profile-id"])
+        assert profile["trigger"] == "header" and profile["status"] == 200
+        assert profile["route"] == "/sync/{n}" and profile["duration_seconds"] > 0
+        assert "scale_window" in function_names(profile)
+        assert [t["function"] for t in profile["threads"]] == ["make_app.<locals>.sync_endpoint"]
+        assert "scale_window" in profile["text"]
+
+        response = client.get("/async/10", headers={"X-Profile": TOKEN})
+        profile = profiler.store.get(response.headers["x-profile-id"])
+        assert {"fetch_history", "scale_window", "async_endpoint"} <= function_names(profile)
+        assert [t["function"] for t in profile["threads"]] == ["fetch_history"]
+
+        # O buffer guarda só os últimos `capacity` perfis
+        client.get("/async/5", headers={"X-Profile": TOKEN})
+        summaries = profiler.store.summaries()
+        assert len(summaries) == 2 and summaries[0]["path"] == "/async/5"
+        assert "functions" not in summaries[0]
+        assert profiler.store.stats()["recorded_total"] == 3
+
+
+def test_concurrent_coroutines_stay_out_of_profile():
+    """Só os passos da corrotina perfilada entram no perfil, não os das outras requisições"""
+    async def app(scope, receive, send):
+        for _ in range(20):
+            scale_window(10)
+            await asyncio.sleep(0)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def other_request(done):
+        while not done.is_set():
+            unrelated_work()
+            await asyncio.sleep(0)
+
+    async def scenario():
+        profiler = RequestProfiler(ProfileStore(), enabled=True, sample_rate=1.0, top_functions=1000)
+        middleware = ProfilingMiddleware(app, profiler)
+        done = asyncio.Event()
+        other = asyncio.ensure_future(other_request(done))
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/x", "headers": []}
+        await middleware(scope, None, send)
+        done.set()
+        await other
+
+        profile = profiler.store.summaries()[0]
+        assert profile["trigger"] == "sample" and profile["route"] == "unmatched"
+        assert (b"x-profile-id", profile["id"].encode()) in sent[0]["headers"]
+        names = function_names(profiler.store.get(profile["id"]))
+        assert "scale_window" in names and "unrelated_work" not in names
+
+    asyncio.run(scenario())
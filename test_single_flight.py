@@ -0,0 +1,91 @@
+"""
+Testes da deduplicação de buscas concorrentes (api/single_flight.py)
+"""
+import asyncio
+
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """50 pedidos simultâneos do mesmo ticker geram uma única busca"""
+    executions = []
+
+    async def fetch():
+        executions.append(1)
+        await asyncio.sleep(0.05)
+        return "AAPL-data"
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.do("AAPL", fetch) for _ in range(50)])
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert results == ["AAPL-data"] * 50
+    assert len(executions) == 1
+    assert flight.stats() == {"in_flight": 0, "calls": 50, "executions": 1, "shared": 49}
+
+
+def test_different_keys_run_separately():
+    """Chaves diferentes não são agrupadas"""
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch(key):
+            await asyncio.sleep(0.01)
+            return key
+
+        results = await asyncio.gather(flight.do("AAPL", lambda: fetch("AAPL")),
+                                       flight.do("MSFT", lambda: fetch("MSFT")))
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert results == ["AAPL", "MSFT"]
+    assert flight.executions == 2
+
+
+def test_timeout_does_not_cancel_shared_call():
+    """Um chamador com prazo curto desiste sem cancelar a busca dos demais"""
+    async def scenario():
+        flight = SingleFlight()
+
+        async def slow_fetch():
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        impatient = flight.do("AAPL", slow_fetch, timeout=0.01)
+        patient = flight.do("AAPL", slow_fetch, timeout=1)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(scenario())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == "ok"
+
+
+def test_errors_reach_all_callers_and_are_not_cached():
+    """Falhas chegam a todos os chamadores e a próxima chamada tenta de novo"""
+    attempts = []
+
+    async def failing_fetch():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError("upstream fora do ar")
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.do("AAPL", failing_fetch) for _ in range(3)],
+                                       return_exceptions=True)
+        with pytest.raises(ConnectionError):
+            await flight.do("AAPL", failing_fetch)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, ConnectionError) for r in results)
+    assert len(attempts) == 2
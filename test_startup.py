@@ -0,0 +1,78 @@
+"""
+Testes da medição das fases de inicialização (api/startup.py)
+"""
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.startup import PhaseTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_phases_are_recorded_in_order():
+    """Cada fase registra a própria duração, na ordem de execução"""
+    clock = FakeClock()
+    timer = PhaseTimer(clock=clock)
+    with timer.phase("load_model"):
+        clock.now += 1.5
+    with timer.phase("warmup"):
+        clock.now += 0.25
+    assert list(timer.durations) == ["load_model", "warmup"]
+    assert timer.total == pytest.approx(1.75)
+    assert timer.as_dict() == {"phases_ms": {"load_model": 1500.0, "warmup": 250.0}, "total_ms": 1750.0}
+
+
+def test_failed_phase_is_still_recorded():
+    """Uma fase que falha também tem a duração registrada"""
+    clock = FakeClock()
+    timer = PhaseTimer(clock=clock)
+    with pytest.raises(RuntimeError):
+        with timer.phase("load_model"):
+            clock.now += 2
+            raise RuntimeError("arquivo corrompido")
+    assert timer.durations["load_model"] == 2
+
+
+def test_failed_bundle_load_releases_workers_and_batcher(monkeypatch):
+    """Se o aquecimento falhar, os processos de inferência e o micro-batcher são encerrados"""
+    from api import main
+    from api.numpy_lstm import NumpyLSTMModel
+
+    if not os.path.exists(main.MODEL_PATH):
+        pytest.skip("Modelo treinado não encontrado")
+    started = {}
+
+    class TrackedPool(main.InferenceWorkerPool):
+        def start(self):
+            started["pool"] = self
+            return super().start()
+
+    class TrackedBatcher(main.MicroBatcher):
+        def start(self):
+            batcher = super().start()
+            started["batcher_thread"] = batcher._thread
+            return batcher
+
+    def broken_encode(self, windows):
+        raise RuntimeError("falha simulada no aquecimento")
+
+    monkeypatch.setattr(main, "INFERENCE_BACKEND", "numpy")
+    monkeypatch.setattr(main, "InferenceWorkerPool", TrackedPool)
+    monkeypatch.setattr(main, "MicroBatcher", TrackedBatcher)
+    monkeypatch.setattr(NumpyLSTMModel, "encode", broken_encode)
+
+    with pytest.raises(RuntimeError, match="aquecimento"):
+        main.load_model_bundle("teste", batching=True, workers=1)
+    assert started["pool"]._closed
+    assert all(worker is None for worker in started["pool"]._workers)
+    assert not started["batcher_thread"].is_alive()
@@ -0,0 +1,115 @@
+"""
+Testes da previsão em streaming (api/streaming.py)
+"""
+import numpy as np
+import pytest
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+from api.numpy_lstm import NumpyLSTMModel
+from api.streaming import StreamStateStore, parse_stream_message
+
+MODEL_PATH = os.path.join(ROOT_DIR, 'api', 'models', 'stock_lstm_model.h5')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="Modelo treinado não encontrado")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return NumpyLSTMModel.from_h5(MODEL_PATH)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def series():
+    return np.random.default_rng(3).uniform(0.3, 0.9, size=80).astype(np.float32)
+
+
+def test_seed_matches_predict(engine, series):
+    """Inicializar um ticker dá a previsão do modelo para a janela"""
+    store = StreamStateStore(engine, 60)
+    output, bars = store.seed("aapl", series[:60])
+    assert bars == 60
+    assert "AAPL" in store
+    assert output == pytest.approx(float(engine.predict(series[None, :60])[0, 0]), abs=1e-6)
+
+
+def test_update_steps_the_state(engine, series):
+    """Cada barra avança o estado um passo (sequência acumulada)"""
+    store = StreamStateStore(engine, 60, resync_interval=0)
+    store.seed("AAPL", series[:60])
+    for i in range(60, 65):
+        output, bars, resynced = store.update("AAPL", series[i])
+    assert bars == 65
+    assert not resynced
+    assert output == pytest.approx(float(engine.predict(series[None, :65])[0, 0]), abs=1e-5)
+
+
+def test_resync_returns_exact_window_prediction(engine, series):
+    """Na resincronização a previsão é a do modelo sobre os últimos 60 preços"""
+    store = StreamStateStore(engine, 60, resync_interval=5)
+    store.seed("AAPL", series[:60])
+    results = [store.update("AAPL", p) for p in series[60:65]]
+    output, _, resynced = results[-1]
+    assert resynced
+    assert output == pytest.approx(float(engine.predict(series[None, 5:65])[0, 0]), abs=1e-6)
+
+
+def test_tickers_are_independent(engine, series):
+    """O estado de um ticker não interfere no de outro"""
+    store = StreamStateStore(engine, 60, resync_interval=0)
+    store.seed("AAPL", series[:60])
+    expected, _ = StreamStateStore(engine, 60).seed("MSFT", series[10:70])
+    store.seed("MSFT", series[10:70])
+    store.update("AAPL", 0.5)
+    output, _, _ = store.update("MSFT", series[70])
+    assert output == pytest.approx(float(engine.predict(series[None, 10:71])[0, 0]), abs=1e-5)
+
+
+def test_lru_eviction_when_full(engine, series):
+    """Com a capacidade esgotada o ticker menos recente é despejado"""
+    clock = FakeClock()
+    store = StreamStateStore(engine, 60, capacity=2, idle_ttl_seconds=0, clock=clock)
+    store.seed("AAPL", series[:60])
+    clock.now = 1
+    store.seed("MSFT", series[:60])
+    clock.now = 2
+    store.update("AAPL", 0.5)
+    store.seed("GOOG", series[:60])
+    assert "AAPL" in store and "GOOG" in store and "MSFT" not in store
+    assert store.stats()["evictions"] == 1
+
+
+def test_idle_eviction(engine, series):
+    """Tickers ociosos além do TTL são removidos"""
+    clock = FakeClock()
+    store = StreamStateStore(engine, 60, idle_ttl_seconds=10, clock=clock)
+    store.seed("AAPL", series[:60])
+    clock.now = 20
+    assert store.evict_idle() == 1
+    assert len(store) == 0
+    with pytest.raises(KeyError):
+        store.update("AAPL", 0.5)
+
+
+def test_parse_stream_message():
+    """Validação das mensagens do streaming"""
+    assert parse_stream_message({"ticker": "aapl", "price": 1}) == ("AAPL", None, 1.0)
+    assert parse_stream_message({"ticker": "AAPL"}) == ("AAPL", None, None)
+    with pytest.raises(ValueError):
+        parse_stream_message({"price": 1.0})
+    with pytest.raises(ValueError):
+        parse_stream_message({"ticker": "AAPL", "price": "alto"})
+    with pytest.raises(ValueError):
+        parse_stream_message({"ticker": "AAPL", "price": 1.0, "prices": [1.0]})
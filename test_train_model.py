@@ -0,0 +1,194 @@
+"""
+Testes da exportação em precisão reduzida do train_model.py
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+import pandas as pd
+
+# Adicionar o diretório raiz ao path
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+pytest.importorskip("keras")
+pytest.importorskip("yfinance")
+
+import train_model
+from api.numpy_lstm import NumpyLSTMModel
+
+MODEL_PATH = os.path.join(ROOT_DIR, 'api', 'models', 'stock_lstm_model.h5')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(MODEL_PATH), reason="Modelo treinado não encontrado")
+
+
+@pytest.fixture(scope="module")
+def test_set():
+    """Série sintética com o mesmo pré-processamento do treino"""
+    rng = np.random.default_rng(0)
+    prices = 150 + np.linspace(0, 50, 600) + rng.normal(scale=5, size=600)
+    df = pd.DataFrame({'Close': prices})
+    scaler, _, _, X_test, y_test_actual = train_model.prepare_data(df)
+    return scaler, X_test, y_test_actual
+
+
+def test_accuracy_loss():
+    """A perda é a maior piora relativa entre as métricas"""
+    baseline = {'mae': 2.0, 'rmse': 3.0, 'mape': 1.0}
+    assert train_model.accuracy_loss(baseline, {'mae': 2.0, 'rmse': 3.3, 'mape': 0.9}) == pytest.approx(0.1)
+
+
+def test_export_within_threshold_is_published(tmp_path, test_set):
+    """Dentro do limite a exportação int8 é publicada"""
+    scaler, X_test, y_test_actual = test_set
+    model = NumpyLSTMModel.from_h5(MODEL_PATH)
+    baseline = train_model.evaluate(model, scaler, X_test, y_test_actual)
+    path = str(tmp_path / "stock_lstm_model.int8.npz")
+
+    published, metrics = train_model.export_reduced_precision(model, scaler, X_test, y_test_actual,
+                                                              baseline, "int8", path, max_loss=0.05)
+    assert published
+    assert os.path.exists(path)
+    assert train_model.accuracy_loss(baseline, metrics) <= 0.05
+
+
+def test_export_over_threshold_is_refused(tmp_path, test_set):
+    """Acima do limite a exportação é recusada e a anterior é removida"""
+    scaler, X_test, y_test_actual = test_set
+    model = NumpyLSTMModel.from_h5(MODEL_PATH)
+    # Linha de base artificialmente perfeita: qualquer piora excede o limite
+    baseline = {name: value * 0.5 for name, value in
+                train_model.evaluate(model, scaler, X_test, y_test_actual).items()}
+    path = tmp_path / "stock_lstm_model.int8.npz"
+    path.write_bytes(b"exportacao anterior")
+
+    published, _ = train_model.export_reduced_precision(model, scaler, X_test, y_test_actual,
+                                                        baseline, "int8", str(path), max_loss=0.05)
+    assert not published
+    assert not path.exists()
+
+
+def test_download_data_reads_price_store(tmp_path):
+    """Com o ticker no armazenamento local, o treino usa as barras gravadas (sem rede)"""
+    from datetime import date
+
+    from api.price_providers import SyntheticPriceProvider
+    from api.price_store import PriceStore
+
+    PriceStore(str(tmp_path)).append("AAPL", SyntheticPriceProvider().fetch_bars("AAPL", date(2023, 1, 1), date(2024, 1, 1)))
+    df = train_model.load_stored_data("AAPL", "2023-06-01", "2023-07-01", store_dir=str(tmp_path))
+    assert list(df.columns) == ["Close", "Open", "High", "Low", "Volume"]
+    assert df.index[0] >= pd.Timestamp("2023-06-01") and df.index[-1] < pd.Timestamp("2023-07-01")
+    assert train_model.load_stored_data("MSFT", "2023-06-01", "2023-07-01", store_dir=str(tmp_path)) is None
+
+
+def test_fine_tune_windows():
+    """Só alvos após o corte são novos; os mais recentes validam e o treino recebe o replay"""
+    dates = pd.bdate_range("2023-01-02", periods=300)
+    df = pd.DataFrame({'Close': 150 + np.arange(300, dtype=float)}, index=dates)
+    scaler, *_ = train_model.prepare_data(df)
+    cutoff = dates[249]
+
+    X_train, y_train, X_val, y_val, y_val_actual = train_model.fine_tune_windows(
+        df, scaler, cutoff, replay_ratio=2.0, validation_split=0.2)
+    assert len(X_val) == 10 and X_val.shape[1:] == (train_model.WINDOW_SIZE, 1)
+    np.testing.assert_array_equal(y_val_actual[:, 0], df['Close'].values[-10:])
+    # 40 janelas novas de treino + 80 antigas sorteadas
+    assert len(X_train) == len(y_train) == 120
+    assert np.sum(y_train > scaler.transform([[df['Close'].iloc[249]]])[0, 0] + 1e-9) == 40
+
+    assert train_model.fine_tune_windows(df, scaler, dates[-2]) is None
+
+
+def test_incremental_excludes_today_by_default(monkeypatch):
+    """Sem END_DATE, o incremental coleta até ontem: o fim exclusivo é hoje"""
+    from datetime import datetime
+
+    requested = []
+
+    def fake_load_series(tickers, start, end):
+        requested.append(end)
+        return []
+
+    monkeypatch.delenv('END_DATE', raising=False)
+    monkeypatch.setattr(train_model, 'load_series', fake_load_series)
+    assert train_model.train_incremental({'cutoff_date': '2024-01-02'}, {}) is None
+    assert requested == [datetime.now().date().strftime('%Y-%m-%d')]
+
+
+def test_create_sequences_views():
+    """As janelas são views da série, iguais ao corte janela a janela"""
+    data = np.arange(100, dtype=float).reshape(-1, 1)
+    X, y = train_model.create_sequences(data, 60)
+    assert X.shape == (40, 60) and np.shares_memory(X, data)
+    np.testing.assert_array_equal(X[5], data[5:65, 0])
+    np.testing.assert_array_equal(y, data[60:, 0])
+    assert train_model.create_sequences(data[:60], 60)[0].shape == (0, 60)
+
+
+def test_window_sets_match_prepare_data():
+    """O pipeline com um ticker gera as mesmas janelas e alvos do prepare_data"""
+    rng = np.random.default_rng(1)
+    prices = 150 + np.cumsum(rng.normal(size=400))
+    scaler, X_train, y_train, X_test, y_test_actual = train_model.prepare_data(pd.DataFrame({'Close': prices}))
+    scaler_ws, train, test, y_test_ws = train_model.build_window_sets([prices])
+
+    assert scaler_ws.data_min_ == scaler.data_min_ and scaler_ws.data_max_ == scaler.data_max_
+    assert len(train) == len(X_train) and len(test) == len(X_test)
+    np.testing.assert_allclose(train[:], X_train, rtol=1e-6)
+    np.testing.assert_allclose(test[10:20], X_test[10:20], rtol=1e-6)
+    np.testing.assert_array_equal(y_test_ws, y_test_actual)
+
+    x, y = next(iter(train.dataset(batch_size=len(train), shuffle_buffer=0)))
+    np.testing.assert_allclose(x.numpy(), X_train, rtol=1e-6)
+    np.testing.assert_allclose(y.numpy(), y_train, rtol=1e-6)
+
+
+def test_window_sets_do_not_cross_tickers():
+    """Com vários tickers, nenhuma janela mistura séries e o embaralhamento cobre todas"""
+    a, b = np.full(100, 10.0), np.full(150, 20.0)
+    _, train, _, _ = train_model.build_window_sets([a, b], window_size=10)
+    assert len(train) == (80 - 10) + (120 - 10)
+
+    seen = []
+    for x, y in train.dataset(batch_size=16, shuffle_buffer=50):
+        x = x.numpy()[..., 0]
+        assert np.all(x.min(axis=1) == x.max(axis=1))
+        np.testing.assert_array_equal(x[:, 0], y.numpy())
+        seen.append(len(x))
+    assert sum(seen) == len(train)
+
+
+def test_empty_window_set_dataset():
+    """Um conjunto sem janelas é recusado com uma mensagem clara, em vez de falhar no shuffle"""
+    empty = train_model.WindowSet(np.arange(50, dtype=np.float32), [(0, 50)], window_size=60)
+    assert len(empty) == 0
+    with pytest.raises(ValueError, match="sem janelas"):
+        empty.dataset()
+
+
+def test_load_series_in_parallel(tmp_path, monkeypatch):
+    """A coleta em vários processos devolve as séries na ordem dos tickers"""
+    from datetime import date
+
+    from api.price_providers import SyntheticPriceProvider
+    from api.price_store import PriceStore
+
+    store = PriceStore(str(tmp_path))
+    for ticker in ("AAPL", "MSFT"):
+        store.append(ticker, SyntheticPriceProvider().fetch_bars(ticker, date(2023, 1, 1), date(2024, 1, 1)))
+    monkeypatch.setattr(train_model, "PRICE_STORE_DIR", str(tmp_path))
+
+    loaded = train_model.load_series(["MSFT", "AAPL"], "2023-01-01", "2024-01-01", workers=2)
+    for (dates, closes), ticker in zip(loaded, ("MSFT", "AAPL")):
+        np.testing.assert_array_equal(closes, store.read(ticker)["close"])
+
+
+def test_loader_processes_do_not_import_tensorflow():
+    """Os processos de coleta reexecutam o script principal: importá-lo não pode carregar o TensorFlow"""
+    import subprocess
+
+    code = ("import sys, train_model, walk_forward, price_data; "
+            "sys.exit('tensorflow' in sys.modules or 'keras' in sys.modules)")
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR).returncode == 0
@@ -0,0 +1,126 @@
+"""
+Testes da avaliação walk-forward (walk_forward.py)
+Usa séries sintéticas em memória, sem acesso à rede
+"""
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("keras")
+pytest.importorskip("yfinance")
+
+import train_model
+import walk_forward
+from train_model import WindowSet
+
+WINDOW = 10
+
+
+def business_days(start, count):
+    days = np.arange(np.datetime64(start), np.datetime64(start) + count * 2)
+    return days[np.is_busday(days)][:count]
+
+
+def test_folds_are_consecutive_and_leak_free():
+    """Cada fold treina só com alvos anteriores à origem e os testes não se sobrepõem"""
+    dates = [business_days("2020-01-01", 600), business_days("2021-01-01", 300)]
+    folds = walk_forward.make_folds(dates, folds=3, test_days=60, window_size=WINDOW)
+    series = np.concatenate([np.arange(len(d), dtype=float) for d in dates])
+    all_dates = np.concatenate(dates)
+
+    previous_end = None
+    for fold in folds:
+        origin = np.datetime64(fold["test_start"])
+        train = WindowSet(series, fold["train_segments"], WINDOW)
+        test = WindowSet(series, fold["test_segments"], WINDOW)
+        assert len(train) and len(test)
+        assert all_dates[train.target_indices()].max() < origin
+        test_dates = all_dates[test.target_indices()]
+        assert test_dates.min() >= origin and test_dates.max() <= np.datetime64(fold["test_end"])
+        if previous_end is not None:
+            assert origin == previous_end + np.timedelta64(1, "D")
+        previous_end = np.datetime64(fold["test_end"])
+    assert previous_end == max(d[-1] for d in dates)
+
+
+def test_rolling_train_window():
+    """Com train_days, o treino começa train_days antes da origem"""
+    dates = [business_days("2020-01-01", 600)]
+    fold = walk_forward.make_folds(dates, folds=1, test_days=30, train_days=90, window_size=WINDOW)[0]
+    train = WindowSet(np.zeros(600), fold["train_segments"], WINDOW)
+    first_target = dates[0][train.target_indices()].min()
+    assert first_target >= np.datetime64(fold["test_start"]) - np.timedelta64(90, "D")
+    assert len(train) < 70
+
+
+def test_fold_scaler_ignores_test_period():
+    """O escalonador de cada fold vê só as barras de treino: um pico no teste não muda a escala"""
+    dates = [business_days("2020-01-01", 400), business_days("2020-01-01", 400)[200:]]
+    raw = np.concatenate([np.linspace(10, 20, 400), np.linspace(30, 40, 200)])
+    fold = walk_forward.make_folds(dates, folds=1, test_days=60, window_size=WINDOW)[0]
+    spiked = raw.copy()
+    for begin, end in fold["test_segments"]:
+        spiked[begin + WINDOW:end] *= 10
+
+    scaler = walk_forward.fold_scaler(spiked, fold["train_segments"])
+    train_values = np.concatenate([raw[begin:end] for begin, end in fold["train_segments"]])
+    assert scaler.data_min_[0] == train_values.min() and scaler.data_max_[0] == train_values.max()
+    assert scaler.data_max_[0] < 40
+    with pytest.raises(ValueError):
+        walk_forward.fold_scaler(raw, [(0, 0)])
+
+
+def test_aggregate_weights_by_test_windows():
+    results = [
+        {"fold": 0, "test_windows": 100, "mae": 1.0, "rmse": 1.0, "mape": 1.0, "seconds": 2.0},
+        {"fold": 1, "test_windows": 300, "mae": 2.0, "rmse": 3.0, "mape": 2.0, "seconds": 3.0},
+        {"fold": 2, "error": "falhou", "seconds": 0.1},
+    ]
+    summary = walk_forward.aggregate(results)
+    assert summary["folds"] == 2 and summary["test_windows"] == 400
+    assert summary["mae"] == pytest.approx(1.75)
+    assert summary["rmse"] == pytest.approx(np.sqrt((100 + 300 * 9) / 400))
+    assert summary["fold_seconds"] == pytest.approx(5.0)
+
+
+def test_run_folds_in_process():
+    """Um fold completo (treino curto) produz métricas e tempo"""
+    rng = np.random.default_rng(0)
+    dates = business_days("2020-01-01", 400)
+    closes = 100 + np.cumsum(rng.normal(size=400))
+    state = {"raw": closes, "window_size": WINDOW, "epochs": 1, "seed": 0}
+    folds = walk_forward.make_folds([dates], folds=2, test_days=30, window_size=WINDOW)
+    folds.append({**folds[0], "fold": 2, "test_segments": [(0, WINDOW)]})
+
+    results = sorted(walk_forward.run_folds(state, folds, workers=1), key=lambda r: r["fold"])
+    assert [r["fold"] for r in results] == [0, 1, 2]
+    for r in results[:2]:
+        assert "error" not in r and r["mae"] > 0 and r["seconds"] > 0 and r["test_windows"] > 0
+    assert "error" in results[2]
+
+
+def test_prepare_state_with_parallel_loading(tmp_path, monkeypatch):
+    """Coleta em vários processos (spawn, após importar o TensorFlow) gera o mesmo estado da coleta serial"""
+    from datetime import date
+
+    from api.price_providers import SyntheticPriceProvider
+    from api.price_store import PriceStore
+
+    store = PriceStore(str(tmp_path))
+    for ticker in ("AAPL", "MSFT"):
+        store.append(ticker, SyntheticPriceProvider().fetch_bars(ticker, date(2023, 1, 1), date(2024, 1, 1)))
+    monkeypatch.setattr(train_model, "PRICE_STORE_DIR", str(tmp_path))
+
+    state, series_dates = walk_forward.prepare_state(["AAPL", "MSFT"], "2023-01-01", "2024-01-01",
+                                                     epochs=1, workers=2)
+    serial, serial_dates = walk_forward.prepare_state(["AAPL", "MSFT"], "2023-01-01", "2024-01-01",
+                                                      epochs=1, workers=1)
+    np.testing.assert_array_equal(state["raw"], serial["raw"])
+    np.testing.assert_array_equal(state["raw"], np.concatenate([store.read(t)["close"] for t in ("AAPL", "MSFT")]))
+    for dates, expected in zip(series_dates, serial_dates):
+        np.testing.assert_array_equal(dates, expected)
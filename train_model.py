@@ -1,137 +1,529 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import os
+import json
 import pickle
+import shutil
+import time
+from datetime import datetime, timedelta, timezone
+
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from keras.models import Sequential
-from keras.layers import LSTM, Dense, Dropout
 
-# --- 1. Configurações e Coleta de Dados ---
-TICKER = 'AAPL'
+import price_data
+from api.numpy_lstm import PRECISIONS, NumpyLSTMModel
+from price_data import load_stored_data  # noqa: F401
+
+# TensorFlow e Keras são importados nas funções que os usam: os processos de coleta
+# (spawn) reexecutam o módulo principal, e assim não pagam a importação
+
+# --- 1. Configurações ---
+TICKER = os.getenv('TICKER', 'AAPL')
+# Tickers do treino (separados por vírgula); o padrão é apenas TICKER. As séries são
+# preparadas em paralelo por PREPARE_WORKERS processos
+TICKERS = [t.strip().upper() for t in os.getenv('TICKERS', TICKER).split(',') if t.strip()]
+PREPARE_WORKERS = int(os.getenv('PREPARE_WORKERS', str(os.cpu_count() or 1)))
 START_DATE = '2018-01-01'
-END_DATE = '2024-07-20'
+# Fim exclusivo dos dados. No modo incremental, sem END_DATE definido, vai até ontem
+# (o pregão de hoje pode estar em andamento)
+END_DATE = os.getenv('END_DATE', '2024-07-20')
 WINDOW_SIZE = 60 # Janela de 60 dias para prever o próximo
+BATCH_SIZE = 32
+# Janelas embaralhadas por vez no pipeline de treino (memória: 8 bytes por janela)
+SHUFFLE_BUFFER = int(os.getenv('SHUFFLE_BUFFER', '100000'))
+# Janelas por chamada do modelo na avaliação
+EVAL_CHUNK_SIZE = 4096
+
+# Diretório dos artefatos: api/models é o modelo padrão; api/models/<TICKER> (ou
+# api/models/<grupo>) cria um modelo específico, usado pela API só para esse ticker/grupo
+MODEL_DIR = os.getenv('MODEL_DIR', 'api/models')
+MODEL_PATH = os.path.join(MODEL_DIR, 'stock_lstm_model.h5')
+SCALER_PATH = os.path.join(MODEL_DIR, 'scaler.pkl')
+# Registro do último treino (modo, data de corte, tempos e métricas), salvo com os artefatos
+TRAINING_INFO_PATH = os.path.join(MODEL_DIR, 'training.json')
+
+# Modo de treino: "full" treina do zero desde START_DATE; "incremental" carrega o modelo
+# atual e faz fine-tuning só com as barras posteriores ao último corte, mais uma amostra
+# de janelas antigas (replay) para não esquecer o histórico
+TRAIN_MODE = os.getenv('TRAIN_MODE', 'full').lower()
+FULL_EPOCHS = int(os.getenv('FULL_EPOCHS', '50'))
+FINE_TUNE_EPOCHS = int(os.getenv('FINE_TUNE_EPOCHS', '20'))
+FINE_TUNE_LEARNING_RATE = float(os.getenv('FINE_TUNE_LEARNING_RATE', '0.0001'))
+# Janelas antigas sorteadas por janela nova, e até quantos dias antes do corte buscá-las
+REPLAY_RATIO = float(os.getenv('REPLAY_RATIO', '2.0'))
+REPLAY_LOOKBACK_DAYS = int(os.getenv('REPLAY_LOOKBACK_DAYS', '730'))
+# Fração mais recente das janelas novas usada como validação (parada antecipada)
+VALIDATION_SPLIT = float(os.getenv('VALIDATION_SPLIT', '0.2'))
+EARLY_STOPPING_PATIENCE = int(os.getenv('EARLY_STOPPING_PATIENCE', '3'))
+# Checkpoints por época: uma execução interrompida continua de onde parou
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', os.path.join(MODEL_DIR, '.checkpoints'))
+
+# Exportação em precisão reduzida (servida pela API com MODEL_PRECISION): "float16", "int8"
+# ou "none". Só é publicada se nenhuma métrica piorar mais que MAX_ACCURACY_LOSS (relativo)
+EXPORT_PRECISION = os.getenv('EXPORT_PRECISION', 'int8').lower()
+MAX_ACCURACY_LOSS = float(os.getenv('MAX_ACCURACY_LOSS', '0.02'))
+
+# Armazenamento local de preços (ingest_prices.py): quando tem o ticker, é usado
+# no lugar do download
+PRICE_STORE_DIR = price_data.PRICE_STORE_DIR
+
+
+def quantized_model_path(precision, model_dir=MODEL_DIR):
+    return os.path.join(model_dir, f'stock_lstm_model.{precision}.npz')
 
-MODEL_PATH = 'api/models/stock_lstm_model.h5'
-SCALER_PATH = 'api/models/scaler.pkl'
-
-# Criar diretório de modelos se não existir
-os.makedirs('api/models', exist_ok=True)
-
-print(f"Baixando dados para {TICKER} de {START_DATE} até {END_DATE}...")
-try:
-    df = yf.download(TICKER, start=START_DATE, end=END_DATE, progress=False)
-    if df.empty:
-        raise ValueError("DataFrame vazio")
-    print("Dados baixados com sucesso.")
-    print(f"Total de registros: {len(df)}")
-except Exception as e:
-    print(f"Erro ao baixar dados: {e}")
-    print("Criando dados sintéticos para demonstração...")
-    # Criar dados sintéticos para teste
-    date_range = pd.date_range(start=START_DATE, end=END_DATE, freq='B')  # Business days
-    np.random.seed(42)
-    # Simular preços de ações com tendência e volatilidade
-    base_price = 150
-    trend = np.linspace(0, 50, len(date_range))
-    volatility = np.random.randn(len(date_range)) * 5
-    prices = base_price + trend + volatility
-    prices = np.maximum(prices, 1)  # Garantir preços positivos
-    
-    df = pd.DataFrame({
-        'Close': prices,
-        'Open': prices * (1 + np.random.randn(len(date_range)) * 0.01),
-        'High': prices * (1 + np.abs(np.random.randn(len(date_range))) * 0.02),
-        'Low': prices * (1 - np.abs(np.random.randn(len(date_range))) * 0.02),
-        'Volume': np.random.randint(1000000, 10000000, len(date_range))
-    }, index=date_range)
-    print(f"Dados sintéticos criados. Total de registros: {len(df)}")
-
-# --- 2. Pré-processamento dos Dados ---
-# Verificar se o DataFrame tem multi-level columns (caso do yfinance atualizado)
-if isinstance(df.columns, pd.MultiIndex):
-    # Achatar as colunas multi-level
-    df.columns = df.columns.get_level_values(0)
-
-data = df.filter(['Close'])
-dataset = data.values
-
-# Dividir dados em treino (80%) e teste (20%)
-training_data_len = int(len(dataset) * 0.8)
-
-# Escalonamento dos dados
-scaler = MinMaxScaler(feature_range=(0, 1))
-scaled_data = scaler.fit_transform(dataset)
-
-# Criar dados de treino escalonados
-train_data = scaled_data[0:training_data_len, :]
-
-# Função para criar sequências
+
+# --- 2. Coleta de Dados ---
+# A coleta fica em price_data.py, que não importa TensorFlow: é o que os processos
+# de coleta (spawn) executam
+def download_data(ticker=TICKER, start=START_DATE, end=END_DATE):
+    return price_data.download_data(ticker, start, end, PRICE_STORE_DIR)
+
+
+def load_series(tickers, start=START_DATE, end=END_DATE, workers=PREPARE_WORKERS):
+    """
+    Séries de fechamento dos tickers, na ordem de `tickers`. Com mais de um
+    ticker, a coleta (download ou leitura do armazenamento local) é feita em
+    paralelo por até `workers` processos.
+    """
+    return price_data.load_series(tickers, start, end, workers, PRICE_STORE_DIR)
+
+
+# --- 3. Pré-processamento dos Dados ---
 def create_sequences(data, window_size):
-    X, y = [], []
-    for i in range(window_size, len(data)):
-        X.append(data[i-window_size:i, 0])
-        y.append(data[i, 0])
-    return np.array(X), np.array(y)
+    """
+    Janelas (N, window_size) da primeira coluna de `data` e os alvos (o dia
+    seguinte a cada janela). As janelas são views deslizantes, sem cópia.
+    """
+    series = np.asarray(data)[:, 0]
+    if len(series) <= window_size:
+        return np.empty((0, window_size), dtype=series.dtype), series[:0]
+    return np.lib.stride_tricks.sliding_window_view(series[:-1], window_size), series[window_size:]
+
+
+class WindowSet:
+    """
+    Janelas deslizantes de vários trechos de uma série escalonada, geradas
+    sob demanda: nada além da série 1-D fica em memória, então o custo não
+    cresce com o tamanho da janela. `segments` são os intervalos [início, fim)
+    de cada trecho em `series` (um por ticker); uma janela nunca cruza trechos
+    e a janela k de um trecho prevê o índice início + k + window_size.
+    """
+
+    def __init__(self, series, segments, window_size=WINDOW_SIZE):
+        self.series = np.asarray(series, dtype=np.float32)
+        self.window_size = window_size
+        counts = np.array([max(end - begin - window_size, 0) for begin, end in segments], dtype=np.int64)
+        # Fim acumulado das janelas de cada trecho e deslocamento janela global -> índice de início
+        self._ends = np.cumsum(counts)
+        self._offsets = np.array([begin for begin, _ in segments], dtype=np.int64) - (self._ends - counts)
+
+    def __len__(self):
+        return int(self._ends[-1]) if len(self._ends) else 0
+
+    def _starts(self, k):
+        return k + self._offsets[np.searchsorted(self._ends, k, side='right')]
+
+    def target_indices(self):
+        """Índice em `series` do alvo de cada janela."""
+        return self._starts(np.arange(len(self))) + self.window_size
+
+    def __getitem__(self, index):
+        """Janelas de um intervalo como array (n, window_size, 1)."""
+        starts = self._starts(np.arange(len(self))[index])
+        return self.series[starts[:, None] + np.arange(self.window_size)][..., None]
+
+    def dataset(self, batch_size=BATCH_SIZE, shuffle_buffer=SHUFFLE_BUFFER, seed=42):
+        """
+        tf.data com os lotes (janelas, alvos): os índices das janelas são
+        embaralhados em um buffer de `shuffle_buffer` posições e cada lote é
+        montado com gather sobre a série, em paralelo e com prefetch.
+        """
+        if not len(self):
+            raise ValueError("Conjunto sem janelas: os trechos são menores que a janela "
+                             f"({self.window_size} pregões) mais um alvo")
+        # Variável, e não constante: a série não é embutida no grafo (limite de 2 GB do GraphDef)
+        import tensorflow as tf
+
+        series = tf.Variable(self.series, trainable=False)
+        ends = tf.constant(self._ends)
+        offsets = tf.constant(self._offsets)
+        steps = tf.range(self.window_size, dtype=tf.int64)
+
+        def gather(k):
+            starts = k + tf.gather(offsets, tf.searchsorted(ends, k, side='right'))
+            windows = tf.gather(series, starts[:, None] + steps)
+            return windows[..., None], tf.gather(series, starts + self.window_size)
+
+        ds = tf.data.Dataset.range(len(self))
+        if shuffle_buffer > 1:
+            ds = ds.shuffle(min(shuffle_buffer, len(self)), seed=seed, reshuffle_each_iteration=True)
+        return ds.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+def scale_series(closes):
+    """
+    Concatena as séries de fechamento e as escalona com um único escalonador
+    ajustado a todas. Retorna (scaler, série bruta, série escalonada float32).
+    """
+    raw = np.concatenate(closes)
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(np.array([[raw.min()], [raw.max()]]))
+    return scaler, raw, scaler.transform(raw.reshape(-1, 1)).ravel().astype(np.float32)
+
+
+def build_window_sets(closes, window_size=WINDOW_SIZE):
+    """
+    Escalona as séries de fechamento (uma por ticker) com um único escalonador
+    e divide cada uma em treino (80% iniciais) e teste (20% finais), como o
+    `prepare_data`. Retorna (scaler, treino, teste, y_test_actual), com os
+    conjuntos como `WindowSet` sobre a mesma série concatenada.
+    """
+    scaler, raw, scaled = scale_series(closes)
+    train_segments, test_segments = [], []
+    offset = 0
+    for series in closes:
+        training_data_len = int(len(series) * 0.8)
+        train_segments.append((offset, offset + training_data_len))
+        test_segments.append((offset + training_data_len - window_size, offset + len(series)))
+        offset += len(series)
+    train = WindowSet(scaled, train_segments, window_size)
+    test = WindowSet(scaled, test_segments, window_size)
+    return scaler, train, test, raw[test.target_indices()].reshape(-1, 1)
+
+
+def array_dataset(X, y, batch_size=BATCH_SIZE, seed=42):
+    """tf.data embaralhado a cada época para conjuntos pequenos já em memória."""
+    import tensorflow as tf
+
+    return (tf.data.Dataset.from_tensor_slices((X.astype(np.float32), y.astype(np.float32)))
+            .shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+            .batch(batch_size).prefetch(tf.data.AUTOTUNE))
+
+
+def prepare_data(df, window_size=WINDOW_SIZE):
+    """
+    Escalona os preços de fechamento e monta as janelas de treino (80%) e de
+    teste (20%). Retorna (scaler, X_train, y_train, X_test, y_test_actual).
+    """
+    dataset = df.filter(['Close']).values
+
+    # Dividir dados em treino (80%) e teste (20%)
+    training_data_len = int(len(dataset) * 0.8)
+
+    # Escalonamento dos dados
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaled_data = scaler.fit_transform(dataset)
+
+    # Criar dados de treino escalonados
+    train_data = scaled_data[0:training_data_len, :]
+    X_train, y_train = create_sequences(train_data, window_size)
+
+    # Remodelar para o formato 3D [amostras, passos de tempo, features]
+    X_train = np.reshape(X_train, (X_train.shape[0], X_train.shape[1], 1))
+
+    # Preparar dados de teste
+    test_data = scaled_data[training_data_len - window_size:, :]
+    X_test, _ = create_sequences(test_data, window_size)
+    y_test_actual = dataset[training_data_len:, :] # y_test real, não escalonado
+    X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
+
+    return scaler, X_train, y_train, X_test, y_test_actual
+
+
+# --- 4. Construção e Treinamento do Modelo LSTM ---
+def build_model(window_size=WINDOW_SIZE):
+    from keras.layers import LSTM, Dense, Dropout
+    from keras.models import Sequential
+
+    print("Construindo o modelo LSTM...")
+    model = Sequential()
+    model.add(LSTM(units=64, return_sequences=True, input_shape=(window_size, 1)))
+    model.add(Dropout(0.2))
+    model.add(LSTM(units=64, return_sequences=False))
+    model.add(Dropout(0.2))
+    model.add(Dense(units=32))
+    model.add(Dense(units=1))
+
+    print("Compilando o modelo...")
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+
+# --- 5. Avaliação do Modelo ---
+def evaluate(model, scaler, X_test, y_test_actual, chunk_size=EVAL_CHUNK_SIZE):
+    """
+    MAE, RMSE e MAPE (%) das previsões no conjunto de teste, na escala de
+    preços. `X_test` é um array ou `WindowSet`, lido em blocos de `chunk_size`.
+    """
+    predictions_scaled = np.concatenate([model.predict(np.asarray(X_test[i:i + chunk_size]), verbose=0)
+                                         for i in range(0, len(X_test), chunk_size)])
+    predictions = scaler.inverse_transform(predictions_scaled)
+
+    mae = mean_absolute_error(y_test_actual, predictions)
+    rmse = np.sqrt(mean_squared_error(y_test_actual, predictions))
+    mape = np.mean(np.abs((y_test_actual - predictions) / y_test_actual)) * 100
+    return {'mae': float(mae), 'rmse': float(rmse), 'mape': float(mape)}
+
+
+def print_metrics(metrics, title="Métricas de Avaliação no Conjunto de Teste"):
+    print(f"\n--- {title} ---")
+    print(f"Mean Absolute Error (MAE):    {metrics['mae']:.2f}")
+    print(f"Root Mean Squared Error (RMSE): {metrics['rmse']:.2f}")
+    print(f"Mean Absolute Percentage Error (MAPE): {metrics['mape']:.2f}%")
+
+
+def accuracy_loss(baseline, candidate):
+    """Maior piora relativa entre as métricas (0.01 = 1% pior que o modelo float32)."""
+    return max((candidate[name] - baseline[name]) / baseline[name] for name in baseline)
+
+
+def export_reduced_precision(model, scaler, X_test, y_test_actual, baseline, precision,
+                             path, max_loss=MAX_ACCURACY_LOSS):
+    """
+    Avalia `model` (NumpyLSTMModel) com os pesos em `precision` e só publica o
+    `.npz` em `path` se a perda de acurácia ficar dentro de `max_loss`. Quando
+    recusado, remove uma exportação anterior para a API não servir pesos que
+    não correspondem ao modelo atual. Retorna (publicado, métricas).
+    """
+    metrics = evaluate(model.to_precision(precision), scaler, X_test, y_test_actual)
+    print_metrics(metrics, f"Métricas com pesos em {precision}")
+    loss = accuracy_loss(baseline, metrics)
+    if loss > max_loss:
+        print(f"Exportação {precision} recusada: perda de acurácia de {loss:.2%} "
+              f"(máximo permitido: {max_loss:.2%}).")
+        if os.path.exists(path):
+            os.remove(path)
+        return False, metrics
+
+    model.save_npz(path, precision)
+    print(f"Modelo {precision} salvo em {path} (perda de acurácia: {loss:.2%}, "
+          f"{os.path.getsize(path) / 1024:.0f} KB).")
+    return True, metrics
+
+
+# --- 6. Treino Incremental ---
+def load_training_info(path=TRAINING_INFO_PATH):
+    """Registro do último treino, ou None se não houver."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_training_info(info, path=TRAINING_INFO_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def fine_tune_windows(df, scaler, cutoff, window_size=WINDOW_SIZE, replay_ratio=REPLAY_RATIO,
+                      validation_split=VALIDATION_SPLIT, seed=42):
+    """
+    Janelas do fine-tuning, escalonadas com o escalonador atual (o mesmo que a
+    API usa). As janelas cujo alvo é posterior a `cutoff` são novas: a fração
+    mais recente vira validação e o resto entra no treino junto com
+    `replay_ratio` janelas antigas por janela nova, sorteadas de forma
+    reprodutível. Retorna (X_train, y_train, X_val, y_val, y_val_actual), com
+    os preços reais em `y_val_actual`, ou None se houver menos de duas
+    janelas novas.
+    """
+    dataset = df.filter(['Close']).values
+    if len(dataset) <= window_size:
+        return None
+    X, y = create_sequences(scaler.transform(dataset), window_size)
+    X = X.reshape(X.shape[0], X.shape[1], 1)
+    target_dates = df.index[window_size:]
+    new = np.flatnonzero(target_dates > pd.Timestamp(cutoff))
+    if len(new) < 2:
+        return None
+
+    n_val = min(max(int(len(new) * validation_split), 1), len(new) - 1)
+    train_new, val = new[:len(new) - n_val], new[len(new) - n_val:]
+    old = np.arange(new[0])
+    rng = np.random.default_rng(seed)
+    replay = rng.choice(old, size=min(len(old), int(round(len(train_new) * replay_ratio))), replace=False)
+    train = np.sort(np.concatenate([train_new, replay]))
+    return X[train], y[train], X[val], y[val], dataset[window_size:][val]
+
+
+def fit(model, train_data, epochs, checkpoint_dir, validation_data=None,
+        patience=EARLY_STOPPING_PATIENCE):
+    """
+    Treina com o tf.data `train_data` e checkpoint a cada época em
+    `checkpoint_dir`: se a execução for interrompida, a próxima retoma da
+    última época concluída (o diretório é apagado ao terminar). Com
+    `validation_data`, para quando a perda de validação não melhora por
+    `patience` épocas e mantém os melhores pesos.
+    """
+    from keras.callbacks import BackupAndRestore, EarlyStopping
+
+    callbacks = [BackupAndRestore(backup_dir=checkpoint_dir)]
+    early_stopping = None
+    if validation_data is not None:
+        early_stopping = EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)
+        callbacks.append(early_stopping)
+    history = model.fit(train_data, epochs=epochs, validation_data=validation_data, callbacks=callbacks)
+    # O Keras só restaura os melhores pesos quando a parada antecipada dispara
+    if early_stopping is not None and not early_stopping.stopped_epoch and early_stopping.best_weights is not None:
+        model.set_weights(early_stopping.best_weights)
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    return history
+
+
+def save_artifacts(model, scaler, X_test, y_test_actual, metrics):
+    print(f"\nSalvando modelo em {MODEL_PATH}...")
+    model.save(MODEL_PATH)
+
+    print(f"Salvando escalonador em {SCALER_PATH}...")
+    with open(SCALER_PATH, 'wb') as f:
+        pickle.dump(scaler, f)
+
+    if EXPORT_PRECISION not in ('none', 'float32'):
+        export_reduced_precision(NumpyLSTMModel.from_keras(model), scaler, X_test, y_test_actual,
+                                 metrics, EXPORT_PRECISION, quantized_model_path(EXPORT_PRECISION))
+
+
+def train_full(timings):
+    started = time.perf_counter()
+    loaded = load_series(TICKERS)
+    scaler, train, test, y_test_actual = build_window_sets([closes for _, closes in loaded])
+    timings['data_seconds'] = time.perf_counter() - started
+    print(f"Janelas de treino: {len(train)} de {len(TICKERS)} ticker(s); de teste: {len(test)}")
+
+    model = build_model()
+    print("Iniciando o treinamento do modelo...")
+    started = time.perf_counter()
+    history = fit(model, train.dataset(), FULL_EPOCHS, os.path.join(CHECKPOINT_DIR, 'full'))
+    timings['training_seconds'] = time.perf_counter() - started
+    print("Treinamento concluído.")
+
+    print("Iniciando avaliação do modelo...")
+    metrics = evaluate(model, scaler, test, y_test_actual)
+    print_metrics(metrics)
 
-X_train, y_train = create_sequences(train_data, WINDOW_SIZE)
+    save_artifacts(model, scaler, test, y_test_actual, metrics)
+    # As barras de teste não foram usadas no treino: o próximo incremental as inclui.
+    # Com vários tickers vale o corte mais antigo
+    return {
+        'tickers': TICKERS,
+        'data_start': str(min(dates[0] for dates, _ in loaded)),
+        'data_end': str(max(dates[-1] for dates, _ in loaded)),
+        'cutoff_date': str(min(dates[int(len(dates) * 0.8) - 1] for dates, _ in loaded)),
+        'epochs': len(history.epoch),
+        'train_windows': len(train),
+        'metrics': metrics,
+    }
 
-# Remodelar para o formato 3D [amostras, passos de tempo, features]
-X_train = np.reshape(X_train, (X_train.shape[0], X_train.shape[1], 1))
 
-print(f"Formato dos dados de treino (X_train): {X_train.shape}")
+def train_incremental(info, timings):
+    """
+    Fine-tuning do modelo atual com as barras posteriores a `info['cutoff_date']`.
+    Retorna o registro do treino, ou None se não houver barras novas ou se o
+    modelo ajustado for descartado.
+    """
+    cutoff = pd.Timestamp(info['cutoff_date'])
+    start = (cutoff - timedelta(days=REPLAY_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    # Fim exclusivo: a barra parcial de hoje não entra no treino nem na validação
+    end = os.getenv('END_DATE') or datetime.now().date().strftime('%Y-%m-%d')
 
-# --- 3. Construção e Treinamento do Modelo LSTM ---
-print("Construindo o modelo LSTM...")
-model = Sequential()
-model.add(LSTM(units=64, return_sequences=True, input_shape=(X_train.shape[1], 1)))
-model.add(Dropout(0.2))
-model.add(LSTM(units=64, return_sequences=False))
-model.add(Dropout(0.2))
-model.add(Dense(units=32))
-model.add(Dense(units=1))
+    started = time.perf_counter()
+    with open(SCALER_PATH, 'rb') as f:
+        scaler = pickle.load(f)
+    parts, new_train, cutoffs, loaded = [], 0, [], load_series(TICKERS, start, end)
+    for dates, closes in loaded:
+        df = pd.DataFrame({'Close': closes}, index=pd.DatetimeIndex(dates))
+        windows = fine_tune_windows(df, scaler, cutoff)
+        if windows is None:
+            cutoffs.append(cutoff)
+            continue
+        parts.append(windows)
+        # As janelas de validação não são treinadas: o corte do ticker fica antes delas
+        target_dates = df.index[WINDOW_SIZE:]
+        new_dates = target_dates[target_dates > cutoff]
+        new_train += len(new_dates) - len(windows[2])
+        cutoffs.append(new_dates[len(new_dates) - len(windows[2]) - 1])
+    timings['data_seconds'] = time.perf_counter() - started
+    if not parts:
+        print(f"Sem barras novas suficientes desde {info['cutoff_date']}; o modelo atual foi mantido.")
+        return None
+    X_train, y_train, X_val, y_val, y_val_actual = (np.concatenate(arrays) for arrays in zip(*parts))
+    print(f"Fine-tuning com {new_train + len(X_val)} janelas novas desde {info['cutoff_date']} "
+          f"({len(X_train)} de treino com replay, {len(X_val)} de validação)")
 
-print("Compilando o modelo...")
-model.compile(optimizer='adam', loss='mean_squared_error')
+    from keras.models import load_model
+    from keras.optimizers import Adam
 
-print("Iniciando o treinamento do modelo...")
-history = model.fit(X_train, y_train, batch_size=32, epochs=50)
-print("Treinamento concluído.")
+    model = load_model(MODEL_PATH)
+    previous = evaluate(model, scaler, X_val, y_val_actual)
+    model.compile(optimizer=Adam(learning_rate=FINE_TUNE_LEARNING_RATE), loss='mean_squared_error')
 
-# --- 4. Avaliação do Modelo ---
-print("Iniciando avaliação do modelo...")
+    started = time.perf_counter()
+    history = fit(model, array_dataset(X_train, y_train), FINE_TUNE_EPOCHS,
+                  os.path.join(CHECKPOINT_DIR, 'incremental'),
+                  validation_data=(X_val.astype(np.float32), y_val.astype(np.float32)))
+    timings['training_seconds'] = time.perf_counter() - started
+    print(f"Fine-tuning concluído em {len(history.epoch)} épocas.")
 
-# Preparar dados de teste
-test_data = scaled_data[training_data_len - WINDOW_SIZE:, :]
+    print_metrics(previous, "Modelo anterior nas janelas de validação")
+    metrics = evaluate(model, scaler, X_val, y_val_actual)
+    print_metrics(metrics, "Modelo ajustado nas janelas de validação")
+    loss = accuracy_loss(previous, metrics)
+    if loss > MAX_ACCURACY_LOSS:
+        print(f"Modelo ajustado descartado: {loss:.2%} pior que o atual nas janelas de validação "
+              f"(máximo permitido: {MAX_ACCURACY_LOSS:.2%}). O modelo atual foi mantido.")
+        return None
+    save_artifacts(model, scaler, X_val, y_val_actual, metrics)
 
-X_test, y_test_scaled = create_sequences(test_data, WINDOW_SIZE)
-y_test_actual = dataset[training_data_len:, :] # y_test real, não escalonado
+    return {
+        'tickers': TICKERS,
+        'data_start': str(min(dates[0] for dates, _ in loaded)),
+        'data_end': str(max(dates[-1] for dates, _ in loaded)),
+        'cutoff_date': str(min(cutoffs).date()),
+        'previous_cutoff_date': info['cutoff_date'],
+        'epochs': len(history.epoch),
+        'train_windows': int(len(X_train)),
+        'new_windows': int(new_train),
+        'replay_windows': int(len(X_train) - new_train),
+        'validation_windows': int(len(X_val)),
+        'previous_metrics': previous,
+        'metrics': metrics,
+    }
 
-# Remodelar dados de teste
-X_test = np.reshape(X_test, (X_test.shape[0], X_test.shape[1], 1))
 
-# Fazer previsões
-predictions_scaled = model.predict(X_test)
-predictions = scaler.inverse_transform(predictions_scaled)
+def main():
+    # Criar diretório de modelos se não existir
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    if EXPORT_PRECISION not in PRECISIONS + ('none',):
+        raise ValueError(f"EXPORT_PRECISION inválido: {EXPORT_PRECISION}")
+    if TRAIN_MODE not in ('full', 'incremental'):
+        raise ValueError(f"TRAIN_MODE inválido: {TRAIN_MODE}")
 
-# Calcular métricas
-mae = mean_absolute_error(y_test_actual, predictions)
-rmse = np.sqrt(mean_squared_error(y_test_actual, predictions))
-mape = np.mean(np.abs((y_test_actual - predictions) / y_test_actual)) * 100
+    mode = TRAIN_MODE
+    info = load_training_info()
+    if mode == 'incremental' and (info is None or not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH)):
+        print("Sem modelo ou registro de treino anterior; executando o treino completo.")
+        mode = 'full'
 
-print("\n--- Métricas de Avaliação no Conjunto de Teste ---")
-print(f'Mean Absolute Error (MAE):    {mae:.2f}')
-print(f'Root Mean Squared Error (RMSE): {rmse:.2f}')
-print(f'Mean Absolute Percentage Error (MAPE): {mape:.2f}%')
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    timings = {}
+    result = train_full(timings) if mode == 'full' else train_incremental(info, timings)
+    if result is None:
+        return
+    timings['total_seconds'] = time.perf_counter() - started
 
-# --- 5. Salvamento dos Artefatos ---
-print(f"\nSalvando modelo em {MODEL_PATH}...")
-model.save(MODEL_PATH)
+    save_training_info({
+        'mode': mode,
+        **result,
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'timings': {name: round(seconds, 3) for name, seconds in timings.items()},
+    })
+    print(f"Registro do treino salvo em {TRAINING_INFO_PATH} (corte: {result['cutoff_date']}, "
+          f"{timings['total_seconds']:.1f}s).")
+    print("Processo concluído. Modelo e escalonador estão prontos para o deploy.")
 
-print(f"Salvando escalonador em {SCALER_PATH}...")
-with open(SCALER_PATH, 'wb') as f:
-    pickle.dump(scaler, f)
 
-print("Processo concluído. Modelo e escalonador estão prontos para o deploy.")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
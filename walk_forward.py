@@ -0,0 +1,266 @@
+"""
+Avaliação walk-forward (origem móvel) do modelo LSTM.
+
+Em vez do único corte 80/20 do `train_model.py`, a história é dividida em
+vários folds consecutivos: cada fold treina um modelo novo com as barras
+anteriores à sua origem (janela expansiva, ou só os últimos `--train-days`
+dias) e o avalia nos `--test-days` dias seguintes. O relatório traz MAE, RMSE
+e MAPE por fold, o agregado sobre todas as janelas de teste e o tempo de
+cada fold.
+
+A série é coletada uma única vez e enviada a cada processo uma vez; os folds
+são apenas intervalos sobre ela, lidos como `WindowSet` sem reconstruir as
+janelas. Cada fold ajusta o próprio escalonador só às barras de treino, sem
+ver o mínimo e o máximo do período de teste, e escalona o teste com ele. Os folds rodam em paralelo, um por processo, cada um com
+`--threads-per-worker` threads do TensorFlow e do BLAS.
+
+Exemplos:
+    python walk_forward.py AAPL --folds 6 --test-days 180
+    python walk_forward.py AAPL MSFT GOOG --train-days 1095 --epochs 5 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+
+import train_model  # noqa: E402
+from api.inference_workers import limit_threads  # noqa: E402
+from train_model import WindowSet, build_model, evaluate  # noqa: E402
+
+METRICS = ("mae", "rmse", "mape")
+
+
+def make_folds(series_dates, folds, test_days, step_days=None, train_days=0,
+               window_size=train_model.WINDOW_SIZE):
+    """
+    Folds sobre a série concatenada dos tickers (`series_dates`: as datas de
+    cada ticker, na ordem da concatenação). O último período de teste termina
+    na última data; os anteriores recuam `step_days` (padrão: `test_days`)
+    a cada fold. Cada fold tem os trechos de treino (alvos antes da origem) e
+    de teste (alvos em [origem, origem + test_days)) de cada ticker.
+    """
+    step_days = step_days or test_days
+    last = max(dates[-1] for dates in series_dates) + np.timedelta64(1, "D")
+    result = []
+    for k in range(folds):
+        test_end = last - np.timedelta64(step_days * (folds - 1 - k), "D")
+        origin = test_end - np.timedelta64(test_days, "D")
+        train_start = origin - np.timedelta64(train_days, "D") if train_days else None
+
+        train_segments, test_segments, offset = [], [], 0
+        for dates in series_dates:
+            origin_index = offset + np.searchsorted(dates, origin)
+            test_end_index = offset + np.searchsorted(dates, test_end)
+            begin = offset
+            if train_start is not None:
+                begin = max(offset, offset + np.searchsorted(dates, train_start) - window_size)
+            train_segments.append((int(begin), int(origin_index)))
+            test_segments.append((int(max(offset, origin_index - window_size)), int(test_end_index)))
+            offset += len(dates)
+        result.append({
+            "fold": k,
+            "train_start": str(train_start) if train_start is not None else str(min(d[0] for d in series_dates)),
+            "test_start": str(origin),
+            "test_end": str(test_end - np.timedelta64(1, "D")),
+            "train_segments": train_segments,
+            "test_segments": test_segments,
+        })
+    return result
+
+
+def fold_scaler(raw, train_segments):
+    """Escalonador ajustado apenas às barras dos trechos de treino do fold."""
+    parts = [raw[begin:end] for begin, end in train_segments if end > begin]
+    if not parts:
+        raise ValueError("Fold sem barras de treino")
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(np.array([[min(p.min() for p in parts)], [max(p.max() for p in parts)]]))
+    return scaler
+
+
+# --- Processos dos folds ---
+_state = None
+
+
+def _init_worker(state, threads):
+    global _state
+    import tensorflow as tf
+
+    if threads > 0:
+        limit_threads(threads)
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+    _state = state
+
+
+def _run_fold(fold):
+    """Treina e avalia um fold. Erros viram o campo `error` do resultado."""
+    import tensorflow as tf
+
+    state = _state
+    started = time.perf_counter()
+    result = {name: fold[name] for name in ("fold", "train_start", "test_start", "test_end")}
+    try:
+        raw = state["raw"]
+        # Escalonador do fold: o período de teste (o futuro do fold) não entra no ajuste
+        scaler = fold_scaler(raw, fold["train_segments"])
+        series = scaler.transform(raw.reshape(-1, 1)).ravel().astype(np.float32)
+        train = WindowSet(series, fold["train_segments"], state["window_size"])
+        test = WindowSet(series, fold["test_segments"], state["window_size"])
+        result.update(train_windows=len(train), test_windows=len(test))
+        if not len(train) or not len(test):
+            raise ValueError("Fold sem janelas de treino ou de teste")
+
+        tf.keras.utils.set_random_seed(state["seed"] + fold["fold"])
+        model = build_model(state["window_size"])
+        history = model.fit(train.dataset(seed=state["seed"] + fold["fold"]), epochs=state["epochs"], verbose=0)
+        y_actual = raw[test.target_indices()].reshape(-1, 1)
+        result.update(evaluate(model, scaler, test, y_actual), epochs=len(history.epoch))
+        tf.keras.backend.clear_session()
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_folds(state, folds, workers=None, threads_per_worker=1):
+    """Gera o resultado de cada fold à medida que termina (fora de ordem com mais de um processo)."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(folds) <= 1:
+        _init_worker(state, 0)
+        for fold in folds:
+            yield _run_fold(fold)
+        return
+
+    # spawn: o processo principal pode já ter importado o TensorFlow, que não é seguro após fork
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(min(workers, len(folds)), initializer=_init_worker,
+                      initargs=(state, threads_per_worker)) as pool:
+        yield from pool.imap_unordered(_run_fold, folds)
+
+
+def aggregate(results):
+    """Métricas sobre todas as janelas de teste (ponderadas pelo tamanho de cada fold)."""
+    done = [r for r in results if "error" not in r]
+    n = sum(r["test_windows"] for r in done)
+    if not n:
+        return {"folds": 0, "test_windows": 0}
+    summary = {
+        "folds": len(done),
+        "test_windows": n,
+        "mae": sum(r["mae"] * r["test_windows"] for r in done) / n,
+        "rmse": float(np.sqrt(sum(r["rmse"] ** 2 * r["test_windows"] for r in done) / n)),
+        "mape": sum(r["mape"] * r["test_windows"] for r in done) / n,
+        "fold_seconds": round(sum(r["seconds"] for r in done), 3),
+    }
+    for name in METRICS:
+        summary[f"{name}_fold_std"] = float(np.std([r[name] for r in done]))
+    return summary
+
+
+def prepare_state(tickers, start, end, epochs, seed=42, window_size=train_model.WINDOW_SIZE, workers=None):
+    """
+    Coleta as séries uma vez; o estado (a série bruta concatenada) é
+    compartilhado por todos os folds, que a escalonam cada um com o seu escalonador.
+    """
+    loaded = train_model.load_series(tickers, start, end, workers=workers or train_model.PREPARE_WORKERS)
+    state = {
+        "raw": np.concatenate([closes for _, closes in loaded]),
+        "window_size": window_size,
+        "epochs": epochs,
+        "seed": seed,
+    }
+    return state, [dates for dates, _ in loaded]
+
+
+def print_report(results, summary):
+    print(f"\n{'fold':>4}  {'teste':<23} {'treino':>7} {'teste':>6} {'MAE':>8} {'RMSE':>8} {'MAPE':>7} {'tempo':>7}")
+    for r in results:
+        period = f"{r['test_start']}..{r['test_end']}"
+        if "error" in r:
+            print(f"{r['fold']:>4}  {period:<23} erro: {r['error']}")
+            continue
+        print(f"{r['fold']:>4}  {period:<23} {r['train_windows']:>7} {r['test_windows']:>6} "
+              f"{r['mae']:>8.3f} {r['rmse']:>8.3f} {r['mape']:>6.2f}% {r['seconds']:>6.1f}s")
+    if summary["folds"]:
+        print(f"{'total':>4}  {'':<23} {'':>7} {summary['test_windows']:>6} {summary['mae']:>8.3f} "
+              f"{summary['rmse']:>8.3f} {summary['mape']:>6.2f}% {summary['fold_seconds']:>6.1f}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Avaliação walk-forward do modelo LSTM")
+    parser.add_argument("tickers", nargs="*", default=train_model.TICKERS, help="Tickers (padrão: TICKERS)")
+    parser.add_argument("--start", default=train_model.START_DATE)
+    parser.add_argument("--end", default=train_model.END_DATE, help="Data final, exclusiva")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-days", type=int, default=180, help="Dias corridos de teste por fold")
+    parser.add_argument("--step-days", type=int, help="Distância entre origens (padrão: --test-days)")
+    parser.add_argument("--train-days", type=int, default=0,
+                        help="Dias de treino antes da origem (padrão 0: toda a história anterior)")
+    parser.add_argument("--epochs", type=int, default=10, help="Épocas de treino por fold")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processos (padrão: um por núcleo)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Threads do TensorFlow/BLAS por processo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="walk_forward_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    import tensorflow as tf
+
+    args = parse_args(argv)
+    tickers = [t.upper() for t in args.tickers]
+    state, series_dates = prepare_state(tickers, args.start, args.end, args.epochs, args.seed)
+    folds = make_folds(series_dates, args.folds, args.test_days, args.step_days, args.train_days)
+
+    print(f"Walk-forward: {len(folds)} fold(s) de {args.test_days} dias, {len(tickers)} ticker(s), "
+          f"{min(args.workers or 1, len(folds))} processo(s)...")
+    started = time.perf_counter()
+    results = []
+    for result in run_folds(state, folds, args.workers, args.threads_per_worker):
+        status = result.get("error") or f"MAE {result['mae']:.3f}"
+        print(f"Fold {result['fold']} concluído em {result['seconds']:.1f}s ({status})")
+        results.append(result)
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda r: r["fold"])
+
+    summary = aggregate(results)
+    summary["wall_seconds"] = round(elapsed, 3)
+    print_report(results, summary)
+    print(f"Tempo total: {elapsed:.1f}s")
+
+    report = {
+        "environment": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "tensorflow": tf.__version__,
+        },
+        "config": {
+            "tickers": tickers, "start": args.start, "end": args.end, "folds": args.folds,
+            "test_days": args.test_days, "step_days": args.step_days or args.test_days,
+            "train_days": args.train_days, "epochs": args.epochs, "workers": args.workers,
+            "threads_per_worker": args.threads_per_worker, "seed": args.seed,
+        },
+        "folds": results,
+        "aggregate": summary,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados salvos em {args.output}")
+    return 1 if not summary["folds"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())